@@ -1,4 +1,5 @@
 export enum GoalStatus {
+  Decomposing = "decomposing",
   Active = "active",
   Completed = "completed",
   Blocked = "blocked",
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -5,6 +6,58 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     anthropic_api_key: str = ""
     database_url: str = "sqlite:///./chance.db"
+    read_database_url: Optional[str] = None
+    db_read_replica: bool = True
+    db_echo: bool = False
+    db_pool_size: int = 5
+    db_read_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size: int = -65536
+    decompose_model: str = "gpt-4o-mini"
+    decompose_workers: int = 4
+    decompose_queue_size: int = 64
+    decompose_timeout: float = 120
+    decompose_max_attempts: int = 3
+    decompose_reuse_threshold: Optional[float] = 0.92
+    decompose_call_cost_usd: float = 0.0005
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = "./llm_cache.db"
+    llm_cache_ttl: Optional[float] = 604800
+    llm_cache_max_bytes: Optional[int] = 67108864
+    embedding_model: str = "text-embedding-3-small"
+    embedding_batch_size: int = 256
+    embedding_cache_path: str = "./embedding_cache.db"
+    similarity_threshold: float = 0.7
+    similarity_index: str = "exact"
+    ivf_nlist: int = 256
+    ivf_nprobe: int = 8
+    embedding_dtype: str = "float32"
+    embedding_rerank_factor: int = 4
+    similarity_min_recall_at_5: float = 0.9
+    mes_cache_size: int = 1024
+    mes_result_ttl: int = 60
+    mes_queue_max_age: Optional[float] = 5
+    breakpoint_threshold: float = 2
+    breakpoint_half_life_hours: Optional[float] = None
+    breakpoint_state_size: int = 10000
+    stats_snapshot_ttl: int = 300
+    cache_backend: str = "memory"
+    cache_path: str = "./shared_cache.db"
+    cache_max_entries: Optional[int] = 10000
+    cache_max_bytes: Optional[int] = None
+    cache_sweep_interval: Optional[float] = 60
+    event_store_enabled: bool = False
+    event_ingest_chunk_size: int = 1000
+    event_ingest_max_errors: int = 100
+    event_ingest_max_line_bytes: int = 65536
+    forecast_bucket_hours: int = 24
+    forecast_alpha: float = 0.3
+    forecast_top_actions: int = 10
     
     class Config:
         env_file = ".env"
@@ -1,48 +1,267 @@
-from typing import Optional, Callable, Any
+from typing import Awaitable, Iterable, Optional, Callable, Any, Dict, Set, Tuple
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from functools import wraps
-from datetime import datetime, timedelta
+from threading import Event, Lock, RLock, Thread
+import asyncio
 import hashlib
 import json
+import logging
+import sys
+import time
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def goal_tag(goal_id: int) -> str:
+    """Tag for cached entries derived from one goal's actions or events."""
+    return f"goal:{goal_id}"
+
+
+class CacheBackend(ABC):
+    """Interface behind `get_cache()`.
+    
+    `tags` group entries so one write can purge all of them with
+    `invalidate_tags`. `update` replaces a live value with `fn(value)`
+    atomically; it is how cached aggregates are patched, since a value read
+    from a shared backend is a copy. `shared` backends are seen by every
+    worker process.
+    """
+    shared = False
+    
+    def __init__(self):
+        self._sweeper: Optional[Thread] = None
+        self._stop_sweeper = Event()
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+    
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        ...
+    
+    @abstractmethod
+    def update(self, key: str, fn: Callable[[Any], Any]) -> bool:
+        ...
+    
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+    
+    @abstractmethod
+    def invalidate_tags(self, *tags: str) -> int:
+        ...
+    
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+    
+    @abstractmethod
+    def cleanup_expired(self) -> int:
+        ...
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+    
+    def start_sweeper(self, interval: float) -> None:
+        """Drop expired entries every `interval` seconds on a daemon thread."""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop_sweeper.clear()
+        
+        def sweep():
+            while not self._stop_sweeper.wait(interval):
+                self.cleanup_expired()
+        
+        self._sweeper = Thread(target=sweep, name="cache-sweeper", daemon=True)
+        self._sweeper.start()
+    
+    def stop_sweeper(self) -> None:
+        self._stop_sweeper.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
 
 
 class CacheEntry:
-    def __init__(self, value: Any, expires_at: datetime):
+    __slots__ = ("value", "expires_at", "size", "tags")
+    
+    def __init__(self, value: Any, expires_at: float, size: int = 0, tags: Tuple[str, ...] = ()):
         self.value = value
         self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
     
-    def is_expired(self) -> bool:
-        return datetime.utcnow() > self.expires_at
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (time.monotonic() if now is None else now) >= self.expires_at
 
 
-class SimpleCache:
-    def __init__(self):
-        self._cache: dict[str, CacheEntry] = {}
+class LRUCache(CacheBackend):
+    """Thread-safe in-process cache with TTL and LRU eviction.
     
-    def get(self, key: str) -> Optional[Any]:
-        entry = self._cache.get(key)
-        if entry and not entry.is_expired():
+    Expiry uses the monotonic clock, so wall-clock jumps neither resurrect
+    nor kill entries. `max_entries` and `max_bytes` bound the cache; the
+    least recently used entries go first. Sizes come from `sizeof`
+    (`sys.getsizeof` by default, which is shallow, so `max_bytes` is a
+    rough bound unless a better estimator is passed). Expired entries are
+    dropped on access, by `cleanup_expired` or by the optional sweeper.
+    """
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        default_ttl: float = 300,
+        sizeof: Callable[[Any], int] = sys.getsizeof,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._sizeof = sizeof
+        self._clock = clock
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self) -> int:
+        return len(self._cache)
+    
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, count=False) is not None
+    
+    def get(self, key: str, count: bool = True) -> Optional[Any]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry.is_expired(self._clock()):
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            if count:
+                self.hits += 1
             return entry.value
-        if entry:
-            del self._cache[key]
-        return None
     
-    def set(self, key: str, value: Any, ttl_seconds: int = 300) -> None:
-        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
-        self._cache[key] = CacheEntry(value, expires_at)
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        ttl = self.default_ttl if ttl_seconds is None else ttl_seconds
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            self._cache[key] = CacheEntry(value, self._clock() + ttl, size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._evict()
+    
+    def update(self, key: str, fn: Callable[[Any], Any]) -> bool:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry.is_expired(self._clock()):
+                return False
+            entry.value = fn(entry.value)
+            if self.max_bytes is not None:
+                size = self._sizeof(entry.value)
+                self._bytes += size - entry.size
+                entry.size = size
+                self._evict()
+            return True
+    
+    def invalidate_tags(self, *tags: str) -> int:
+        with self._lock:
+            keys = set().union(*(self._tags.get(tag, ()) for tag in tags))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
     
     def delete(self, key: str) -> None:
-        self._cache.pop(key, None)
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
     
     def clear(self) -> None:
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._tags.clear()
+            self._bytes = 0
+    
+    def cleanup_expired(self) -> int:
+        with self._lock:
+            now = self._clock()
+            expired = [key for key, entry in self._cache.items() if entry.is_expired(now)]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            return len(expired)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+    
+    def _remove(self, key: str) -> None:
+        entry = self._cache.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
     
-    def cleanup_expired(self) -> None:
-        expired_keys = [k for k, v in self._cache.items() if v.is_expired()]
-        for key in expired_keys:
-            del self._cache[key]
+    def _evict(self) -> None:
+        while self._cache and (
+            (self.max_entries is not None and len(self._cache) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._cache))
+            self._remove(key)
+            self.evictions += 1
+
+
+class SimpleCache(LRUCache):
+    """The previous cache interface; now bounded and thread-safe."""
+    
+    def __init__(self, max_entries: Optional[int] = 10000, max_bytes: Optional[int] = None):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes)
+
+
+def create_cache(backend: str = settings.cache_backend) -> CacheBackend:
+    if backend == "sqlite":
+        from app.core.shared_cache import SQLiteCache
+        return SQLiteCache(settings.cache_path, max_entries=settings.cache_max_entries)
+    if backend == "memory":
+        return SimpleCache(max_entries=settings.cache_max_entries, max_bytes=settings.cache_max_bytes)
+    raise ValueError(f"Unknown cache backend: {backend}")
 
 
-_global_cache = SimpleCache()
+_global_cache = create_cache()
+
+
+_PRIMITIVES = (str, int, float, bool, type(None))
 
 
 def cache_key(*args, **kwargs) -> str:
@@ -50,27 +269,192 @@ def cache_key(*args, **kwargs) -> str:
     return hashlib.md5(key_data.encode()).hexdigest()
 
 
-def cached(ttl_seconds: int = 300, key_func: Optional[Callable] = None):
+def make_key(prefix: str, args: tuple, kwargs: dict) -> str:
+    """`repr` of the arguments when they are all plain scalars (the common
+    case and much cheaper), a JSON digest otherwise."""
+    if all(type(arg) in _PRIMITIVES for arg in args) and all(type(value) in _PRIMITIVES for value in kwargs.values()):
+        if kwargs:
+            return f"{prefix}:{args!r}:{sorted(kwargs.items())!r}"
+        return f"{prefix}:{args!r}"
+    return f"{prefix}:{cache_key(*args, **kwargs)}"
+
+
+class _Stamped:
+    """Cached value plus the `time.monotonic()` reading at which it stops
+    being fresh; stale values are still served until the cache TTL drops
+    them. Through a shared backend another process may read a different
+    monotonic clock; that only moves when its background refresh starts,
+    the backend's wall-clock TTL still bounds how stale a value gets."""
+    __slots__ = ("value", "fresh_until")
+    
+    def __init__(self, value: Any, fresh_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+    
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers for the
+    same key wait for it and share its result or exception."""
+    
+    def __init__(self):
+        self._lock = Lock()
+        self._calls: Dict[str, _Call] = {}
+    
+    def busy(self, key: str) -> bool:
+        return key in self._calls
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """`SingleFlight` for coroutines; calls are coalesced per event loop.
+    
+    The computation runs in its own task and every caller awaits it through
+    `asyncio.shield`, so cancelling any caller, the first one included, leaves
+    the others waiting on the same result.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[tuple, asyncio.Task] = {}
+    
+    def busy(self, key: str) -> bool:
+        return (asyncio.get_running_loop(), key) in self._calls
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        flight = (loop, key)
+        task = self._calls.get(flight)
+        if task is None:
+            task = self._calls[flight] = loop.create_task(fn())
+            task.add_done_callback(lambda done: self._finish(flight, done))
+        return await asyncio.shield(task)
+    
+    def _finish(self, flight: tuple, task: asyncio.Task) -> None:
+        del self._calls[flight]
+        if not task.cancelled():
+            # Mark it retrieved: with every caller gone asyncio would log it.
+            task.exception()
+
+
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+_background: Set[asyncio.Task] = set()
+
+
+def cached(
+    ttl_seconds: int = 300,
+    key_func: Optional[Callable] = None,
+    stale_ttl: int = 0,
+    tags: Optional[Callable[..., Iterable[str]]] = None
+):
+    """Memoize a function or coroutine function in the global cache.
+    
+    Concurrent misses for the same key share a single computation. With
+    `stale_ttl`, a value older than `ttl_seconds` is still returned for that
+    many more seconds while one background refresh replaces it. `tags` maps
+    the call arguments to the tags the result is stored under.
+    """
     def decorator(func: Callable) -> Callable:
+        prefix = f"{func.__module__}.{func.__qualname__}"
+        
+        def key_for(args, kwargs) -> str:
+            return key_func(*args, **kwargs) if key_func else make_key(prefix, args, kwargs)
+        
+        def store(key: str, value: Any, args, kwargs) -> Any:
+            get_cache().set(
+                key,
+                _Stamped(value, time.monotonic() + ttl_seconds),
+                ttl_seconds + stale_ttl,
+                tags=tags(*args, **kwargs) if tags else ()
+            )
+            return value
+        
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = key_for(args, kwargs)
+                
+                async def compute():
+                    return store(key, await func(*args, **kwargs), args, kwargs)
+                
+                entry = get_cache().get(key)
+                if entry is not None:
+                    if time.monotonic() >= entry.fresh_until and not _async_flights.busy(key):
+                        task = asyncio.get_running_loop().create_task(_async_flights.do(key, compute))
+                        _background.add(task)
+                        task.add_done_callback(_finish_background)
+                    return entry.value
+                return await _async_flights.do(key, compute)
+            
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
-            if key_func:
-                key = key_func(*args, **kwargs)
-            else:
-                key = f"{func.__module__}.{func.__name__}:{cache_key(*args, **kwargs)}"
+            key = key_for(args, kwargs)
             
-            cached_value = _global_cache.get(key)
-            if cached_value is not None:
-                return cached_value
+            def compute():
+                return store(key, func(*args, **kwargs), args, kwargs)
             
-            result = func(*args, **kwargs)
-            _global_cache.set(key, result, ttl_seconds)
-            return result
+            entry = get_cache().get(key)
+            if entry is not None:
+                if time.monotonic() >= entry.fresh_until and not _flights.busy(key):
+                    Thread(target=_refresh, args=(key, compute), daemon=True).start()
+                return entry.value
+            return _flights.do(key, compute)
         
         return wrapper
     return decorator
 
 
-def get_cache() -> SimpleCache:
+def _refresh(key: str, compute: Callable[[], Any]) -> None:
+    try:
+        _flights.do(key, compute)
+    except Exception:
+        logger.exception("Background refresh of %s failed", key)
+
+
+def _finish_background(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background refresh failed", exc_info=task.exception())
+
+
+def get_cache() -> CacheBackend:
     return _global_cache
 
+
+def set_cache(cache: CacheBackend) -> CacheBackend:
+    """Swap the global backend; returns the previous one."""
+    global _global_cache
+    previous, _global_cache = _global_cache, cache
+    return previous
@@ -0,0 +1,145 @@
+from typing import Dict, Iterable, Optional
+from threading import Lock
+import os
+import sqlite3
+import time
+
+
+class DiskCache:
+    """Key/blob store in a local SQLite file that survives restarts.
+    
+    `ttl_seconds` expires entries on read; `max_bytes` evicts the least
+    recently used entries once the stored values outgrow it. Both are off by
+    default, and then reads never write.
+    """
+    
+    def __init__(self, path: str, table: str = "cache", ttl_seconds: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+            )
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({self.table})")}
+            for column in ("stored_at", "used_at"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE {self.table} ADD COLUMN {column} REAL NOT NULL DEFAULT 0")
+            if "size" not in columns:
+                self._conn.execute(f"ALTER TABLE {self.table} ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute(f"UPDATE {self.table} SET size = length(value)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_used_at ON {self.table} (used_at)")
+            self._conn.commit()
+        return self._conn
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(keys)
+        found: Dict[str, bytes] = {}
+        now = time.time()
+        oldest = now - self.ttl_seconds if self.ttl_seconds is not None else None
+        expired = []
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value, stored_at FROM {self.table} WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, value, stored_at in rows:
+                    if oldest is not None and stored_at < oldest:
+                        expired.append(key)
+                    else:
+                        found[key] = value
+            if expired:
+                conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in expired])
+            if found and self.max_bytes is not None:
+                conn.executemany(f"UPDATE {self.table} SET used_at = ? WHERE key = ?", [(now, key) for key in found])
+            if expired or (found and self.max_bytes is not None):
+                conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+    
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many({key: value})
+    
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, used_at, size) VALUES (?, ?, ?, ?, ?)",
+                [(key, value, now, now, len(value)) for key, value in items.items()]
+            )
+            if self.max_bytes is not None:
+                self._evict(conn)
+            conn.commit()
+    
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        excess = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in conn.execute(f"SELECT key, size FROM {self.table} ORDER BY used_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
+        self.evictions += len(victims)
+    
+    def purge_expired(self) -> int:
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            removed = conn.execute(
+                f"DELETE FROM {self.table} WHERE stored_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            conn.commit()
+        return removed
+    
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._connect().execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions
+        }
+    
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.commit()
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
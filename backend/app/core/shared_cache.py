@@ -0,0 +1,184 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from contextlib import contextmanager
+from threading import Lock
+import os
+import pickle
+import sqlite3
+import time
+from app.core.cache import CacheBackend
+
+
+class SQLiteCache(CacheBackend):
+    """Cache shared by every worker process on the host through one SQLite file.
+    
+    Values are pickled. Expiry uses wall-clock time because monotonic clocks
+    are per process. Past `max_entries` the entries closest to expiry are
+    evicted, so reads never write. The size is only counted every
+    `evict_every` writes of this process and on each sweep, so the table can
+    briefly overshoot the bound. Hit/miss counters are per process.
+    """
+    shared = True
+    
+    def __init__(
+        self,
+        path: str,
+        max_entries: Optional[int] = None,
+        default_ttl: float = 300,
+        busy_timeout_ms: int = 5000,
+        evict_every: int = 64
+    ):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._writes = 0
+        self.default_ttl = default_ttl
+        self.busy_timeout_ms = busy_timeout_ms
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            conn.execute("PRAGMA journal_mode=wal")
+            conn.execute("PRAGMA synchronous=normal")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entry "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entry_expires_at ON cache_entry (expires_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_tag "
+                "(tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_tag_key ON cache_tag (key)")
+            self._conn = conn
+        return self._conn
+    
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, keys: List[str]) -> None:
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            conn.execute(f"DELETE FROM cache_entry WHERE key IN ({placeholders})", chunk)
+            conn.execute(f"DELETE FROM cache_tag WHERE key IN ({placeholders})", chunk)
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM cache_entry WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(row[0])
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        ttl = self.default_ttl if ttl_seconds is None else ttl_seconds
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, blob, time.time() + ttl)
+            )
+            conn.execute("DELETE FROM cache_tag WHERE key = ?", (key,))
+            conn.executemany("INSERT OR IGNORE INTO cache_tag (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags])
+            self._writes += 1
+            if self._writes >= self.evict_every:
+                self._evict(conn)
+    
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        self._writes = 0
+        if self.max_entries is None:
+            return
+        excess = conn.execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0] - self.max_entries
+        if excess > 0:
+            victims = [row[0] for row in conn.execute(
+                "SELECT key FROM cache_entry ORDER BY expires_at LIMIT ?", (excess,)
+            )]
+            self._delete(conn, victims)
+            self.evictions += len(victims)
+    
+    def update(self, key: str, fn: Callable[[Any], Any]) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM cache_entry WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            if row is None:
+                return False
+            value = fn(pickle.loads(row[0]))
+            conn.execute(
+                "UPDATE cache_entry SET value = ? WHERE key = ?",
+                (pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), key)
+            )
+        return True
+    
+    def delete(self, key: str) -> None:
+        with self._transaction() as conn:
+            self._delete(conn, [key])
+    
+    def invalidate_tags(self, *tags: str) -> int:
+        if not tags:
+            return 0
+        placeholders = ",".join("?" * len(tags))
+        with self._transaction() as conn:
+            keys = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT key FROM cache_tag WHERE tag IN ({placeholders})", tags
+            )]
+            self._delete(conn, keys)
+        return len(keys)
+    
+    def clear(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM cache_entry")
+            conn.execute("DELETE FROM cache_tag")
+    
+    def cleanup_expired(self) -> int:
+        with self._transaction() as conn:
+            keys = [row[0] for row in conn.execute(
+                "SELECT key FROM cache_entry WHERE expires_at <= ?", (time.time(),)
+            )]
+            self._delete(conn, keys)
+            self._evict(conn)
+        self.expirations += len(keys)
+        return len(keys)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
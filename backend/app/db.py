@@ -1,15 +1,105 @@
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import create_engine, SQLModel, Session
-from app.config import settings
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import Settings, settings
+from app.migrations import run_migrations
 
 
-engine = create_engine(settings.database_url, echo=True)
+def is_memory_url(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:"
+
+
+def async_url(url: str) -> str:
+    """Same database through an asyncio driver (aiosqlite for SQLite)."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.get_driver_name() != "aiosqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def engine_options(url: str, read_only: bool, profile: Settings) -> dict:
+    options = {"echo": profile.db_echo}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False, "timeout": profile.sqlite_busy_timeout_ms / 1000}
+        if not is_memory_url(url):
+            options["pool_size"] = profile.db_read_pool_size if read_only else profile.db_pool_size
+            options["max_overflow"] = profile.db_max_overflow
+            options["pool_timeout"] = profile.db_pool_timeout
+    return options
+
+
+def apply_sqlite_profile(engine: Engine, read_only: bool, profile: Settings) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = {
+        "journal_mode": profile.sqlite_journal_mode,
+        "synchronous": profile.sqlite_synchronous,
+        "busy_timeout": profile.sqlite_busy_timeout_ms,
+        "mmap_size": profile.sqlite_mmap_size,
+        "cache_size": profile.sqlite_cache_size
+    }
+    if read_only:
+        pragmas["query_only"] = "ON"
+    
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_db_engine(url: str, read_only: bool = False, profile: Settings = settings) -> Engine:
+    """Engine with the SQLite profile from settings applied on every new connection.
+    
+    File databases get a sized connection pool; read-only engines also set
+    `query_only` so a misrouted write fails instead of taking the write lock.
+    In-memory databases keep SQLAlchemy's default single-connection pool.
+    """
+    engine = create_engine(url, **engine_options(url, read_only, profile))
+    apply_sqlite_profile(engine, read_only, profile)
+    return engine
+
+
+def create_async_db_engine(url: str, read_only: bool = False, profile: Settings = settings) -> AsyncEngine:
+    """`create_db_engine` for the async routes; same pragmas and pool sizes."""
+    url = async_url(url)
+    engine = create_async_engine(url, **engine_options(url, read_only, profile))
+    apply_sqlite_profile(engine.sync_engine, read_only, profile)
+    return engine
+
+
+engine = create_db_engine(settings.database_url)
+async_engine = create_async_db_engine(settings.database_url)
+if settings.db_read_replica and not is_memory_url(settings.database_url):
+    read_url = settings.read_database_url or settings.database_url
+    async_read_engine = create_async_db_engine(read_url, read_only=True)
+else:
+    async_read_engine = async_engine
 
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
 
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+
+async def get_async_session():
+    """Session for the async routes. Objects stay loaded after commit because
+    expired attributes cannot be lazily refreshed under asyncio; the sync
+    services run on it through `session.run_sync`."""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_read_session():
+    """Session for routes that never write; served by the read pool."""
+    async with AsyncSession(async_read_engine, expire_on_commit=False) as session:
+        yield session
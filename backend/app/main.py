@@ -1,7 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.db import init_db
-from app.routes import goals, logs, stats
+from sqlmodel import Session
+from app.config import settings
+from app.core.cache import get_cache
+from app.db import engine, init_db
+from app.services.event_store import event_store
+from app.services.jobs import decomposition_queue
+from app.routes import goals, jobs, logs, mes, stats
 
 
 app = FastAPI(title="Chance Backend")
@@ -15,13 +20,35 @@ app.add_middleware(
 )
 
 app.include_router(goals.router)
+app.include_router(jobs.router)
 app.include_router(logs.router)
+app.include_router(mes.router)
 app.include_router(stats.router)
 
 
 @app.on_event("startup")
 def on_startup():
     init_db()
+    if settings.event_store_enabled:
+        with Session(engine) as session:
+            event_store.load(session)
+    if settings.cache_sweep_interval:
+        get_cache().start_sweeper(settings.cache_sweep_interval)
+
+
+@app.on_event("startup")
+async def start_decomposition_workers():
+    await decomposition_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_decomposition_workers():
+    await decomposition_queue.stop()
+
+
+@app.on_event("shutdown")
+def stop_cache_sweeper():
+    get_cache().stop_sweeper()
 
 
 @app.get("/health")
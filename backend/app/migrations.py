@@ -0,0 +1,132 @@
+from typing import Callable, List, Tuple
+from datetime import datetime
+import json
+from sqlalchemy import Connection, Engine, text
+
+
+def backfill_action_dependencies(conn: Connection) -> None:
+    rows = conn.execute(
+        text("SELECT id, goal_id, dependencies FROM action WHERE dependencies IS NOT NULL AND dependencies != '[]'")
+    ).all()
+    edges = [
+        {"action_id": action_id, "depends_on_id": int(dep_id), "goal_id": goal_id}
+        for action_id, goal_id, dependencies in rows
+        for dep_id in json.loads(dependencies or "[]")
+    ]
+    if edges:
+        conn.execute(
+            text(
+                "INSERT OR IGNORE INTO action_dependency (action_id, depends_on_id, goal_id) "
+                "VALUES (:action_id, :depends_on_id, :goal_id)"
+            ),
+            edges
+        )
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def add_graph_analytics_columns(conn: Connection) -> None:
+    for column in ["critical_path_min", "remaining_min", "remaining_critical_path_min", "max_depth", "cycles_broken"]:
+        add_column(conn, "goal", column, "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "action", "depth", "INTEGER NOT NULL DEFAULT 0")
+
+
+def index_breakpoint_action(conn: Connection) -> None:
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_breakpoint_action_id ON breakpoint (action_id)"))
+
+
+def backfill_rollups(conn: Connection) -> None:
+    bucket = "strftime('%Y-%m-%d %H:00:00.000000', timestamp)"
+    conn.execute(text(
+        "INSERT OR IGNORE INTO event_rollup (bucket, status, action_id, failure_reason, goal_id, count) "
+        f"SELECT {bucket}, status, action_id, COALESCE(failure_reason, ''), MIN(goal_id), COUNT(*) "
+        f"FROM completionevent GROUP BY {bucket}, status, action_id, COALESCE(failure_reason, '')"
+    ))
+    bucket = bucket.replace("timestamp", "detected_at")
+    conn.execute(text(
+        "INSERT OR IGNORE INTO breakpoint_rollup (bucket, pattern, count) "
+        f"SELECT {bucket}, pattern, COUNT(*) FROM breakpoint GROUP BY {bucket}, pattern"
+    ))
+
+
+QUERY_INDEXES = [
+    ("ix_goal_status", "goal", "status"),
+    ("ix_action_goal_id", "action", "goal_id"),
+    ("ix_completionevent_goal_id_timestamp", "completionevent", "goal_id, timestamp"),
+    ("ix_completionevent_action_id_timestamp", "completionevent", "action_id, timestamp"),
+    ("ix_completionevent_status_timestamp", "completionevent", "status, timestamp"),
+    ("ix_breakpoint_pattern", "breakpoint", "pattern"),
+    ("ix_breakpoint_detected_at", "breakpoint", "detected_at"),
+]
+
+
+def add_query_indexes(conn: Connection) -> None:
+    """Indexes declared on the models; create_all skips them on existing tables."""
+    for name, table, columns in QUERY_INDEXES:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def add_job_bypass_cache(conn: Connection) -> None:
+    add_column(conn, "decomposition_job", "bypass_cache", "BOOLEAN NOT NULL DEFAULT 0")
+
+
+def add_job_reuse_columns(conn: Connection) -> None:
+    add_column(conn, "decomposition_job", "source", "VARCHAR(6)")
+    add_column(conn, "decomposition_job", "similarity", "FLOAT")
+    add_column(conn, "decomposition_job", "reused_goal_id", "INTEGER")
+
+
+def add_job_steps(conn: Connection) -> None:
+    add_column(conn, "decomposition_job", "steps", "TEXT")
+
+
+def unique_breakpoint_action(conn: Connection) -> None:
+    """One breakpoint row per action: drop older duplicates, make the index
+    unique and recount the breakpoint rollups from the remaining rows."""
+    conn.execute(text("DELETE FROM breakpoint WHERE id NOT IN (SELECT MAX(id) FROM breakpoint GROUP BY action_id)"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_breakpoint_action_id"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_breakpoint_action_id ON breakpoint (action_id)"))
+    bucket = "strftime('%Y-%m-%d %H:00:00.000000', detected_at)"
+    conn.execute(text("DELETE FROM breakpoint_rollup"))
+    conn.execute(text(
+        "INSERT INTO breakpoint_rollup (bucket, pattern, count) "
+        f"SELECT {bucket}, pattern, COUNT(*) FROM breakpoint GROUP BY {bucket}, pattern"
+    ))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "backfill_action_dependencies", backfill_action_dependencies),
+    (2, "add_graph_analytics_columns", add_graph_analytics_columns),
+    (3, "index_breakpoint_action", index_breakpoint_action),
+    (4, "backfill_rollups", backfill_rollups),
+    (5, "add_query_indexes", add_query_indexes),
+    (6, "add_job_bypass_cache", add_job_bypass_cache),
+    (7, "add_job_reuse_columns", add_job_reuse_columns),
+    (8, "add_job_steps", add_job_steps),
+    (9, "unique_breakpoint_action", unique_breakpoint_action),
+]
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply data migrations that have not run yet; tables come from create_all."""
+    applied = []
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migration "
+            "(version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at DATETIME NOT NULL)"
+        ))
+        done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migration"))}
+        for version, name, migrate in MIGRATIONS:
+            if version in done:
+                continue
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migration (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": datetime.utcnow()}
+            )
+            applied.append(version)
+    return applied
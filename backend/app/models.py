@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 from datetime import datetime
@@ -5,6 +6,7 @@ from enum import Enum
 
 
 class GoalStatus(str, Enum):
+    decomposing = "decomposing"
     active = "active"
     completed = "completed"
     blocked = "blocked"
@@ -32,6 +34,18 @@ class BreakpointPattern(str, Enum):
     external = "external"
 
 
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class DecompositionSource(str, Enum):
+    llm = "llm"
+    reused = "reused"
+
+
 class EnergyLevel(str, Enum):
     low = "low"
     medium = "medium"
@@ -43,16 +57,29 @@ class Goal(SQLModel, table=True):
     description: str
     measurable: bool = True
     time_bound: Optional[datetime] = None
-    status: GoalStatus = GoalStatus.active
+    status: GoalStatus = Field(default=GoalStatus.active, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    critical_path_min: int = 0
+    remaining_min: int = 0
+    remaining_critical_path_min: int = 0
+    max_depth: int = 0
+    cycles_broken: int = 0
     
     actions: List["Action"] = Relationship(back_populates="goal")
     events: List["CompletionEvent"] = Relationship(back_populates="goal")
 
 
+class GoalEmbedding(SQLModel, table=True):
+    goal_id: int = Field(foreign_key="goal.id", primary_key=True)
+    model: str
+    dim: int
+    vector: bytes
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class Action(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    goal_id: int = Field(foreign_key="goal.id")
+    goal_id: int = Field(foreign_key="goal.id", index=True)
     description: str
     duration_min: int
     energy_level: EnergyLevel
@@ -60,13 +87,28 @@ class Action(SQLModel, table=True):
     status: ActionStatus = ActionStatus.pending
     priority: int = 0
     dependencies: str = Field(default="[]")
+    depth: int = 0
     
     goal: Optional[Goal] = Relationship(back_populates="actions")
     events: List["CompletionEvent"] = Relationship(back_populates="action")
     breakpoints: List["Breakpoint"] = Relationship(back_populates="action")
 
 
+class ActionDependency(SQLModel, table=True):
+    __tablename__ = "action_dependency"
+    
+    action_id: int = Field(foreign_key="action.id", primary_key=True)
+    depends_on_id: int = Field(foreign_key="action.id", primary_key=True, index=True)
+    goal_id: int = Field(foreign_key="goal.id", index=True)
+
+
 class CompletionEvent(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_completionevent_goal_id_timestamp", "goal_id", "timestamp"),
+        Index("ix_completionevent_action_id_timestamp", "action_id", "timestamp"),
+        Index("ix_completionevent_status_timestamp", "status", "timestamp"),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     action_id: int = Field(foreign_key="action.id")
     goal_id: int = Field(foreign_key="goal.id")
@@ -80,20 +122,60 @@ class CompletionEvent(SQLModel, table=True):
 
 class Breakpoint(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    action_id: int = Field(foreign_key="action.id")
+    action_id: int = Field(foreign_key="action.id", unique=True, index=True)
     failure_count: int = 0
-    pattern: BreakpointPattern
+    pattern: BreakpointPattern = Field(index=True)
     reasons: str = Field(default="[]")
-    detected_at: datetime = Field(default_factory=datetime.utcnow)
+    detected_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     
     action: Optional[Action] = Relationship(back_populates="breakpoints")
 
 
+class EventRollup(SQLModel, table=True):
+    __tablename__ = "event_rollup"
+    
+    bucket: datetime = Field(primary_key=True)
+    status: CompletionStatus = Field(primary_key=True)
+    action_id: int = Field(primary_key=True)
+    failure_reason: str = Field(default="", primary_key=True)
+    goal_id: int
+    count: int = 0
+
+
+class BreakpointRollup(SQLModel, table=True):
+    __tablename__ = "breakpoint_rollup"
+    
+    bucket: datetime = Field(primary_key=True)
+    pattern: BreakpointPattern = Field(primary_key=True)
+    count: int = 0
+
+
+class DecompositionJob(SQLModel, table=True):
+    __tablename__ = "decomposition_job"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    goal_id: int = Field(foreign_key="goal.id", index=True)
+    status: JobStatus = Field(default=JobStatus.queued, index=True)
+    attempts: int = 0
+    action_count: int = 0
+    steps: Optional[str] = None
+    bypass_cache: bool = False
+    source: Optional[DecompositionSource] = None
+    similarity: Optional[float] = None
+    reused_goal_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 class MESResponse(SQLModel):
     action_id: int
+    goal_id: Optional[int] = None
     description: str
     duration_min: int
     energy_level: EnergyLevel
     priority: int
     available_now: bool
+    depth: int = 0
 
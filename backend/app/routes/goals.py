@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
-from app.db import get_session
-from app.models import Goal, Action, GoalStatus, ActionStatus, EnergyLevel, MESResponse
-from app.services.decompose import decompose_service
+from app.db import get_async_read_session, get_async_session
+from app.models import Goal, Action, DecompositionJob, GoalStatus, MESResponse
+from app.services.jobs import QueueFull, QueueStopped, decomposition_queue
 from app.services.mes import mes_service
+from app.services.goals import sync_goal_status
+from app.services.embeddings import index_goal_async, find_similar_goals_async
 from pydantic import BaseModel
-import json
 
 
 router = APIRouter(prefix="/goals", tags=["goals"])
@@ -28,160 +30,152 @@ class GoalDetailResponse(BaseModel):
     actions: List[Action]
 
 
-@router.post("/", response_model=Goal)
-def create_goal(
+async def submit_decomposition(session: AsyncSession, goal: Goal, response: Response, bypass_cache: bool = False) -> DecompositionJob:
+    try:
+        job = await decomposition_queue.submit(session, goal, bypass_cache)
+    except QueueFull:
+        raise HTTPException(status_code=429, detail="Decomposition queue is full", headers={"Retry-After": "5"})
+    except QueueStopped:
+        raise HTTPException(status_code=503, detail="Decomposition workers are not running")
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+
+@router.post("/", response_model=Goal, status_code=202)
+async def create_goal(
     request: CreateGoalRequest,
-    session: Session = Depends(get_session)
+    response: Response,
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Create goal with auto-decomposition."""
+    """Create goal; decomposition runs in the background (see /jobs)."""
     
     goal = Goal(
         description=request.description,
-        measurable=request.measurable
+        measurable=request.measurable,
+        status=GoalStatus.decomposing
     )
     session.add(goal)
-    session.commit()
-    session.refresh(goal)
-    
-    steps = decompose_service.decompose_with_llm(request.description)
-    
-    for idx, step in enumerate(steps):
-        action = Action(
-            goal_id=goal.id,
-            description=step["description"],
-            duration_min=step["duration_min"],
-            energy_level=EnergyLevel(step["energy_level"]),
-            priority=step.get("priority", 5),
-            dependencies=json.dumps(step.get("dependencies", [])),
-            atomic=True,
-            status=ActionStatus.available if not step.get("dependencies") else ActionStatus.pending
-        )
-        session.add(action)
-    
-    session.commit()
-    session.refresh(goal)
+    await submit_decomposition(session, goal, response)
     
     return goal
 
 
 @router.get("/", response_model=List[Goal])
-def list_goals(session: Session = Depends(get_session)):
+async def list_goals(session: AsyncSession = Depends(get_async_read_session)):
     """List all goals."""
-    return session.exec(select(Goal)).all()
+    return (await session.exec(select(Goal))).all()
 
 
 @router.get("/{goal_id}", response_model=GoalDetailResponse)
-def get_goal(goal_id: int, session: Session = Depends(get_session)):
+async def get_goal(goal_id: int, session: AsyncSession = Depends(get_async_read_session)):
     """Get goal details with actions."""
-    goal = session.get(Goal, goal_id)
+    goal = await session.get(Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
-    actions = session.exec(
+    actions = (await session.exec(
         select(Action).where(Action.goal_id == goal_id)
-    ).all()
+    )).all()
     
     return GoalDetailResponse(goal=goal, actions=list(actions))
 
 
 @router.patch("/{goal_id}", response_model=Goal)
-def update_goal(
+async def update_goal(
     goal_id: int,
     request: UpdateGoalRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Update goal."""
-    goal = session.get(Goal, goal_id)
+    goal = await session.get(Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
+    description_changed = bool(request.description) and request.description != goal.description
     if request.description:
         goal.description = request.description
     if request.status:
         goal.status = request.status
     
     session.add(goal)
-    session.commit()
-    session.refresh(goal)
+    await session.commit()
+    await session.refresh(goal)
+    
+    if description_changed:
+        await index_goal_async(session, goal)
+    if request.status:
+        await session.run_sync(sync_goal_status, goal)
     
     return goal
 
 
 @router.delete("/{goal_id}")
-def delete_goal(goal_id: int, session: Session = Depends(get_session)):
+async def delete_goal(goal_id: int, session: AsyncSession = Depends(get_async_session)):
     """Soft delete goal."""
-    goal = session.get(Goal, goal_id)
+    goal = await session.get(Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
     goal.status = GoalStatus.cancelled
     session.add(goal)
-    session.commit()
+    await session.commit()
+    
+    await session.run_sync(sync_goal_status, goal)
     
     return {"status": "deleted"}
 
 
-@router.post("/{goal_id}/decompose", response_model=List[Action])
-def redecompose_goal(
+@router.post("/{goal_id}/decompose", response_model=DecompositionJob, status_code=202)
+async def redecompose_goal(
     goal_id: int,
-    session: Session = Depends(get_session)
+    response: Response,
+    bypass_cache: bool = False,
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Regenerate decomposition for goal."""
-    goal = session.get(Goal, goal_id)
+    """Queue a fresh decomposition for goal; its actions are replaced when the job finishes.
+    
+    `bypass_cache` asks the model for a new plan even if an identical prompt was answered before.
+    """
+    goal = await session.get(Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
-    old_actions = session.exec(
-        select(Action).where(Action.goal_id == goal_id)
-    ).all()
-    for action in old_actions:
-        session.delete(action)
-    
-    steps = decompose_service.decompose_with_llm(goal.description)
-    
-    new_actions = []
-    for step in steps:
-        action = Action(
-            goal_id=goal.id,
-            description=step["description"],
-            duration_min=step["duration_min"],
-            energy_level=EnergyLevel(step["energy_level"]),
-            priority=step.get("priority", 5),
-            dependencies=json.dumps(step.get("dependencies", [])),
-            atomic=True,
-            status=ActionStatus.available if not step.get("dependencies") else ActionStatus.pending
-        )
-        session.add(action)
-        new_actions.append(action)
-    
-    session.commit()
-    
-    return new_actions
+    return await submit_decomposition(session, goal, response, bypass_cache)
+
+
+@router.get("/{goal_id}/job", response_model=DecompositionJob)
+async def get_latest_job(goal_id: int, session: AsyncSession = Depends(get_async_read_session)):
+    """Most recent decomposition job for goal."""
+    job = (await session.exec(
+        select(DecompositionJob)
+        .where(DecompositionJob.goal_id == goal_id)
+        .order_by(DecompositionJob.id.desc())
+        .limit(1)
+    )).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="No decomposition job for goal")
+    return job
 
 
 @router.get("/{goal_id}/mes", response_model=List[MESResponse])
-def get_mes(
+async def get_mes(
     goal_id: int,
     limit: int = 5,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_read_session)
 ):
     """Get ranked Minimal Executable Steps."""
-    goal = session.get(Goal, goal_id)
+    goal = await session.get(Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
-    return mes_service.find_mes(session, goal_id, limit)
+    return await session.run_sync(mes_service.cached_mes, goal_id, limit)
 
 
 @router.post("/{goal_id}/similar")
-def find_similar(goal_id: int, session: Session = Depends(get_session)):
+async def find_similar(goal_id: int, session: AsyncSession = Depends(get_async_session)):
     """Find similar goals using embeddings."""
-    from app.services.embeddings import find_similar_goals
-    
-    goal = session.get(Goal, goal_id)
+    goal = await session.get(Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
-    all_goals = session.exec(select(Goal)).all()
-    similar = find_similar_goals(goal, all_goals)
-    return similar
+    return await find_similar_goals_async(session, goal)
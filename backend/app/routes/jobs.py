@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+import asyncio
+import json
+from app.db import async_read_engine, get_async_read_session
+from app.models import DecompositionJob
+from app.services.jobs import TERMINAL_STATUSES, decomposition_queue, job_state
+
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+HEARTBEAT_SECONDS = 15
+
+
+def sse(kind: str, payload: dict) -> str:
+    return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def read_state(job_id: int) -> dict:
+    async with AsyncSession(async_read_engine) as session:
+        return job_state(await session.get(DecompositionJob, job_id))
+
+
+@router.get("/{job_id}", response_model=DecompositionJob)
+async def get_job(job_id: int, session: AsyncSession = Depends(get_async_read_session)):
+    """Decomposition job status."""
+    job = await session.get(DecompositionJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: int, session: AsyncSession = Depends(get_async_read_session)):
+    """Server-sent events: the current job state, then every change and each
+    generated step (`event: step`) until the job finishes."""
+    updates = decomposition_queue.watch(job_id)
+    job = await session.get(DecompositionJob, job_id)
+    if not job:
+        decomposition_queue.unwatch(job_id, updates)
+        raise HTTPException(status_code=404, detail="Job not found")
+    state = job_state(job)
+    # Release the connection; the stream may stay open for minutes.
+    await session.close()
+    
+    async def stream():
+        current = state
+        try:
+            yield sse("job", current)
+            while current["status"] not in TERMINAL_STATUSES:
+                try:
+                    kind, payload = await asyncio.wait_for(updates.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Another process may own the job; fall back to the row.
+                    kind, payload = "job", await read_state(job_id)
+                    if payload == current:
+                        yield ": keep-alive\n\n"
+                        continue
+                if kind == "job":
+                    current = payload
+                yield sse(kind, payload)
+        finally:
+            decomposition_queue.unwatch(job_id, updates)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
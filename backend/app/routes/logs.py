@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from typing import List, Optional
-from app.db import get_session
-from app.models import CompletionEvent, CompletionStatus, Action, ActionStatus
-from app.services.breakpoints import breakpoint_service
-from pydantic import BaseModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import AsyncIterable, AsyncIterator, List, Optional, Tuple
+from app.config import settings
+from app.db import get_async_read_session, get_async_session
+from app.models import CompletionEvent, CompletionStatus
+from app.services.events import log_events
+from pydantic import BaseModel, ValidationError
 from datetime import datetime
 
 
@@ -21,45 +23,27 @@ class BatchLogRequest(BaseModel):
     events: List[LogEventRequest]
 
 
+def save_event(session: Session, request: LogEventRequest) -> CompletionEvent:
+    events = log_events(session, [(request.action_id, request.status, request.failure_reason)])
+    if not events:
+        raise HTTPException(status_code=404, detail="Action not found")
+    return events[0]
+
+
 @router.post("/", response_model=CompletionEvent)
-def log_event(
+async def log_event(
     request: LogEventRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Log completion event for an action."""
-    
-    action = session.get(Action, request.action_id)
-    if not action:
-        raise HTTPException(status_code=404, detail="Action not found")
-    
-    event = CompletionEvent(
-        action_id=request.action_id,
-        goal_id=action.goal_id,
-        status=request.status,
-        failure_reason=request.failure_reason
-    )
-    session.add(event)
-    
-    if request.status == CompletionStatus.done:
-        action.status = ActionStatus.done
-    elif request.status == CompletionStatus.blocked:
-        action.status = ActionStatus.blocked
-    
-    session.add(action)
-    session.commit()
-    session.refresh(event)
-    
-    if request.status in [CompletionStatus.failed, CompletionStatus.blocked]:
-        breakpoint_service.detect_breakpoints(session, request.action_id)
-    
-    return event
+    return await session.run_sync(save_event, request)
 
 
 @router.get("/", response_model=List[CompletionEvent])
-def get_events(
+async def get_events(
     goal_id: Optional[int] = None,
     action_id: Optional[int] = None,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_read_session)
 ):
     """Get event history with optional filters."""
     
@@ -72,39 +56,125 @@ def get_events(
     
     statement = statement.order_by(CompletionEvent.timestamp.desc())
     
-    return session.exec(statement).all()
+    return (await session.exec(statement)).all()
+
+
+def save_batch(session: Session, request: BatchLogRequest) -> List[CompletionEvent]:
+    return log_events(session, [(event.action_id, event.status, event.failure_reason) for event in request.events])
 
 
 @router.post("/batch", response_model=List[CompletionEvent])
-def log_batch_events(
+async def log_batch_events(
     request: BatchLogRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Log multiple events at once."""
+    return await session.run_sync(save_batch, request)
+
+
+class IngestError(BaseModel):
+    line: int
+    error: str
+
+
+class IngestReport(BaseModel):
+    lines: int
+    accepted: int
+    rejected: int
+    errors: List[IngestError]
+    errors_truncated: bool
+
+
+async def ndjson_lines(chunks: AsyncIterable[bytes], max_line_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """Lines of an NDJSON body as they arrive. A line longer than
+    `max_line_bytes` is dropped rather than buffered and yields None."""
+    buffer = bytearray()
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        oversized = True
+                        buffer.clear()
+                break
+            if not oversized:
+                buffer += chunk[start:end]
+            yield None if oversized or len(buffer) > max_line_bytes else bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = end + 1
+    if oversized:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+def describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" if detail["loc"] else detail["msg"]
+        for detail in error.errors()
+    )
+
+
+async def ingest_ndjson(
+    session: AsyncSession,
+    chunks: AsyncIterable[bytes],
+    chunk_size: int = settings.event_ingest_chunk_size,
+    max_errors: int = settings.event_ingest_max_errors,
+    max_line_bytes: int = settings.event_ingest_max_line_bytes
+) -> IngestReport:
+    """Validate and log NDJSON events `chunk_size` lines at a time.
     
-    events = []
+    Each chunk is committed on its own, so memory stays bounded by the chunk
+    and a bad line only rejects itself. Blank lines are skipped; the first
+    `max_errors` rejections are reported with their line numbers, in the
+    order found (unknown actions show up when their chunk is logged).
+    """
+    report = IngestReport(lines=0, accepted=0, rejected=0, errors=[], errors_truncated=False)
+    pending: List[Tuple[int, LogEventRequest]] = []
     
-    for event_req in request.events:
-        action = session.get(Action, event_req.action_id)
-        if not action:
-            continue
-        
-        event = CompletionEvent(
-            action_id=event_req.action_id,
-            goal_id=action.goal_id,
-            status=event_req.status,
-            failure_reason=event_req.failure_reason
-        )
-        session.add(event)
-        events.append(event)
-        
-        if event_req.status == CompletionStatus.done:
-            action.status = ActionStatus.done
-        elif event_req.status == CompletionStatus.blocked:
-            action.status = ActionStatus.blocked
-        
-        session.add(action)
+    def reject(line: int, error: str) -> None:
+        report.rejected += 1
+        if len(report.errors) < max_errors:
+            report.errors.append(IngestError(line=line, error=error))
+        else:
+            report.errors_truncated = True
     
-    session.commit()
+    async def flush() -> None:
+        events = await session.run_sync(
+            log_events, [(event.action_id, event.status, event.failure_reason) for _, event in pending]
+        )
+        session.expunge_all()
+        report.accepted += len(events)
+        found = {event.action_id for event in events}
+        for line, event in pending:
+            if event.action_id not in found:
+                reject(line, "Action not found")
+        pending.clear()
     
-    return events
+    async for line in ndjson_lines(chunks, max_line_bytes):
+        report.lines += 1
+        if line is None:
+            reject(report.lines, f"Line longer than {max_line_bytes} bytes")
+            continue
+        if not line.strip():
+            continue
+        try:
+            pending.append((report.lines, LogEventRequest.model_validate_json(line)))
+        except ValidationError as e:
+            reject(report.lines, describe(e))
+        if len(pending) >= chunk_size:
+            await flush()
+    if pending:
+        await flush()
+    return report
+
+
+@router.post("/stream", response_model=IngestReport)
+async def ingest_event_stream(request: Request, session: AsyncSession = Depends(get_async_session)):
+    """Log events from an NDJSON body, one LogEventRequest per line."""
+    return await ingest_ndjson(session, request.stream())
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from app.db import get_async_read_session
+from app.models import EnergyLevel, MESResponse
+from app.services.mes import global_mes_queue
+
+
+router = APIRouter(prefix="/mes", tags=["mes"])
+
+
+@router.get("/", response_model=List[MESResponse])
+async def get_global_mes(
+    limit: int = 5,
+    energy_level: Optional[EnergyLevel] = None,
+    time_budget: Optional[int] = None,
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    """Top ready actions across all active goals.
+    
+    `energy_level` keeps actions that need at most that much energy;
+    `time_budget` (minutes) keeps actions that fit into it.
+    """
+    await session.run_sync(global_mes_queue.ensure_loaded)
+    return global_mes_queue.top(limit, energy_level, time_budget)
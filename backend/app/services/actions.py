@@ -0,0 +1,97 @@
+from typing import Dict, List, Optional
+import json
+from sqlalchemy import and_, or_, update, delete
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+from app.models import Action, ActionDependency, ActionStatus, EnergyLevel, Goal
+from app.services.graph import find_back_edges
+
+
+def create_actions(session: Session, goal: Goal, steps: List[dict]) -> List[Action]:
+    """Persist decomposition steps and their dependency edges.
+    
+    Step dependencies are indices into `steps`; they are stored as action ids.
+    Out-of-range and self references are dropped, and so is every edge that
+    closes a cycle (counted in `goal.cycles_broken`).
+    """
+    actions = []
+    for step in steps:
+        action = Action(
+            goal_id=goal.id,
+            description=step["description"],
+            duration_min=step["duration_min"],
+            energy_level=EnergyLevel(step["energy_level"]),
+            priority=step.get("priority", 5),
+            atomic=True
+        )
+        session.add(action)
+        actions.append(action)
+    session.flush()
+    
+    edges: Dict[int, List[int]] = {}
+    for idx, step in enumerate(steps):
+        for dep in step.get("dependencies", []):
+            if isinstance(dep, int) and 0 <= dep < len(actions) and dep != idx and dep not in edges.get(idx, []):
+                edges.setdefault(idx, []).append(dep)
+    back_edges = find_back_edges(range(len(steps)), edges)
+    for idx, dep in back_edges:
+        edges[idx].remove(dep)
+    goal.cycles_broken = len(back_edges)
+    session.add(goal)
+    
+    for idx, action in enumerate(actions):
+        dep_ids = [actions[dep].id for dep in edges.get(idx, [])]
+        for dep_id in dep_ids:
+            session.add(ActionDependency(action_id=action.id, depends_on_id=dep_id, goal_id=goal.id))
+        action.dependencies = json.dumps(dep_ids)
+        action.status = ActionStatus.pending if dep_ids else ActionStatus.available
+        session.add(action)
+    
+    return actions
+
+
+def delete_actions(session: Session, goal_id: int) -> None:
+    session.exec(delete(ActionDependency).where(ActionDependency.goal_id == goal_id))
+    session.exec(delete(Action).where(Action.goal_id == goal_id))
+
+
+def _unmet_dependency():
+    dep = aliased(Action)
+    return (
+        select(ActionDependency.action_id)
+        .outerjoin(dep, dep.id == ActionDependency.depends_on_id)
+        .where(ActionDependency.action_id == Action.id)
+        .where(or_(dep.id.is_(None), dep.status != ActionStatus.done))
+        .exists()
+    )
+
+
+def ready_condition():
+    """SQL predicate: action is not done/blocked and every dependency is done."""
+    return and_(
+        Action.status.not_in([ActionStatus.done, ActionStatus.blocked]),
+        ~_unmet_dependency()
+    )
+
+
+def ready_actions(session: Session, goal_id: Optional[int] = None) -> List[Action]:
+    statement = select(Action).where(ready_condition())
+    if goal_id is not None:
+        statement = statement.where(Action.goal_id == goal_id)
+    return list(session.exec(statement.order_by(Action.priority.desc(), Action.duration_min)).all())
+
+
+def promote_ready_dependents(session: Session, action_ids: List[int]) -> int:
+    """Move pending dependents of `action_ids` to available once all their deps are done."""
+    if not action_ids:
+        return 0
+    dependents = select(ActionDependency.action_id).where(ActionDependency.depends_on_id.in_(action_ids))
+    result = session.exec(
+        update(Action)
+        .where(Action.id.in_(dependents))
+        .where(Action.status == ActionStatus.pending)
+        .where(~_unmet_dependency())
+        .values(status=ActionStatus.available)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
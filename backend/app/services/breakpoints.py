@@ -1,6 +1,56 @@
-from typing import List
-from app.models import CompletionEvent, BreakpointPattern, Breakpoint
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from collections import Counter, OrderedDict
+from threading import Lock
+from datetime import datetime, timedelta
+import json
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+from app.config import settings
+from app.models import CompletionEvent, CompletionStatus, BreakpointPattern, Breakpoint
+from app.services.event_store import EPOCH, NO_REASON, active_store
+from app.services.rollups import move_breakpoints
+from app.services.stats import stats_service
+
+
+# session.info keys. The detector counters move before the transaction
+# commits, so the open transaction's touched actions and pattern changes are
+# kept until it ends; committed changes wait for `after_commit`.
+TOUCHED_ACTIONS = "breakpoint_touched_actions"
+PATTERN_CHANGES = "breakpoint_pattern_changes"
+COMMITTED_CHANGES = "breakpoint_committed_changes"
+
+
+@event.listens_for(Session, "after_commit")
+def _keep_committed(session: Session) -> None:
+    session.info.pop(TOUCHED_ACTIONS, None)
+    if PATTERN_CHANGES in session.info:
+        session.info.setdefault(COMMITTED_CHANGES, []).extend(session.info.pop(PATTERN_CHANGES))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_uncommitted(session: Session, transaction) -> None:
+    """A transaction that ends without commit (rollback, failed commit,
+    close) drops its pattern changes, and its actions are reseeded from
+    history next time instead of keeping counts of events never stored."""
+    if transaction.parent is not None:
+        return
+    session.info.pop(PATTERN_CHANGES, None)
+    for service, action_ids in session.info.pop(TOUCHED_ACTIONS, []):
+        for action_id in action_ids:
+            service.forget(action_id)
+
+
+def classify_reason(reason: Optional[str]) -> BreakpointPattern:
+    if reason:
+        if "energy" in reason:
+            return BreakpointPattern.energy
+        if "clarity" in reason:
+            return BreakpointPattern.clarity
+        if "external" in reason:
+            return BreakpointPattern.external
+    return BreakpointPattern.time
 
 
 def detect_breakpoints(events: List[CompletionEvent]) -> List[dict]:
@@ -17,14 +67,7 @@ def detect_breakpoints(events: List[CompletionEvent]) -> List[dict]:
         if len(failures) >= 2:
             reasons = [f.failure_reason for f in failures if f.failure_reason]
             
-            pattern = BreakpointPattern.time
-            if reasons:
-                if "energy" in reasons[0]:
-                    pattern = BreakpointPattern.energy
-                elif "clarity" in reasons[0]:
-                    pattern = BreakpointPattern.clarity
-                elif "external" in reasons[0]:
-                    pattern = BreakpointPattern.external
+            pattern = classify_reason(reasons[0] if reasons else None)
             
             breakpoints.append({
                 "action_id": action_id,
@@ -34,3 +77,202 @@ def detect_breakpoints(events: List[CompletionEvent]) -> List[dict]:
             })
     
     return breakpoints
+
+
+class FailureState:
+    """Running failure statistics for one action."""
+    
+    __slots__ = ("count", "score", "last_at", "reasons", "patterns")
+    
+    def __init__(self):
+        self.count = 0
+        self.score = 0.0
+        self.last_at: Optional[datetime] = None
+        self.reasons: Counter = Counter()
+        self.patterns: Counter = Counter()
+    
+    def add(self, at: datetime, reason: Optional[str], half_life_hours: Optional[float]) -> None:
+        self.score = self.decayed_score(at, half_life_hours) + 1
+        self.last_at = at if self.last_at is None else max(self.last_at, at)
+        self.count += 1
+        if reason:
+            self.reasons[reason] += 1
+            self.patterns[classify_reason(reason)] += 1
+    
+    def decayed_score(self, at: datetime, half_life_hours: Optional[float]) -> float:
+        if not half_life_hours or self.last_at is None:
+            return self.score
+        elapsed_hours = max((at - self.last_at).total_seconds(), 0) / 3600
+        return self.score * 0.5 ** (elapsed_hours / half_life_hours)
+    
+    @property
+    def pattern(self) -> BreakpointPattern:
+        if not self.patterns:
+            return BreakpointPattern.time
+        return self.patterns.most_common(1)[0][0]
+
+
+class BreakpointService:
+    """Stateful breakpoint detector updated in O(1) per event.
+    
+    Per-action counters live in a bounded LRU and are seeded from history
+    the first time an action is seen. With `half_life_hours` each failure's
+    weight halves every half-life, so old failures stop counting toward
+    `threshold`.
+    """
+    
+    def __init__(
+        self,
+        threshold: float = 2,
+        half_life_hours: Optional[float] = None,
+        max_actions: int = 10000,
+        max_reasons: int = 20
+    ):
+        self.threshold = threshold
+        self.half_life_hours = half_life_hours
+        self.max_actions = max_actions
+        self.max_reasons = max_reasons
+        self._states: "OrderedDict[int, FailureState]" = OrderedDict()
+        self._lock = Lock()
+    
+    def record_many(self, session: Session, events: List[CompletionEvent]) -> List[Breakpoint]:
+        """Fold a batch of flushed events into the counters; unseen actions
+        are seeded with one history query. Actions that reach the threshold
+        get their Breakpoint row upserted (without committing), at most once
+        each. The stats snapshot is patched by `after_commit`."""
+        failures: Dict[int, List[CompletionEvent]] = {}
+        for event in events:
+            if event.status == CompletionStatus.failed:
+                failures.setdefault(event.action_id, []).append(event)
+        if not failures:
+            return []
+        
+        ids = [event.id for batch in failures.values() for event in batch]
+        states = self._states_for(session, list(failures), before_event_id=None if None in ids else min(ids))
+        session.info.setdefault(TOUCHED_ACTIONS, []).append((self, list(failures)))
+        reached = []
+        for action_id, batch in failures.items():
+            state = states[action_id]
+            with self._lock:
+                for event in batch:
+                    state.add(event.timestamp, event.failure_reason, self.half_life_hours)
+                if state.score < self.threshold:
+                    continue
+            reached.append((action_id, state, batch[-1].timestamp))
+        return self._upsert(session, reached)
+    
+    def after_commit(self, session: Session) -> None:
+        """Patch the stats snapshot with the pattern changes `session` just
+        committed; call it after each commit that recorded events."""
+        changes = session.info.pop(COMMITTED_CHANGES, [])
+        if changes:
+            stats_service.on_breakpoints(changes)
+    
+    def forget(self, action_id: int) -> None:
+        with self._lock:
+            self._states.pop(action_id, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+    
+    def _states_for(self, session: Session, action_ids: List[int], before_event_id: Optional[int] = None) -> Dict[int, FailureState]:
+        states: Dict[int, FailureState] = {}
+        with self._lock:
+            for action_id in action_ids:
+                state = self._states.get(action_id)
+                if state is not None:
+                    self._states.move_to_end(action_id)
+                    states[action_id] = state
+        missing = [action_id for action_id in action_ids if action_id not in states]
+        if not missing:
+            return states
+        
+        seeded = {action_id: FailureState() for action_id in missing}
+        for action_id, timestamp, reason in self._history(session, missing, before_event_id):
+            seeded[action_id].add(timestamp, reason, self.half_life_hours)
+        
+        with self._lock:
+            for action_id, state in seeded.items():
+                self._states[action_id] = state
+            while len(self._states) > self.max_actions:
+                self._states.popitem(last=False)
+        states.update(seeded)
+        return states
+    
+    def _history(self, session: Session, action_ids: List[int], before_event_id: Optional[int]):
+        """Past failures of the actions as (action_id, timestamp, reason),
+        oldest first per action. The column store only holds committed
+        events, so the events being recorded are never in it."""
+        store = active_store()
+        if store is not None:
+            # One masked pass over the columns, then a stable sort by action
+            # splits it into per-action runs that stay oldest first.
+            found, timestamps, reasons = store.failures(action_ids)
+            order = np.argsort(found, kind="stable")
+            found, timestamps, reasons = found[order], timestamps[order], reasons[order]
+            ids, starts = np.unique(found, return_index=True)
+            history = []
+            for action_id, micros, codes in zip(ids.tolist(), np.split(timestamps, starts[1:]), np.split(reasons, starts[1:])):
+                history.extend(
+                    (action_id, EPOCH + timedelta(microseconds=micros), store.reasons[code] if code != NO_REASON else None)
+                    for micros, code in zip(micros.tolist(), codes.tolist())
+                )
+            return history
+        
+        statement = (
+            select(CompletionEvent.action_id, CompletionEvent.timestamp, CompletionEvent.failure_reason)
+            .where(CompletionEvent.action_id.in_(action_ids))
+            .where(CompletionEvent.status == CompletionStatus.failed)
+            .order_by(CompletionEvent.timestamp)
+        )
+        if before_event_id is not None:
+            statement = statement.where(CompletionEvent.id < before_event_id)
+        return session.exec(statement).all()
+    
+    def _upsert(self, session: Session, reached: List[Tuple[int, FailureState, datetime]]) -> List[Breakpoint]:
+        if not reached:
+            return []
+        action_ids = [action_id for action_id, _, _ in reached]
+        previous = {
+            action_id: (pattern, detected_at)
+            for action_id, pattern, detected_at in session.exec(
+                select(Breakpoint.action_id, Breakpoint.pattern, Breakpoint.detected_at)
+                .where(Breakpoint.action_id.in_(action_ids))
+            ).all()
+        }
+        
+        rows = [
+            {
+                "action_id": action_id,
+                "failure_count": state.count,
+                "pattern": state.pattern,
+                "reasons": json.dumps([reason for reason, _ in state.reasons.most_common(self.max_reasons)]),
+                "detected_at": at
+            }
+            for action_id, state, at in reached
+        ]
+        statement = insert(Breakpoint)
+        session.exec(
+            statement.on_conflict_do_update(
+                index_elements=["action_id"],
+                set_={column: statement.excluded[column] for column in ("failure_count", "pattern", "reasons", "detected_at")}
+            ),
+            params=rows
+        )
+        
+        moves = [(previous.get(row["action_id"]), (row["pattern"], row["detected_at"])) for row in rows]
+        move_breakpoints(session, moves)
+        session.info.setdefault(PATTERN_CHANGES, []).extend(
+            (moved[0] if moved else None, current[0]) for moved, current in moves
+        )
+        return list(session.exec(
+            select(Breakpoint).where(Breakpoint.action_id.in_(action_ids)).execution_options(populate_existing=True)
+        ).all())
+
+
+breakpoint_service = BreakpointService(
+    threshold=settings.breakpoint_threshold,
+    half_life_hours=settings.breakpoint_half_life_hours,
+    max_actions=settings.breakpoint_state_size
+)
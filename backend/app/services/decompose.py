@@ -1,9 +1,26 @@
-from typing import List
-from openai import OpenAI
+from typing import AsyncIterator, List, Optional
+import hashlib
+import json
+from openai import AsyncOpenAI
 from app.config import settings
+from app.core.disk_cache import DiskCache
 from pydantic import BaseModel
 
 
+TEMPERATURE = 0.7
+
+completion_cache = DiskCache(
+    settings.llm_cache_path,
+    table="completions",
+    ttl_seconds=settings.llm_cache_ttl,
+    max_bytes=settings.llm_cache_max_bytes
+)
+
+
+class IncompleteDecomposition(Exception):
+    pass
+
+
 class ActionDecomposition(BaseModel):
     description: str
     duration_min: int
@@ -11,19 +28,18 @@ class ActionDecomposition(BaseModel):
     dependencies: List[int] = []
 
 
-def decompose_goal(goal_description: str) -> List[ActionDecomposition]:
-    if not settings.openai_api_key:
-        return [
-            ActionDecomposition(
-                description=f"Step 1 for: {goal_description}",
-                duration_min=30,
-                energy_level="medium",
-                dependencies=[]
-            )
-        ]
-    
-    client = OpenAI(api_key=settings.openai_api_key)
-    
+def fallback_decomposition(goal_description: str) -> List[ActionDecomposition]:
+    return [
+        ActionDecomposition(
+            description=f"Step 1 for: {goal_description}",
+            duration_min=30,
+            energy_level="medium",
+            dependencies=[]
+        )
+    ]
+
+
+def build_messages(goal_description: str) -> List[dict]:
     prompt = f"""Break down this goal into 3-7 atomic actions. Each action should be:
 - Measurable and completable in ≤60 minutes
 - Clearly defined with specific outcomes
@@ -35,16 +51,128 @@ Return JSON array with format:
 [{{"description": "...", "duration_min": 30, "energy_level": "medium", "dependencies": []}}]
 
 Keep it practical and atomic."""
+    return [
+        {"role": "system", "content": "You are a goal decomposition expert. Break goals into atomic, measurable steps."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_decomposition(content: str) -> List[ActionDecomposition]:
+    return [ActionDecomposition(**item) for item in json.loads(content)]
+
+
+class StepParser:
+    """Incremental parser for a streamed JSON array of step objects.
+    
+    `feed` returns the objects closed by the chunk. Text outside top-level
+    objects (brackets, commas, a markdown fence) is skipped.
+    """
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a goal decomposition expert. Break goals into atomic, measurable steps."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7
-    )
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
     
-    import json
-    result = json.loads(response.choices[0].message.content)
-    return [ActionDecomposition(**item) for item in result]
+    def feed(self, chunk: str) -> List[dict]:
+        objects = []
+        for char in chunk:
+            if not self._depth:
+                if char == "{":
+                    self._depth = 1
+                    self._buffer = [char]
+                continue
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if not self._depth:
+                    objects.append(json.loads("".join(self._buffer)))
+        return objects
+
+
+def completion_key(model: str, messages: List[dict], temperature: float) -> str:
+    payload = json.dumps({"model": model, "messages": messages, "temperature": temperature}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cached_steps(key: str, use_cache: bool = True) -> Optional[List[ActionDecomposition]]:
+    """Steps stored for a completion key; `use_cache=False` skips the lookup
+    but the fresh answer still replaces the entry."""
+    if not (use_cache and settings.llm_cache_enabled):
+        return None
+    value = completion_cache.get(key)
+    return parse_decomposition(value.decode()) if value is not None else None
+
+
+def store_steps(key: str, steps: List[ActionDecomposition]) -> None:
+    if steps and settings.llm_cache_enabled:
+        completion_cache.set(key, json.dumps([step.model_dump() for step in steps]).encode())
+
+
+class DecomposeService:
+    """Async decomposition for the routes, so a slow completion only parks a
+    coroutine instead of holding a threadpool worker."""
+    
+    def __init__(self):
+        self._client: Optional[AsyncOpenAI] = None
+    
+    def _get_client(self) -> AsyncOpenAI:
+        if self._client is None:
+            self._client = AsyncOpenAI(api_key=settings.openai_api_key)
+        return self._client
+    
+    async def stream(self, goal_description: str, use_cache: bool = True) -> AsyncIterator[ActionDecomposition]:
+        """Yield each step as soon as its JSON object is complete in the streamed completion.
+        
+        A cached answer is replayed instead. Only a stream the model finished
+        on its own is cached; one cut short (e.g. by the token limit) raises
+        `IncompleteDecomposition` after its last complete step.
+        """
+        if not settings.openai_api_key:
+            for step in fallback_decomposition(goal_description):
+                yield step
+            return
+        
+        messages = build_messages(goal_description)
+        key = completion_key(settings.decompose_model, messages, TEMPERATURE)
+        cached = cached_steps(key, use_cache)
+        if cached is not None:
+            for step in cached:
+                yield step
+            return
+        
+        response = await self._get_client().chat.completions.create(
+            model=settings.decompose_model,
+            messages=messages,
+            temperature=TEMPERATURE,
+            stream=True
+        )
+        parser = StepParser()
+        steps = []
+        finish_reason = None
+        async for chunk in response:
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            if chunk.choices[0].delta.content:
+                for item in parser.feed(chunk.choices[0].delta.content):
+                    step = ActionDecomposition(**item)
+                    steps.append(step)
+                    yield step
+        if finish_reason != "stop":
+            raise IncompleteDecomposition(f"Completion ended with finish_reason={finish_reason}")
+        store_steps(key, steps)
+
+
+decompose_service = DecomposeService()
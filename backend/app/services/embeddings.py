@@ -1,22 +1,104 @@
-from typing import List
-from openai import OpenAI
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from threading import Lock
+from openai import AsyncOpenAI, OpenAI
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.config import settings
-from app.models import Goal
+from app.core.disk_cache import DiskCache
+from app.models import Goal, GoalEmbedding, GoalStatus
+from app.services.vector_index import VectorIndex, create_index, normalize
+import hashlib
 import numpy as np
 
 
-def get_embedding(text: str) -> List[float]:
-    if not settings.openai_api_key:
-        return []
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+embedding_cache = DiskCache(settings.embedding_cache_path, table="embeddings")
+
+
+def _get_client() -> OpenAI:
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=settings.openai_api_key)
+    return _client
+
+
+def _get_async_client() -> AsyncOpenAI:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(api_key=settings.openai_api_key)
+    return _async_client
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def embedding_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\n{normalize_text(text)}".encode()).hexdigest()
+
+
+def _lookup(texts: List[str]) -> Tuple[List[str], Dict[str, bytes], List[List[Tuple[str, str]]]]:
+    """Cache keys, cached vectors and the deduplicated misses split into API batches."""
+    keys = [embedding_key(text, settings.embedding_model) for text in texts]
+    vectors = embedding_cache.get_many(set(keys))
     
-    client = OpenAI(api_key=settings.openai_api_key)
+    missing: dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors and key not in missing:
+            missing[key] = normalize_text(text)
     
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
+    pending = list(missing.items())
+    batch_size = max(settings.embedding_batch_size, 1)
+    return keys, vectors, [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+
+
+def _store(batch: List[Tuple[str, str]], response, vectors: Dict[str, bytes]) -> None:
+    fresh = {
+        batch[item.index][0]: np.asarray(item.embedding, dtype=np.float32).tobytes()
+        for item in response.data
+    }
+    embedding_cache.set_many(fresh)
+    vectors.update(fresh)
+
+
+def _decode(keys: List[str], vectors: Dict[str, bytes]) -> List[List[float]]:
+    return [np.frombuffer(vectors[key], dtype=np.float32).tolist() for key in keys]
+
+
+def get_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embed many texts, reusing cached vectors and batching the misses."""
+    if not settings.openai_api_key:
+        return [[] for _ in texts]
+    
+    keys, vectors, batches = _lookup(texts)
+    for batch in batches:
+        response = _get_client().embeddings.create(
+            model=settings.embedding_model,
+            input=[text for _, text in batch]
+        )
+        _store(batch, response, vectors)
+    return _decode(keys, vectors)
+
+
+async def get_embeddings_async(texts: List[str]) -> List[List[float]]:
+    """`get_embeddings` with the asyncio client."""
+    if not settings.openai_api_key:
+        return [[] for _ in texts]
     
-    return response.data[0].embedding
+    keys, vectors, batches = _lookup(texts)
+    for batch in batches:
+        response = await _get_async_client().embeddings.create(
+            model=settings.embedding_model,
+            input=[text for _, text in batch]
+        )
+        _store(batch, response, vectors)
+    return _decode(keys, vectors)
+
+
+def get_embedding(text: str) -> List[float]:
+    return get_embeddings([text])[0]
 
 
 def cosine_similarity(a: List[float], b: List[float]) -> float:
@@ -29,27 +111,265 @@ def cosine_similarity(a: List[float], b: List[float]) -> float:
     return float(np.dot(arr_a, arr_b) / (np.linalg.norm(arr_a) * np.linalg.norm(arr_b)))
 
 
-def find_similar_goals(target_goal: Goal, all_goals: List[Goal], threshold: float = 0.7) -> List[dict]:
-    target_embedding = get_embedding(target_goal.description)
+class EmbeddingStore:
+    """In-memory similarity index over stored goal embeddings.
     
-    if not target_embedding:
-        return []
+    The search structure is pluggable (see `vector_index`); the store adds
+    locking and lazy loading from the `goalembedding` table.
+    """
     
-    similarities = []
-    for goal in all_goals:
-        if goal.id == target_goal.id:
-            continue
+    def __init__(self, index_factory: Optional[Callable[[], VectorIndex]] = None):
+        self._index_factory = index_factory or _default_index
+        self._lock = Lock()
+        self.clear()
+    
+    def clear(self) -> None:
+        self.index = self._index_factory()
+        self.loaded = False
+    
+    def __len__(self) -> int:
+        return len(self.index)
+    
+    def __contains__(self, goal_id: int) -> bool:
+        return goal_id in self.index
+    
+    def load(self, session: Session) -> None:
+        rows = session.exec(
+            select(GoalEmbedding)
+            .join(Goal, Goal.id == GoalEmbedding.goal_id)
+            .where(GoalEmbedding.model == settings.embedding_model)
+            .where(Goal.status != GoalStatus.cancelled)
+        ).all()
+        with self._lock:
+            self.clear()
+            for row in rows:
+                self.index.upsert(row.goal_id, np.frombuffer(row.vector, dtype=np.float32))
+            self.loaded = True
+    
+    def ensure_loaded(self, session: Session) -> None:
+        if not self.loaded:
+            self.load(session)
+    
+    def get(self, goal_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            return self.index.get(goal_id)
+    
+    def upsert(self, goal_id: int, vector) -> None:
+        with self._lock:
+            self.index.upsert(goal_id, vector)
+    
+    def remove(self, goal_id: int) -> None:
+        with self._lock:
+            self.index.remove(goal_id)
+    
+    def top_k(
+        self,
+        vector,
+        k: int = 5,
+        threshold: float = -1.0,
+        exclude_id: Optional[int] = None,
+        exact_vectors: Optional[Callable[[List[int]], Dict[int, np.ndarray]]] = None,
+        rerank_factor: int = 1
+    ) -> List[Tuple[int, float]]:
+        """Top-k by cosine similarity.
         
-        goal_embedding = get_embedding(goal.description)
-        similarity = cosine_similarity(target_embedding, goal_embedding)
+        With `exact_vectors` and `rerank_factor > 1`, `k * rerank_factor`
+        candidates are pulled from the (possibly quantized) index and
+        re-scored against full-precision vectors.
+        """
+        rerank = exact_vectors is not None and rerank_factor > 1
+        with self._lock:
+            hits = self.index.search(vector, k * rerank_factor if rerank else k, exclude_id=exclude_id)
         
-        if similarity >= threshold:
-            similarities.append({
-                "goal_id": goal.id,
-                "description": goal.description,
-                "similarity": similarity
-            })
+        if rerank and hits:
+            exact = exact_vectors([goal_id for goal_id, _ in hits])
+            query = normalize(vector)
+            hits = sorted(
+                (
+                    (goal_id, float(normalize(exact[goal_id]) @ query) if goal_id in exact else score)
+                    for goal_id, score in hits
+                ),
+                key=lambda hit: hit[1],
+                reverse=True
+            )[:k]
+        
+        return [(goal_id, score) for goal_id, score in hits if score >= threshold]
+
+
+def _default_index() -> VectorIndex:
+    if settings.similarity_index == "ivf":
+        return create_index(
+            "ivf",
+            nlist=settings.ivf_nlist,
+            nprobe=settings.ivf_nprobe,
+            dtype=settings.embedding_dtype
+        )
+    return create_index(settings.similarity_index, dtype=settings.embedding_dtype)
+
+
+embedding_store = EmbeddingStore()
+
+
+def index_goals(
+    session: Session,
+    goals: List[Goal],
+    vectors: Optional[List[List[float]]] = None
+) -> List[int]:
+    """Embed goal descriptions in one batch and persist them next to the goals.
+    
+    Pass `vectors` (one per goal) when they were fetched already.
+    """
+    goals = [goal for goal in goals if goal.id is not None]
+    if vectors is None:
+        vectors = get_embeddings([goal.description for goal in goals])
+    
+    existing = {
+        row.goal_id: row
+        for row in session.exec(
+            select(GoalEmbedding).where(GoalEmbedding.goal_id.in_([goal.id for goal in goals]))
+        ).all()
+    } if goals else {}
+    
+    indexed = []
+    for goal, vector in zip(goals, vectors):
+        if not vector:
+            continue
+        arr = np.asarray(vector, dtype=np.float32)
+        row = existing.get(goal.id) or GoalEmbedding(goal_id=goal.id, model="", dim=0, vector=b"")
+        row.model = settings.embedding_model
+        row.dim = arr.shape[0]
+        row.vector = arr.tobytes()
+        row.updated_at = datetime.utcnow()
+        session.add(row)
+        indexed.append((goal, arr))
+    
+    if not indexed:
+        return []
+    session.commit()
     
-    similarities.sort(key=lambda x: x["similarity"], reverse=True)
-    return similarities[:5]
+    load_embeddings(session)
+    for goal, arr in indexed:
+        if goal.status != GoalStatus.cancelled:
+            embedding_store.upsert(goal.id, arr)
+    return [goal.id for goal, _ in indexed]
+
+
+def index_goal(session: Session, goal: Goal) -> bool:
+    """Embed the goal description and persist it next to the goal."""
+    return bool(index_goals(session, [goal]))
+
+
+async def index_goal_async(session: AsyncSession, goal: Goal) -> bool:
+    vectors = await get_embeddings_async([goal.description])
+    await load_embeddings_async(session)
+    return bool(await session.run_sync(index_goals, [goal], vectors))
+
+
+def _missing_embeddings(session: Session) -> List[Goal]:
+    return list(session.exec(
+        select(Goal)
+        .where(Goal.status != GoalStatus.cancelled)
+        .where(Goal.id.not_in(
+            select(GoalEmbedding.goal_id).where(GoalEmbedding.model == settings.embedding_model)
+        ))
+    ).all())
+
 
+def load_embeddings(session: Session) -> None:
+    """Load stored embeddings and backfill goals that have none yet."""
+    if embedding_store.loaded:
+        return
+    embedding_store.load(session)
+    missing = _missing_embeddings(session)
+    if missing:
+        index_goals(session, missing)
+
+
+async def load_embeddings_async(session: AsyncSession) -> None:
+    """`load_embeddings` that awaits the backfill embeddings off the event loop."""
+    if embedding_store.loaded:
+        return
+    await session.run_sync(embedding_store.load)
+    missing = await session.run_sync(_missing_embeddings)
+    if missing:
+        vectors = await get_embeddings_async([goal.description for goal in missing])
+        await session.run_sync(index_goals, missing, vectors)
+
+
+def sync_goal_embedding(session: Session, goal: Goal) -> None:
+    """Drop cancelled goals from the similarity index and restore reactivated ones."""
+    if not embedding_store.loaded:
+        return
+    if goal.status == GoalStatus.cancelled:
+        embedding_store.remove(goal.id)
+        return
+    if goal.id in embedding_store:
+        return
+    row = session.get(GoalEmbedding, goal.id)
+    if row is not None and row.model == settings.embedding_model:
+        embedding_store.upsert(goal.id, np.frombuffer(row.vector, dtype=np.float32))
+
+
+def load_exact_vectors(session: Session, goal_ids: List[int]) -> Dict[int, np.ndarray]:
+    rows = session.exec(
+        select(GoalEmbedding)
+        .where(GoalEmbedding.goal_id.in_(goal_ids))
+        .where(GoalEmbedding.model == settings.embedding_model)
+    ).all()
+    return {row.goal_id: np.frombuffer(row.vector, dtype=np.float32) for row in rows}
+
+
+async def find_similar_goals_async(
+    session: AsyncSession,
+    target_goal: Goal,
+    limit: int = 5,
+    threshold: Optional[float] = None
+) -> List[dict]:
+    await load_embeddings_async(session)
+    if target_goal.id not in embedding_store and not await index_goal_async(session, target_goal):
+        return []
+    return await session.run_sync(find_similar_goals, target_goal, limit, threshold)
+
+
+def find_similar_goals(
+    session: Session,
+    target_goal: Goal,
+    limit: int = 5,
+    threshold: Optional[float] = None
+) -> List[dict]:
+    if threshold is None:
+        threshold = settings.similarity_threshold
+    
+    load_embeddings(session)
+    if target_goal.id not in embedding_store and not index_goal(session, target_goal):
+        return []
+    
+    target_row = session.get(GoalEmbedding, target_goal.id)
+    target_embedding = (
+        np.frombuffer(target_row.vector, dtype=np.float32) if target_row else embedding_store.get(target_goal.id)
+    )
+    hits = embedding_store.top_k(
+        target_embedding,
+        limit,
+        threshold,
+        exclude_id=target_goal.id,
+        exact_vectors=lambda goal_ids: load_exact_vectors(session, goal_ids),
+        rerank_factor=settings.embedding_rerank_factor if settings.embedding_dtype != "float32" else 1
+    )
+    if not hits:
+        return []
+    
+    goals = {
+        goal.id: goal
+        for goal in session.exec(select(Goal).where(Goal.id.in_([goal_id for goal_id, _ in hits]))).all()
+    }
+    
+    return [
+        {
+            "goal_id": goal_id,
+            "description": goals[goal_id].description,
+            "similarity": similarity
+        }
+        for goal_id, similarity in hits
+        if goal_id in goals
+    ]
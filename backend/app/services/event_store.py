@@ -0,0 +1,185 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from threading import Lock
+from datetime import datetime, timedelta
+import numpy as np
+from sqlmodel import Session, select
+from app.models import CompletionEvent, CompletionStatus
+
+
+EPOCH = datetime(1970, 1, 1)
+STATUSES = list(CompletionStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+NO_REASON = -1
+
+
+def to_micros(at: datetime) -> int:
+    return (at - EPOCH) // timedelta(microseconds=1)
+
+
+class EventColumnStore:
+    """Append-only NumPy columns of completion events for vectorized analytics.
+    
+    Columns: int32 action/goal ids, uint8 status codes, int64 UTC microsecond
+    timestamps and int32 codes into a dictionary of failure reasons
+    (`NO_REASON` when empty). Buffers double on growth.
+    """
+    
+    def __init__(self, initial_capacity: int = 1 << 16):
+        self._lock = Lock()
+        self._initial_capacity = initial_capacity
+        self.clear()
+    
+    def clear(self) -> None:
+        capacity = self._initial_capacity
+        self._action_id = np.zeros(capacity, dtype=np.int32)
+        self._goal_id = np.zeros(capacity, dtype=np.int32)
+        self._status = np.zeros(capacity, dtype=np.uint8)
+        self._timestamp = np.zeros(capacity, dtype=np.int64)
+        self._reason = np.zeros(capacity, dtype=np.int32)
+        self.reasons: List[str] = []
+        self._reason_codes: Dict[str, int] = {}
+        self._size = 0
+        self.loaded = False
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns())
+    
+    def load(self, session: Session, chunk_size: int = 100_000) -> None:
+        result = session.exec(
+            select(
+                CompletionEvent.action_id,
+                CompletionEvent.goal_id,
+                CompletionEvent.status,
+                CompletionEvent.timestamp,
+                CompletionEvent.failure_reason
+            )
+            .order_by(CompletionEvent.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        with self._lock:
+            self.clear()
+            for rows in result.partitions():
+                self._append_rows(rows)
+            self.loaded = True
+    
+    def append(self, event: CompletionEvent) -> None:
+        self.extend([event])
+    
+    def extend(self, events: Iterable[CompletionEvent]) -> None:
+        rows = [
+            (event.action_id, event.goal_id, event.status, event.timestamp, event.failure_reason)
+            for event in events
+        ]
+        with self._lock:
+            self._append_rows(rows)
+    
+    def extend_columns(
+        self,
+        action_id: np.ndarray,
+        goal_id: np.ndarray,
+        status: np.ndarray,
+        timestamp: np.ndarray,
+        reason: np.ndarray,
+        reasons: List[str]
+    ) -> None:
+        """Bulk append pre-encoded columns; `reason` indexes into `reasons`."""
+        with self._lock:
+            remap = np.array([self._reason_code(text) for text in reasons] + [NO_REASON], dtype=np.int32)
+            self._append_columns(action_id, goal_id, status, timestamp, remap[reason])
+    
+    def status_counts(self, since: Optional[datetime] = None) -> Dict[CompletionStatus, int]:
+        _, _, status, _, _ = self._view(since)
+        counts = np.bincount(status, minlength=len(STATUSES))
+        return {STATUSES[code]: int(count) for code, count in enumerate(counts)}
+    
+    def reason_counts(
+        self,
+        status: CompletionStatus = CompletionStatus.failed,
+        since: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        _, _, statuses, _, reason = self._view(since)
+        reason = reason[(statuses == STATUS_CODES[status]) & (reason != NO_REASON)]
+        counts = np.bincount(reason, minlength=len(self.reasons))
+        return {self.reasons[code]: int(counts[code]) for code in np.flatnonzero(counts)}
+    
+    def action_counts(
+        self,
+        status: CompletionStatus = CompletionStatus.failed,
+        since: Optional[datetime] = None,
+        min_count: int = 1
+    ) -> List[Tuple[int, int]]:
+        action_id, _, statuses, _, _ = self._view(since)
+        ids, counts = np.unique(action_id[statuses == STATUS_CODES[status]], return_counts=True)
+        keep = counts >= min_count
+        return list(zip(ids[keep].tolist(), counts[keep].tolist()))
+    
+    def failures(self, action_ids: Optional[Iterable[int]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(action ids, timestamps, reason codes) of failed events, oldest
+        first; only those of `action_ids` when given."""
+        ids, _, statuses, timestamps, reason = self._view(None)
+        mask = statuses == STATUS_CODES[CompletionStatus.failed]
+        if action_ids is not None:
+            mask &= np.isin(ids, np.fromiter(action_ids, dtype=ids.dtype))
+        order = np.argsort(timestamps[mask], kind="stable")
+        return ids[mask][order], timestamps[mask][order], reason[mask][order]
+    
+    def _view(self, since: Optional[datetime]):
+        with self._lock:
+            size = self._size
+            columns = [column[:size] for column in self._columns()]
+        if since is not None:
+            mask = columns[3] >= to_micros(since)
+            columns = [column[mask] for column in columns]
+        return columns
+    
+    def _columns(self):
+        return (self._action_id, self._goal_id, self._status, self._timestamp, self._reason)
+    
+    def _reason_code(self, reason: Optional[str]) -> int:
+        if not reason:
+            return NO_REASON
+        code = self._reason_codes.get(reason)
+        if code is None:
+            code = len(self.reasons)
+            self.reasons.append(reason)
+            self._reason_codes[reason] = code
+        return code
+    
+    def _append_rows(self, rows) -> None:
+        if not rows:
+            return
+        action_id, goal_id, status, timestamp, reason = zip(*rows)
+        self._append_columns(
+            np.fromiter(action_id, dtype=np.int32, count=len(rows)),
+            np.fromiter(goal_id, dtype=np.int32, count=len(rows)),
+            np.fromiter((STATUS_CODES[CompletionStatus(s)] for s in status), dtype=np.uint8, count=len(rows)),
+            np.fromiter((to_micros(t) for t in timestamp), dtype=np.int64, count=len(rows)),
+            np.fromiter((self._reason_code(r) for r in reason), dtype=np.int32, count=len(rows))
+        )
+    
+    def _append_columns(self, *values: np.ndarray) -> None:
+        count = len(values[0])
+        needed = self._size + count
+        if needed > len(self._action_id):
+            capacity = max(len(self._action_id) * 2, needed)
+            grown = []
+            for column in self._columns():
+                new = np.zeros(capacity, dtype=column.dtype)
+                new[:self._size] = column[:self._size]
+                grown.append(new)
+            self._action_id, self._goal_id, self._status, self._timestamp, self._reason = grown
+        for column, value in zip(self._columns(), values):
+            column[self._size:needed] = value
+        self._size = needed
+
+
+event_store = EventColumnStore()
+
+
+def active_store() -> Optional[EventColumnStore]:
+    """The shared store once loaded (`EVENT_STORE_ENABLED`), else None."""
+    return event_store if event_store.loaded else None
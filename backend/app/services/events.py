@@ -0,0 +1,107 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import insert, update
+from sqlmodel import Session, func, select
+from app.core.cache import get_cache, goal_tag
+from app.models import Action, ActionStatus, CompletionEvent, CompletionStatus, Goal
+from app.services.actions import promote_ready_dependents
+from app.services.breakpoints import breakpoint_service
+from app.services.event_store import active_store
+from app.services.graph import refresh_graph_analytics
+from app.services.mes import mes_service, global_mes_queue
+from app.services.rollups import record_events
+from app.services.stats import stats_service
+
+
+EventRow = Tuple[int, CompletionStatus, Optional[str]]
+
+# Completion statuses that move the action; `failed` leaves it as is.
+ACTION_STATUS = {CompletionStatus.done: ActionStatus.done, CompletionStatus.blocked: ActionStatus.blocked}
+
+ID_CHUNK = 5000
+
+
+def load_actions(session: Session, action_ids: Iterable[int]) -> Dict[int, Tuple[int, ActionStatus]]:
+    """Goal and status of each existing action, in one IN query per chunk."""
+    action_ids = list(set(action_ids))
+    found = {}
+    for start in range(0, len(action_ids), ID_CHUNK):
+        rows = session.exec(
+            select(Action.id, Action.goal_id, Action.status).where(Action.id.in_(action_ids[start:start + ID_CHUNK]))
+        ).all()
+        found.update((action_id, (goal_id, status)) for action_id, goal_id, status in rows)
+    return found
+
+
+def log_events(session: Session, rows: List[EventRow]) -> List[CompletionEvent]:
+    """Store a batch of (action_id, status, failure_reason) events and commit.
+    
+    Rows for unknown actions are skipped. Events go in with one bulk insert;
+    each action moves straight to the status of its last done/blocked event,
+    and dependents, graph analytics, breakpoints and rollups are updated once
+    for the whole batch. In-memory MES structures are refreshed afterwards.
+    """
+    actions = load_actions(session, [action_id for action_id, _, _ in rows])
+    now = datetime.utcnow()
+    params = []
+    final: Dict[int, ActionStatus] = {}
+    for action_id, status, failure_reason in rows:
+        if action_id not in actions:
+            continue
+        params.append({
+            "action_id": action_id,
+            "goal_id": actions[action_id][0],
+            "status": status,
+            "timestamp": now,
+            "failure_reason": failure_reason
+        })
+        if status in ACTION_STATUS:
+            final[action_id] = ACTION_STATUS[status]
+    if not params:
+        return []
+    
+    # A plain executemany: RETURNING through insertmanyvalues re-splices
+    # every earlier batch and turns quadratic. Once the insert has run this
+    # transaction holds the write lock, so the new rows are the newest ids.
+    session.connection().execute(insert(CompletionEvent.__table__), params)
+    last_id = session.exec(select(func.max(CompletionEvent.id))).one()
+    # The rows are already validated; skip the per-field checks of __init__.
+    events = [
+        CompletionEvent.model_construct(id=event_id, **row)
+        for event_id, row in enumerate(params, start=last_id - len(params) + 1)
+    ]
+    
+    changed: Dict[ActionStatus, List[int]] = {}
+    for action_id, status in final.items():
+        if actions[action_id][1] != status:
+            changed.setdefault(status, []).append(action_id)
+    for status, action_ids in changed.items():
+        for start in range(0, len(action_ids), ID_CHUNK):
+            session.exec(
+                update(Action)
+                .where(Action.id.in_(action_ids[start:start + ID_CHUNK]))
+                .values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+    
+    changed_ids = [action_id for action_ids in changed.values() for action_id in action_ids]
+    promote_ready_dependents(session, changed.get(ActionStatus.done, []))
+    goal_ids = {actions[action_id][0] for action_id in changed_ids}
+    if goal_ids:
+        for goal in session.exec(select(Goal).where(Goal.id.in_(goal_ids))).all():
+            refresh_graph_analytics(session, goal)
+    breakpoint_service.record_many(session, events)
+    record_events(session, events)
+    session.commit()
+    
+    for action_id in changed_ids:
+        mes_service.on_action_status(actions[action_id][0], action_id, final[action_id])
+    get_cache().invalidate_tags(*(goal_tag(goal_id) for goal_id in {event.goal_id for event in events}))
+    global_mes_queue.sync_actions(session, changed_ids)
+    stats_service.on_events_logged(len(events))
+    breakpoint_service.after_commit(session)
+    store = active_store()
+    if store is not None:
+        store.extend(events)
+    
+    return events
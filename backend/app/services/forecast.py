@@ -0,0 +1,148 @@
+from typing import Dict, Optional
+from threading import Lock
+from datetime import datetime, timedelta
+import numpy as np
+from sqlmodel import Session, select, func
+from app.config import settings
+from app.models import BreakpointPattern, CompletionStatus, EventRollup
+from app.services.breakpoints import classify_reason
+
+
+PATTERNS = list(BreakpointPattern)
+PATTERN_INDEX = {pattern: index for index, pattern in enumerate(PATTERNS)}
+EPOCH = datetime(1970, 1, 1)
+
+
+class ForecastEngine:
+    """Failure forecasts per breakpoint pattern and per action.
+    
+    Hourly rollups are grouped into `bucket_hours` buckets and every series
+    is smoothed with simple exponential smoothing. Empty buckets count as
+    zero, so folding B closed buckets into a level is the closed form
+    `level * (1 - alpha) ** B + sum(alpha * (1 - alpha) ** (B - 1 - t) * x_t)`:
+    one weighted bincount over the new rollup rows for all series at once.
+    Only buckets closed since the last fold are read.
+    """
+    
+    def __init__(self, bucket_hours: int = 24, alpha: float = 0.3, top_actions: int = 10):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"Smoothing factor must be in (0, 1]: {alpha}")
+        self.span = timedelta(hours=bucket_hours)
+        self.alpha = alpha
+        self.top_actions = top_actions
+        self._lock = Lock()
+        self.clear()
+    
+    def clear(self) -> None:
+        self.closed_until: Optional[datetime] = None
+        self.pattern_level = np.zeros(len(PATTERNS))
+        self.action_ids = np.zeros(0, dtype=np.int64)
+        self._action_index: Dict[int, int] = {}
+        self.failure_level = np.zeros(0)
+        self.attempt_level = np.zeros(0)
+    
+    def bucket_floor(self, at: datetime) -> datetime:
+        return EPOCH + (at - EPOCH) // self.span * self.span
+    
+    def update(self, session: Session, now: Optional[datetime] = None) -> int:
+        """Fold buckets that closed since the last call; returns how many."""
+        current = self.bucket_floor(now or datetime.utcnow())
+        with self._lock:
+            start = self.closed_until
+            if start is None:
+                first = session.exec(select(func.min(EventRollup.bucket))).one()
+                start = self.bucket_floor(first) if first is not None else current
+            if start >= current:
+                self.closed_until = start
+                return 0
+            
+            rows = session.exec(
+                select(
+                    EventRollup.bucket,
+                    EventRollup.status,
+                    EventRollup.action_id,
+                    EventRollup.failure_reason,
+                    EventRollup.count
+                )
+                .where(EventRollup.bucket >= start)
+                .where(EventRollup.bucket < current)
+            ).all()
+            buckets = (current - start) // self.span
+            self._fold(rows, start, buckets)
+            self.closed_until = current
+            return buckets
+    
+    def forecast(self, session: Session, now: Optional[datetime] = None) -> dict:
+        self.update(session, now)
+        with self._lock:
+            total = self.pattern_level.sum()
+            patterns = [
+                {
+                    "pattern": pattern,
+                    "expected_failures": round(float(level), 3),
+                    "share": round(float(level / total), 4) if total > 0 else 0.0
+                }
+                for pattern, level in zip(PATTERNS, self.pattern_level)
+                if level > 0
+            ]
+            patterns.sort(key=lambda x: x["expected_failures"], reverse=True)
+            
+            risk = np.divide(
+                self.failure_level, self.attempt_level,
+                out=np.zeros_like(self.failure_level), where=self.attempt_level > 0
+            )
+            k = min(self.top_actions, int((risk > 0).sum()))
+            top = np.argpartition(-risk, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+            top = top[np.lexsort((self.action_ids[top], -risk[top]))]
+            actions = [
+                {
+                    "action_id": int(self.action_ids[i]),
+                    "failure_risk": round(float(risk[i]), 4),
+                    "expected_failures": round(float(self.failure_level[i]), 3)
+                }
+                for i in top
+            ]
+        return {
+            "bucket_hours": self.span // timedelta(hours=1),
+            "forecast_from": self.closed_until,
+            "pattern_forecasts": patterns,
+            "action_forecasts": actions
+        }
+    
+    def _fold(self, rows, start: datetime, buckets: int) -> None:
+        decay = 1 - self.alpha
+        self.pattern_level *= decay ** buckets
+        self.failure_level *= decay ** buckets
+        self.attempt_level *= decay ** buckets
+        if not rows:
+            return
+        
+        bucket, status, action_id, reason, count = zip(*rows)
+        offset = np.fromiter(((b - start) // self.span for b in bucket), dtype=np.int64, count=len(rows))
+        weight = self.alpha * decay ** (buckets - 1 - offset) * np.asarray(count, dtype=np.float64)
+        failed = np.fromiter((CompletionStatus(s) == CompletionStatus.failed for s in status), dtype=bool, count=len(rows))
+        
+        patterns = np.fromiter((PATTERN_INDEX[classify_reason(r)] for r in reason), dtype=np.int64, count=len(rows))
+        self.pattern_level += np.bincount(patterns[failed], weights=weight[failed], minlength=len(PATTERNS))
+        
+        self._add_series(action_id)
+        series = np.fromiter((self._action_index[a] for a in action_id), dtype=np.int64, count=len(rows))
+        self.attempt_level += np.bincount(series, weights=weight, minlength=len(self.action_ids))
+        self.failure_level += np.bincount(series[failed], weights=weight[failed], minlength=len(self.action_ids))
+    
+    def _add_series(self, action_ids) -> None:
+        new = [a for a in dict.fromkeys(action_ids) if a not in self._action_index]
+        if not new:
+            return
+        for action_id in new:
+            self._action_index[action_id] = len(self._action_index)
+        self.action_ids = np.concatenate([self.action_ids, np.asarray(new, dtype=np.int64)])
+        self.failure_level = np.concatenate([self.failure_level, np.zeros(len(new))])
+        self.attempt_level = np.concatenate([self.attempt_level, np.zeros(len(new))])
+
+
+forecast_engine = ForecastEngine(
+    bucket_hours=settings.forecast_bucket_hours,
+    alpha=settings.forecast_alpha,
+    top_actions=settings.forecast_top_actions
+)
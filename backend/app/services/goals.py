@@ -0,0 +1,53 @@
+from typing import List
+import json
+from sqlmodel import Session, select
+from app.models import Action, Goal
+from app.services.actions import create_actions, delete_actions
+from app.services.embeddings import sync_goal_embedding
+from app.services.graph import refresh_graph_analytics
+from app.services.mes import mes_service, global_mes_queue
+
+
+def finish_decomposition(session: Session, goal: Goal, steps: List[dict]) -> List[Action]:
+    """Swap the goal's actions for `steps` and commit.
+    
+    The previous actions and edges are dropped in the same transaction that
+    stores the new ones and refreshes graph analytics, so readers see either
+    plan but never a mix. In-memory MES structures are refreshed afterwards.
+    """
+    delete_actions(session, goal.id)
+    actions = create_actions(session, goal, steps)
+    session.flush()
+    refresh_graph_analytics(session, goal)
+    session.commit()
+    
+    mes_service.invalidate(goal.id)
+    global_mes_queue.sync_goal(session, goal.id)
+    return actions
+
+
+def reusable_steps(session: Session, source_goal_id: int, goal: Goal) -> List[dict]:
+    """The source goal's actions as decomposition steps for `goal`.
+    
+    Dependencies become step indices again, and mentions of the source
+    goal's description are rewritten to the new one.
+    """
+    source = session.get(Goal, source_goal_id)
+    actions = session.exec(select(Action).where(Action.goal_id == source_goal_id).order_by(Action.id)).all()
+    index = {action.id: idx for idx, action in enumerate(actions)}
+    return [
+        {
+            "description": action.description.replace(source.description, goal.description),
+            "duration_min": action.duration_min,
+            "energy_level": action.energy_level.value,
+            "priority": action.priority,
+            "dependencies": [index[dep] for dep in json.loads(action.dependencies or "[]") if dep in index]
+        }
+        for action in actions
+    ]
+
+
+def sync_goal_status(session: Session, goal: Goal) -> None:
+    """Propagate a committed status change to the MES queue and similarity index."""
+    global_mes_queue.sync_goal(session, goal.id)
+    sync_goal_embedding(session, goal)
@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, List, Set, Tuple
+from pydantic import BaseModel
+from sqlalchemy import bindparam, update
+from sqlmodel import Session, select
+from app.models import Action, ActionDependency, ActionStatus, Goal
+
+
+def load_dependencies(session: Session, goal_id: int) -> Dict[int, List[int]]:
+    edges: Dict[int, List[int]] = {}
+    for action_id, depends_on_id in session.exec(
+        select(ActionDependency.action_id, ActionDependency.depends_on_id)
+        .where(ActionDependency.goal_id == goal_id)
+    ).all():
+        edges.setdefault(action_id, []).append(depends_on_id)
+    return edges
+
+
+class GraphAnalysis(BaseModel):
+    depth: Dict[int, int] = {}
+    critical_path_min: int = 0
+    remaining_min: int = 0
+    remaining_critical_path_min: int = 0
+    max_depth: int = 0
+
+
+def find_back_edges(nodes: Iterable[int], edges: Dict[int, List[int]]) -> List[Tuple[int, int]]:
+    """Edges (node, dep) that close a cycle in a depth-first walk.
+    
+    Dropping all of them leaves a DAG. Nodes are visited in the given order,
+    so for decompositions the later step loses its edge.
+    """
+    state: Dict[int, int] = {}
+    back_edges = []
+    for root in nodes:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(edges.get(root, [])))]
+        while stack:
+            node, deps = stack[-1]
+            for dep in deps:
+                if state.get(dep) == 1:
+                    back_edges.append((node, dep))
+                elif dep not in state:
+                    state[dep] = 1
+                    stack.append((dep, iter(edges.get(dep, []))))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return back_edges
+
+
+def topological_order(nodes: List[int], edges: Dict[int, List[int]]) -> List[int]:
+    """Dependencies first. Nodes stuck in a cycle are left out."""
+    known = set(nodes)
+    unmet = {node: sum(1 for dep in edges.get(node, []) if dep in known) for node in nodes}
+    dependents: Dict[int, List[int]] = {}
+    for node in nodes:
+        for dep in edges.get(node, []):
+            if dep in known:
+                dependents.setdefault(dep, []).append(node)
+    
+    order = [node for node in nodes if unmet[node] == 0]
+    for node in order:
+        for dependent in dependents.get(node, []):
+            unmet[dependent] -= 1
+            if unmet[dependent] == 0:
+                order.append(dependent)
+    return order
+
+
+def analyze(durations: Dict[int, int], edges: Dict[int, List[int]], done: Set[int]) -> GraphAnalysis:
+    nodes = list(durations)
+    depth: Dict[int, int] = {}
+    finish: Dict[int, int] = {}
+    remaining_finish: Dict[int, int] = {}
+    
+    for node in topological_order(nodes, edges):
+        deps = [dep for dep in edges.get(node, []) if dep in depth]
+        depth[node] = 1 + max(depth[dep] for dep in deps) if deps else 0
+        finish[node] = durations[node] + max((finish[dep] for dep in deps), default=0)
+        own = 0 if node in done else durations[node]
+        remaining_finish[node] = own + max((remaining_finish[dep] for dep in deps), default=0)
+    
+    return GraphAnalysis(
+        depth=depth,
+        critical_path_min=max(finish.values(), default=0),
+        remaining_min=sum(duration for node, duration in durations.items() if node not in done),
+        remaining_critical_path_min=max(remaining_finish.values(), default=0),
+        max_depth=max(depth.values(), default=0)
+    )
+
+
+def refresh_graph_analytics(session: Session, goal: Goal) -> GraphAnalysis:
+    """Recompute and store DAG analytics for a goal; call after any graph change."""
+    rows = session.exec(
+        select(Action.id, Action.duration_min, Action.status, Action.depth).where(Action.goal_id == goal.id)
+    ).all()
+    durations = {action_id: duration for action_id, duration, _, _ in rows}
+    done = {action_id for action_id, _, status, _ in rows if status == ActionStatus.done}
+    analysis = analyze(durations, load_dependencies(session, goal.id), done)
+    
+    changed = [
+        {"action_id": action_id, "new_depth": analysis.depth.get(action_id, 0)}
+        for action_id, _, _, depth in rows
+        if depth != analysis.depth.get(action_id, 0)
+    ]
+    if changed:
+        session.connection().execute(
+            update(Action.__table__)
+            .where(Action.__table__.c.id == bindparam("action_id"))
+            .values(depth=bindparam("new_depth")),
+            changed
+        )
+    
+    goal.critical_path_min = analysis.critical_path_min
+    goal.remaining_min = analysis.remaining_min
+    goal.remaining_critical_path_min = analysis.remaining_critical_path_min
+    goal.max_depth = analysis.max_depth
+    session.add(goal)
+    return analysis
@@ -0,0 +1,337 @@
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import json
+import logging
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import settings
+from app.models import DecompositionJob, DecompositionSource, Goal, GoalStatus, JobStatus
+from app.services.decompose import decompose_service
+from app.services.embeddings import embedding_store, find_similar_goals_async, index_goal_async
+from app.services.goals import finish_decomposition, reusable_steps
+
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (JobStatus.done, JobStatus.failed)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class QueueStopped(Exception):
+    pass
+
+
+def job_state(job: DecompositionJob) -> dict:
+    return job.model_dump(mode="json")
+
+
+def _default_session_factory() -> AsyncSession:
+    from app.db import async_engine
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+
+class DecompositionQueue:
+    """Runs goal decompositions on a fixed number of asyncio workers.
+    
+    Jobs are rows in `decomposition_job`; the in-memory queue only holds
+    their ids. A worker claims a job with a conditional UPDATE, so a job
+    runs once even when several processes share the database. On start,
+    queued jobs and `running` jobs left stale by a dead worker are
+    re-enqueued, so a restart loses nothing. Admission is bounded by `max_pending` (queued
+    plus running). Steps are staged on the job as they arrive and published
+    to watchers; the goal's actions are replaced by them in one transaction
+    when the job finishes, so a failed job leaves the previous plan intact.
+    
+    A new goal whose nearest stored goal is at least `reuse_threshold`
+    similar copies that goal's actions instead of calling the LLM; the
+    decision and score are kept on the job.
+    """
+    
+    def __init__(
+        self,
+        workers: int = 4,
+        max_pending: int = 64,
+        timeout: float = 120,
+        max_attempts: int = 3,
+        reuse_threshold: Optional[float] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.reuse_threshold = reuse_threshold
+        self.session_factory = session_factory or _default_session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending = 0
+        self._watchers: Dict[int, Set[asyncio.Queue]] = {}
+        self._active: Set[int] = set()
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+    
+    @property
+    def pending(self) -> int:
+        return self._pending
+    
+    async def start(self) -> int:
+        """Start the workers; returns how many stored jobs were resumed.
+        
+        Every process enqueues the stored queued jobs; `_claim` lets only one
+        of them run each. `running` jobs are only taken over once stale.
+        """
+        if self.running:
+            return 0
+        self._queue = asyncio.Queue()
+        self._pending = 0
+        
+        async with self.session_factory() as session:
+            queued = (await session.exec(
+                select(DecompositionJob.id)
+                .where(DecompositionJob.status == JobStatus.queued)
+                .order_by(DecompositionJob.id)
+            )).all()
+        for job_id in queued:
+            self._enqueue(job_id)
+        recovered = await self._recover()
+        
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+        return len(queued) + recovered
+    
+    async def stop(self) -> None:
+        """Cancel the workers and requeue the jobs they were running."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queue = None
+        
+        active, self._active = self._active, set()
+        if active:
+            async with self.session_factory() as session:
+                await session.exec(
+                    update(DecompositionJob)
+                    .where(DecompositionJob.id.in_(active), DecompositionJob.status == JobStatus.running)
+                    .values(status=JobStatus.queued)
+                )
+                await session.commit()
+    
+    async def join(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+    
+    async def submit(self, session: AsyncSession, goal: Goal, bypass_cache: bool = False) -> DecompositionJob:
+        """Persist a queued job for the goal and hand it to the workers.
+        
+        Pending changes in `session` are committed with the job. Raises
+        `QueueStopped` when no workers run and `QueueFull` at capacity.
+        """
+        if not self.running:
+            raise QueueStopped("Decomposition workers are not running")
+        if self._pending >= self.max_pending:
+            raise QueueFull(f"{self._pending} decompositions pending")
+        self._pending += 1
+        try:
+            session.add(goal)
+            await session.flush()
+            job = DecompositionJob(goal_id=goal.id, bypass_cache=bypass_cache)
+            session.add(job)
+            await session.commit()
+        except BaseException:
+            self._pending -= 1
+            raise
+        self._queue.put_nowait(job.id)
+        return job
+    
+    def watch(self, job_id: int) -> asyncio.Queue:
+        updates: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(job_id, set()).add(updates)
+        return updates
+    
+    def unwatch(self, job_id: int, updates: asyncio.Queue) -> None:
+        watchers = self._watchers.get(job_id)
+        if watchers is not None:
+            watchers.discard(updates)
+            if not watchers:
+                del self._watchers[job_id]
+    
+    def _publish(self, job_id: int, kind: str, payload: dict) -> None:
+        for updates in self._watchers.get(job_id, ()):
+            updates.put_nowait((kind, payload))
+    
+    def _notify(self, job: DecompositionJob) -> None:
+        self._publish(job.id, "job", job_state(job))
+    
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Decomposition job %s crashed", job_id)
+            finally:
+                self._pending -= 1
+                self._queue.task_done()
+    
+    def _enqueue(self, job_id: int) -> None:
+        self._pending += 1
+        self._queue.put_nowait(job_id)
+    
+    async def _claim(self, session: AsyncSession, job_id: int) -> bool:
+        """Move the job from queued to running unless another worker or
+        process got there first."""
+        claimed = (await session.exec(
+            update(DecompositionJob)
+            .where(DecompositionJob.id == job_id, DecompositionJob.status == JobStatus.queued)
+            .values(
+                status=JobStatus.running,
+                started_at=datetime.utcnow(),
+                attempts=DecompositionJob.attempts + 1,
+                action_count=0,
+                steps=None
+            )
+        )).rowcount
+        await session.commit()
+        return bool(claimed)
+    
+    async def _recover(self) -> int:
+        """Requeue `running` jobs whose worker died: started longer ago than
+        any attempt may take. Each row is reset by exactly one process."""
+        cutoff = datetime.utcnow() - timedelta(seconds=2 * self.timeout)
+        stale = (DecompositionJob.status == JobStatus.running) & (
+            DecompositionJob.started_at.is_(None) | (DecompositionJob.started_at < cutoff)
+        )
+        recovered = 0
+        async with self.session_factory() as session:
+            job_ids = (await session.exec(select(DecompositionJob.id).where(stale).order_by(DecompositionJob.id))).all()
+            for job_id in job_ids:
+                reset = (await session.exec(
+                    update(DecompositionJob).where(DecompositionJob.id == job_id, stale).values(status=JobStatus.queued)
+                )).rowcount
+                await session.commit()
+                if reset:
+                    self._enqueue(job_id)
+                    recovered += 1
+        return recovered
+    
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(self.timeout)
+            try:
+                await self._recover()
+            except Exception:
+                logger.exception("Recovering stale decomposition jobs failed")
+    
+    async def _run(self, job_id: int) -> None:
+        async with self.session_factory() as session:
+            if not await self._claim(session, job_id):
+                return
+            job = await session.get(DecompositionJob, job_id)
+            goal = await session.get(Goal, job.goal_id)
+            self._active.add(job_id)
+            self._notify(job)
+            
+            try:
+                await asyncio.wait_for(self._decompose(session, job, goal), self.timeout)
+            except Exception as e:
+                await session.rollback()
+                self._active.discard(job_id)
+                await self._fail(session, job_id, e)
+                return
+            self._notify(job)
+            
+            try:
+                if goal.id not in embedding_store:
+                    await index_goal_async(session, goal)
+            except Exception:
+                logger.exception("Indexing goal %s after decomposition failed", goal.id)
+            finally:
+                self._active.discard(job_id)
+    
+    async def _decompose(self, session: AsyncSession, job: DecompositionJob, goal: Goal) -> None:
+        steps = []
+        async for step in self._steps(session, job, goal):
+            steps.append(step)
+            job.steps = json.dumps(steps)
+            job.action_count = len(steps)
+            session.add(job)
+            await session.commit()
+            self._publish(job.id, "step", {"index": len(steps) - 1, **step})
+        
+        if goal.status == GoalStatus.decomposing:
+            goal.status = GoalStatus.active
+        job.status = JobStatus.done
+        job.error = None
+        job.finished_at = datetime.utcnow()
+        session.add(job)
+        await session.run_sync(finish_decomposition, goal, steps)
+    
+    async def _steps(self, session: AsyncSession, job: DecompositionJob, goal: Goal) -> AsyncIterator[dict]:
+        # The job is only touched after the similarity lookup: a dirty job
+        # would be autoflushed by its queries, and the write transaction
+        # would stay open for the whole LLM call.
+        similarity, reused_goal_id, steps = None, None, None
+        if self.reuse_threshold is not None and not job.bypass_cache and goal.status == GoalStatus.decomposing:
+            similarity, reused_goal_id, steps = await self._reuse(session, goal)
+        job.source = DecompositionSource.reused if steps else DecompositionSource.llm
+        job.similarity = similarity
+        job.reused_goal_id = reused_goal_id if steps else None
+        session.add(job)
+        await session.commit()
+        
+        if steps:
+            for step in steps:
+                yield step
+            return
+        async for step in decompose_service.stream(goal.description, use_cache=not job.bypass_cache):
+            yield step.model_dump()
+    
+    async def _reuse(self, session: AsyncSession, goal: Goal) -> Tuple[Optional[float], Optional[int], Optional[List[dict]]]:
+        """(best similarity, source goal, its steps); no steps when no stored
+        goal reaches `reuse_threshold` or the close ones have no actions."""
+        hits = await find_similar_goals_async(session, goal, limit=3, threshold=-1.0)
+        similarity = hits[0]["similarity"] if hits else None
+        for hit in hits:
+            if hit["similarity"] < self.reuse_threshold:
+                break
+            steps = await session.run_sync(reusable_steps, hit["goal_id"], goal)
+            if steps:
+                return hit["similarity"], hit["goal_id"], steps
+        return similarity, None, None
+    
+    async def _fail(self, session: AsyncSession, job_id: int, error: Exception) -> None:
+        job = await session.get(DecompositionJob, job_id)
+        job.error = f"{type(error).__name__}: {error}"[:500]
+        retry = job.attempts < self.max_attempts
+        if retry:
+            job.status = JobStatus.queued
+        else:
+            job.status = JobStatus.failed
+            job.finished_at = datetime.utcnow()
+            goal = await session.get(Goal, job.goal_id)
+            if goal.status == GoalStatus.decomposing:
+                goal.status = GoalStatus.active
+                session.add(goal)
+        session.add(job)
+        await session.commit()
+        self._notify(job)
+        if retry:
+            self._enqueue(job.id)
+
+
+decomposition_queue = DecompositionQueue(
+    workers=settings.decompose_workers,
+    max_pending=settings.decompose_queue_size,
+    timeout=settings.decompose_timeout,
+    max_attempts=settings.decompose_max_attempts,
+    reuse_threshold=settings.decompose_reuse_threshold
+)
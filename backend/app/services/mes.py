@@ -1,37 +1,324 @@
-from typing import List
+from typing import Dict, Iterable, List, Optional
+from collections import OrderedDict
+from threading import Lock
+import bisect
+import heapq
 import json
-from app.models import Action, ActionStatus, MESResponse
+import time
+from sqlmodel import Session, select
+from app.config import settings
+from app.core.cache import get_cache, goal_tag
+from app.models import Action, ActionDependency, ActionStatus, EnergyLevel, Goal, GoalStatus, MESResponse
+from app.services.actions import ready_condition
+from app.services.graph import load_dependencies
 
 
-def find_mes(actions: List[Action]) -> List[MESResponse]:
-    available_actions = []
+INACTIVE_STATUSES = (ActionStatus.done, ActionStatus.blocked)
+ENERGY_RANK = {EnergyLevel.low: 0, EnergyLevel.medium: 1, EnergyLevel.high: 2}
+
+
+class ActionNode:
+    __slots__ = ("id", "description", "duration_min", "energy_level", "priority", "status", "depth", "dependencies")
+    
+    def __init__(self, action: Action, dependencies: Optional[List[int]] = None):
+        self.id: int = action.id
+        self.description: str = action.description
+        self.duration_min: int = action.duration_min
+        self.energy_level: EnergyLevel = action.energy_level
+        self.priority: int = action.priority
+        self.status: ActionStatus = action.status
+        self.depth: int = action.depth
+        if dependencies is None:
+            dependencies = json.loads(action.dependencies) if action.dependencies else []
+        self.dependencies: List[int] = dependencies
+    
+    def sort_key(self) -> tuple:
+        return (-self.priority, self.duration_min, self.id)
+
+
+class GoalGraph:
+    """Dependency DAG of one goal with unmet-dependency counts and a ready heap.
+    
+    An action is ready when it is neither done nor blocked and all of its
+    dependencies are done. Edges come from the `action_dependency` table
+    (or the legacy JSON column when none are given). Status changes update the counts of direct
+    dependents only; the heap uses lazy deletion.
+    """
+    
+    def __init__(self, actions: List[Action], edges: Optional[Dict[int, List[int]]] = None):
+        self.nodes: Dict[int, ActionNode] = {
+            action.id: ActionNode(action, edges.get(action.id, []) if edges is not None else None)
+            for action in actions
+        }
+        self.dependents: Dict[int, List[int]] = {}
+        self.unmet: Dict[int, int] = {}
+        self._heap: List[tuple] = []
+        self._ready: Dict[int, tuple] = {}
+        
+        for node in self.nodes.values():
+            unmet = 0
+            for dep_id in node.dependencies:
+                self.dependents.setdefault(dep_id, []).append(node.id)
+                dep = self.nodes.get(dep_id)
+                if dep is None or dep.status != ActionStatus.done:
+                    unmet += 1
+            self.unmet[node.id] = unmet
+        
+        for node in self.nodes.values():
+            self._refresh(node.id)
+    
+    def is_ready(self, action_id: int) -> bool:
+        return action_id in self._ready
     
-    for action in actions:
-        if action.status == ActionStatus.done or action.status == ActionStatus.blocked:
-            continue
+    def update_status(self, action_id: int, status: ActionStatus) -> List[int]:
+        """Apply a status change; returns dependents whose readiness changed."""
+        node = self.nodes.get(action_id)
+        if node is None or node.status == status:
+            return []
         
-        dependencies = json.loads(action.dependencies) if action.dependencies else []
+        was_done = node.status == ActionStatus.done
+        node.status = status
+        is_done = status == ActionStatus.done
+        
+        changed = []
+        if was_done != is_done:
+            delta = -1 if is_done else 1
+            for dependent_id in self.dependents.get(action_id, []):
+                if dependent_id not in self.unmet:
+                    continue
+                self.unmet[dependent_id] += delta
+                if self._refresh(dependent_id):
+                    changed.append(dependent_id)
+        self._refresh(action_id)
+        return changed
+    
+    def top(self, limit: int) -> List[ActionNode]:
+        popped = []
+        while self._heap and len(popped) < limit:
+            entry = heapq.heappop(self._heap)
+            if self._ready.get(entry[-1]) is entry:
+                popped.append(entry)
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+        return [self.nodes[entry[-1]] for entry in popped]
+    
+    def _refresh(self, action_id: int) -> bool:
+        node = self.nodes[action_id]
+        ready = self.unmet[action_id] == 0 and node.status not in INACTIVE_STATUSES
+        if ready == (action_id in self._ready):
+            return False
+        if ready:
+            entry = node.sort_key()
+            self._ready[action_id] = entry
+            heapq.heappush(self._heap, entry)
+        else:
+            del self._ready[action_id]
+        if len(self._heap) > 2 * len(self._ready) + 16:
+            self._heap = list(self._ready.values())
+            heapq.heapify(self._heap)
+        return True
+
+
+def to_response(node: ActionNode, goal_id: Optional[int] = None) -> MESResponse:
+    return MESResponse(
+        action_id=node.id,
+        goal_id=goal_id,
+        description=node.description,
+        duration_min=node.duration_min,
+        energy_level=node.energy_level,
+        priority=node.priority,
+        available_now=True,
+        depth=node.depth
+    )
+
+
+def find_mes(actions: List[Action]) -> List[MESResponse]:
+    return [to_response(node) for node in GoalGraph(actions).top(len(actions))]
+
+
+class MESService:
+    """Serves MES from per-goal graphs held in a bounded LRU cache."""
+    
+    def __init__(self, max_goals: int = 1024, result_ttl: float = 60):
+        self.max_goals = max_goals
+        self.result_ttl = result_ttl
+        self._graphs: "OrderedDict[int, GoalGraph]" = OrderedDict()
+        self._lock = Lock()
+    
+    def get_graph(self, session: Session, goal_id: int) -> GoalGraph:
+        with self._lock:
+            graph = self._graphs.get(goal_id)
+            if graph is not None:
+                self._graphs.move_to_end(goal_id)
+                return graph
         
-        all_deps_met = True
-        for dep_id in dependencies:
-            dep_action = next((a for a in actions if a.id == dep_id), None)
-            if not dep_action or dep_action.status != ActionStatus.done:
-                all_deps_met = False
-                break
+        actions = session.exec(select(Action).where(Action.goal_id == goal_id)).all()
+        graph = GoalGraph(list(actions), load_dependencies(session, goal_id))
         
-        if all_deps_met:
-            available_actions.append(action)
-    
-    available_actions.sort(key=lambda a: (-a.priority, a.duration_min))
-    
-    return [
-        MESResponse(
-            action_id=action.id,
-            description=action.description,
-            duration_min=action.duration_min,
-            energy_level=action.energy_level,
-            priority=action.priority,
-            available_now=True
+        with self._lock:
+            self._graphs[goal_id] = graph
+            self._graphs.move_to_end(goal_id)
+            while len(self._graphs) > self.max_goals:
+                self._graphs.popitem(last=False)
+        return graph
+    
+    def find_mes(self, session: Session, goal_id: int, limit: int = 5) -> List[MESResponse]:
+        graph = self.get_graph(session, goal_id)
+        with self._lock:
+            return [to_response(node) for node in graph.top(limit)]
+    
+    def cached_mes(self, session: Session, goal_id: int, limit: int = 5) -> List[MESResponse]:
+        """`find_mes` behind the global cache, tagged with the goal so event
+        logging purges it. With a shared backend a miss means another worker
+        may have changed the goal, so the local graph is rebuilt first."""
+        cache = get_cache()
+        key = f"mes:{goal_id}:{limit}"
+        result = cache.get(key)
+        if result is None:
+            if cache.shared:
+                with self._lock:
+                    self._graphs.pop(goal_id, None)
+            result = self.find_mes(session, goal_id, limit)
+            cache.set(key, result, self.result_ttl, tags=[goal_tag(goal_id)])
+        return result
+    
+    def on_action_status(self, goal_id: int, action_id: int, status: ActionStatus) -> Optional[List[int]]:
+        """Keep a cached graph in sync; no-op when the goal is not cached."""
+        with self._lock:
+            graph = self._graphs.get(goal_id)
+            if graph is None:
+                return None
+            return graph.update_status(action_id, status)
+    
+    def invalidate(self, goal_id: int) -> None:
+        with self._lock:
+            self._graphs.pop(goal_id, None)
+        get_cache().invalidate_tags(goal_tag(goal_id))
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._graphs.clear()
+
+
+mes_service = MESService(settings.mes_cache_size, settings.mes_result_ttl)
+
+
+class GlobalMESQueue:
+    """Ready actions of all active goals in one list sorted by
+    (-priority, duration_min, action_id), the same order as `find_mes`.
+    
+    Loaded lazily with one query, then kept in sync by the write paths, so a
+    top-k read walks only the head of the list regardless of goal count.
+    Writes made by other worker processes never reach it, so a read reloads
+    it once it is older than `max_age` seconds (None: never).
+    """
+    
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = max_age
+        self._lock = Lock()
+        self.clear()
+    
+    def clear(self) -> None:
+        self._keys: List[tuple] = []
+        self._entries: Dict[int, tuple] = {}
+        self._goal_actions: Dict[int, set] = {}
+        self._loaded_at = 0.0
+        self.loaded = False
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def load(self, session: Session) -> None:
+        rows = session.exec(self._ready_statement()).all()
+        with self._lock:
+            self.clear()
+            for action in rows:
+                self._add(action)
+            self._loaded_at = time.monotonic()
+            self.loaded = True
+    
+    def ensure_loaded(self, session: Session) -> None:
+        if not self.loaded or (self.max_age is not None and time.monotonic() - self._loaded_at >= self.max_age):
+            self.load(session)
+    
+    def top(
+        self,
+        limit: int = 5,
+        energy_level: Optional[EnergyLevel] = None,
+        time_budget: Optional[int] = None
+    ) -> List[MESResponse]:
+        max_energy = ENERGY_RANK[energy_level] if energy_level else None
+        result = []
+        with self._lock:
+            for key in self._keys:
+                if len(result) >= limit:
+                    break
+                goal_id, node = self._entries[key[-1]]
+                if max_energy is not None and ENERGY_RANK[node.energy_level] > max_energy:
+                    continue
+                if time_budget is not None and node.duration_min > time_budget:
+                    continue
+                result.append(to_response(node, goal_id))
+        return result
+    
+    def sync_actions(self, session: Session, action_ids: Iterable[int]) -> None:
+        """Re-check readiness of the given actions and their direct dependents."""
+        if not self.loaded:
+            return
+        action_ids = set(action_ids)
+        if not action_ids:
+            return
+        action_ids |= set(session.exec(
+            select(ActionDependency.action_id).where(ActionDependency.depends_on_id.in_(action_ids))
+        ).all())
+        ready = session.exec(self._ready_statement().where(Action.id.in_(action_ids))).all()
+        with self._lock:
+            for action_id in action_ids:
+                self._remove(action_id)
+            for action in ready:
+                self._add(action)
+    
+    def sync_goal(self, session: Session, goal_id: int) -> None:
+        if not self.loaded:
+            return
+        ready = session.exec(self._ready_statement().where(Action.goal_id == goal_id)).all()
+        with self._lock:
+            for action_id in list(self._goal_actions.get(goal_id, ())):
+                self._remove(action_id)
+            for action in ready:
+                self._add(action)
+    
+    @staticmethod
+    def _ready_statement():
+        return (
+            select(Action)
+            .join(Goal, Goal.id == Action.goal_id)
+            .where(Goal.status == GoalStatus.active)
+            .where(ready_condition())
         )
-        for action in available_actions
-    ]
+    
+    def _add(self, action: Action) -> None:
+        node = ActionNode(action, [])
+        key = node.sort_key()
+        self._remove(node.id)
+        bisect.insort(self._keys, key)
+        self._entries[node.id] = (action.goal_id, node)
+        self._goal_actions.setdefault(action.goal_id, set()).add(node.id)
+    
+    def _remove(self, action_id: int) -> None:
+        entry = self._entries.pop(action_id, None)
+        if entry is None:
+            return
+        goal_id, node = entry
+        key = node.sort_key()
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+        actions = self._goal_actions.get(goal_id)
+        if actions is not None:
+            actions.discard(action_id)
+            if not actions:
+                del self._goal_actions[goal_id]
+
+
+global_mes_queue = GlobalMESQueue(settings.mes_queue_max_age)
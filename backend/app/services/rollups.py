@@ -0,0 +1,68 @@
+from typing import Iterable, Optional, Tuple
+from collections import Counter
+from datetime import datetime
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session
+from app.models import BreakpointPattern, BreakpointRollup, CompletionEvent, EventRollup
+
+
+def bucket_start(at: datetime) -> datetime:
+    """Rollups are hourly."""
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def record_events(session: Session, events: Iterable[CompletionEvent]) -> None:
+    """Add events to the hourly rollup in one upsert statement."""
+    counts: Counter = Counter()
+    goals = {}
+    for event in events:
+        key = (bucket_start(event.timestamp), event.status, event.action_id, event.failure_reason or "")
+        counts[key] += 1
+        goals[key] = event.goal_id
+    if not counts:
+        return
+    
+    statement = insert(EventRollup)
+    session.exec(
+        statement.on_conflict_do_update(
+            index_elements=["bucket", "status", "action_id", "failure_reason"],
+            set_={"count": EventRollup.count + statement.excluded.count}
+        ),
+        params=[
+            {
+                "bucket": bucket,
+                "status": status.name,
+                "action_id": action_id,
+                "failure_reason": reason,
+                "goal_id": goals[(bucket, status, action_id, reason)],
+                "count": count
+            }
+            for (bucket, status, action_id, reason), count in counts.items()
+        ]
+    )
+
+
+Move = Tuple[Optional[Tuple[BreakpointPattern, datetime]], Tuple[BreakpointPattern, datetime]]
+
+
+def move_breakpoints(session: Session, moves: Iterable[Move]) -> None:
+    """Keep one rollup count per breakpoint row, in the bucket of its latest
+    detection; each move is (previous, current) (pattern, detected_at), with
+    no previous for a new row. All rows go in one upsert statement."""
+    counts: Counter = Counter()
+    for previous, current in moves:
+        counts[(bucket_start(current[1]), current[0])] += 1
+        if previous is not None:
+            counts[(bucket_start(previous[1]), previous[0])] -= 1
+    rows = [{"bucket": bucket, "pattern": pattern.name, "count": count} for (bucket, pattern), count in counts.items() if count]
+    if not rows:
+        return
+    
+    statement = insert(BreakpointRollup)
+    session.exec(
+        statement.on_conflict_do_update(
+            index_elements=["bucket", "pattern"],
+            set_={"count": BreakpointRollup.count + statement.excluded.count}
+        ),
+        params=rows
+    )
@@ -0,0 +1,187 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import re
+from sqlmodel import Session, select, func
+from app.config import settings
+from app.core.cache import get_cache
+from app.models import (
+    Breakpoint, BreakpointPattern, BreakpointRollup, CompletionEvent, CompletionStatus,
+    DecompositionJob, DecompositionSource, EventRollup, Goal, GoalStatus, JobStatus
+)
+from app.services.event_store import EventColumnStore
+from app.services.rollups import bucket_start
+
+
+PREDICTION_KEY = "stats:prediction"
+WINDOW_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+def parse_window(window: str) -> timedelta:
+    """Parse windows such as `90m`, `24h`, `7d` or `2w`."""
+    match = re.fullmatch(r"\s*(\d+)\s*([mhdw])\s*", window or "")
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid window: {window!r}")
+    return timedelta(**{WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def summary(session: Session, window: timedelta, store: Optional[EventColumnStore] = None) -> dict:
+    """Read from the column store when given, otherwise from hourly rollups
+    (the window is then widened to whole hours)."""
+    stuck_goals = session.exec(
+        select(func.count(Goal.id))
+        .where(Goal.status == GoalStatus.blocked)
+    ).one()
+    
+    if store is not None:
+        since = datetime.utcnow() - window
+        return {
+            "mes_done": store.status_counts(since)[CompletionStatus.done],
+            "stuck_goals": stuck_goals,
+            "failure_reasons": store.reason_counts(CompletionStatus.failed, since)
+        }
+    
+    since = bucket_start(datetime.utcnow() - window)
+    mes_done = session.exec(
+        select(func.coalesce(func.sum(EventRollup.count), 0))
+        .where(EventRollup.status == CompletionStatus.done)
+        .where(EventRollup.bucket >= since)
+    ).one()
+    
+    failure_reasons = session.exec(
+        select(EventRollup.failure_reason, func.sum(EventRollup.count))
+        .where(EventRollup.status == CompletionStatus.failed)
+        .where(EventRollup.bucket >= since)
+        .where(EventRollup.failure_reason != "")
+        .group_by(EventRollup.failure_reason)
+    ).all()
+    
+    return {
+        "mes_done": mes_done,
+        "stuck_goals": stuck_goals,
+        "failure_reasons": dict(failure_reasons)
+    }
+
+
+def parasitic(
+    session: Session,
+    window: timedelta,
+    min_failures: int = 3,
+    store: Optional[EventColumnStore] = None
+) -> dict:
+    since = bucket_start(datetime.utcnow() - window)
+    
+    patterns = session.exec(
+        select(BreakpointRollup.pattern, func.sum(BreakpointRollup.count))
+        .where(BreakpointRollup.bucket >= since)
+        .group_by(BreakpointRollup.pattern)
+        .having(func.sum(BreakpointRollup.count) > 0)
+    ).all()
+    
+    if store is not None:
+        negative_utility_actions = store.action_counts(
+            CompletionStatus.failed, datetime.utcnow() - window, min_failures
+        )
+    else:
+        negative_utility_actions = session.exec(
+            select(EventRollup.action_id, func.sum(EventRollup.count).label("failure_count"))
+            .where(EventRollup.status == CompletionStatus.failed)
+            .where(EventRollup.bucket >= since)
+            .group_by(EventRollup.action_id)
+            .having(func.sum(EventRollup.count) >= min_failures)
+        ).all()
+    
+    return {
+        "breakpoint_patterns": dict(patterns),
+        "negative_utility_actions": [{"action_id": aid, "failure_count": fc} for aid, fc in negative_utility_actions]
+    }
+
+
+def decomposition_reuse(session: Session) -> dict:
+    """How many finished decompositions reused a similar goal's actions, and
+    the LLM spend that saved at `decompose_call_cost_usd` per call."""
+    rows = session.exec(
+        select(DecompositionJob.source, func.count(DecompositionJob.id), func.avg(DecompositionJob.similarity))
+        .where(DecompositionJob.status == JobStatus.done)
+        .group_by(DecompositionJob.source)
+    ).all()
+    counts = {source: (count, similarity) for source, count, similarity in rows if source is not None}
+    reused, reused_similarity = counts.get(DecompositionSource.reused, (0, None))
+    total = sum(count for count, _ in counts.values())
+    return {
+        "decompositions": total,
+        "reused": reused,
+        "llm_calls": total - reused,
+        "hit_rate": round(reused / total, 4) if total else 0.0,
+        "mean_reuse_similarity": reused_similarity,
+        "estimated_savings_usd": round(reused * settings.decompose_call_cost_usd, 6)
+    }
+
+
+def compute_prediction_snapshot(session: Session) -> dict:
+    """Breakpoints per pattern and the total event count in one query."""
+    total_events = select(func.count(CompletionEvent.id)).scalar_subquery()
+    rows = session.exec(
+        select(Breakpoint.pattern, func.count(Breakpoint.id), total_events)
+        .group_by(Breakpoint.pattern)
+    ).all()
+    if rows:
+        total = rows[0][2]
+    else:
+        total = session.exec(select(func.count(CompletionEvent.id))).one()
+    return {
+        "total_events": total,
+        "pattern_counts": {BreakpointPattern(pattern): count for pattern, count, _ in rows}
+    }
+
+
+def render_prediction(snapshot: dict) -> dict:
+    total_events = max(snapshot["total_events"], 1)
+    pattern_risks = [
+        {
+            "pattern": pattern,
+            "count": count,
+            "risk_percentage": round(count / total_events * 100, 2)
+        }
+        for pattern, count in snapshot["pattern_counts"].items()
+        if count > 0
+    ]
+    pattern_risks.sort(key=lambda x: x["risk_percentage"], reverse=True)
+    return {"breakpoint_predictions": pattern_risks}
+
+
+class StatsService:
+    """Keeps the prediction snapshot in the shared cache and patches it on
+    writes instead of recomputing. Patches go through `update` so they are
+    atomic on every backend. The TTL bounds drift from writes the patches
+    miss."""
+    
+    def __init__(self, snapshot_ttl: int = 300):
+        self.snapshot_ttl = snapshot_ttl
+    
+    def get_prediction(self, session: Session) -> dict:
+        snapshot = get_cache().get(PREDICTION_KEY)
+        if snapshot is None:
+            snapshot = compute_prediction_snapshot(session)
+            get_cache().set(PREDICTION_KEY, snapshot, self.snapshot_ttl)
+        return render_prediction(snapshot)
+    
+    def on_events_logged(self, count: int = 1) -> None:
+        get_cache().update(PREDICTION_KEY, lambda snapshot: {**snapshot, "total_events": snapshot["total_events"] + count})
+    
+    def on_breakpoints(self, changes: List[Tuple[Optional[BreakpointPattern], BreakpointPattern]]) -> None:
+        changes = [(previous, current) for previous, current in changes if previous != current]
+        if not changes:
+            return
+        
+        def patch(snapshot: dict) -> dict:
+            counts: Dict[BreakpointPattern, int] = dict(snapshot["pattern_counts"])
+            for previous, current in changes:
+                if previous is not None:
+                    counts[previous] = counts.get(previous, 0) - 1
+                counts[current] = counts.get(current, 0) + 1
+            return {**snapshot, "pattern_counts": counts}
+        
+        get_cache().update(PREDICTION_KEY, patch)
+
+
+stats_service = StatsService(settings.stats_snapshot_ttl)
@@ -0,0 +1,338 @@
+from typing import Dict, List, Optional, Tuple
+from abc import ABC, abstractmethod
+import numpy as np
+
+
+def normalize(vector) -> np.ndarray:
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(arr, axis=-1, keepdims=arr.ndim > 1)
+    return arr / np.where(norm > 0, norm, 1)
+
+
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+SCORE_CHUNK = 8192
+
+
+class VectorBlock:
+    """Growable matrix of rows addressed by id, with swap-remove deletes.
+    
+    Rows are kept as float32, float16 or int8 with a per-row scale. Scoring
+    dequantizes fixed-size chunks on the fly, so the full-precision matrix
+    never exists in memory.
+    """
+    
+    def __init__(self, dim: int, capacity: int = 1024, dtype: str = "float32"):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.dtype = dtype
+        self.matrix = np.zeros((capacity, dim), dtype=DTYPES[dtype])
+        self.scales = np.ones(capacity, dtype=np.float32) if dtype == "int8" else None
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.positions: Dict[int, int] = {}
+        self.size = 0
+    
+    @property
+    def nbytes(self) -> int:
+        total = self.matrix.nbytes + self.ids.nbytes
+        return total + (self.scales.nbytes if self.scales is not None else 0)
+    
+    def upsert(self, item_id: int, row: np.ndarray) -> None:
+        position = self.positions.get(item_id)
+        if position is None:
+            if self.size == self.matrix.shape[0]:
+                self._grow()
+            position = self.size
+            self.size += 1
+            self.positions[item_id] = position
+            self.ids[position] = item_id
+        self._write(position, row)
+    
+    def remove(self, item_id: int) -> bool:
+        position = self.positions.pop(item_id, None)
+        if position is None:
+            return False
+        last = self.size - 1
+        if position != last:
+            moved_id = int(self.ids[last])
+            self.matrix[position] = self.matrix[last]
+            if self.scales is not None:
+                self.scales[position] = self.scales[last]
+            self.ids[position] = moved_id
+            self.positions[moved_id] = position
+        self.size = last
+        return True
+    
+    def get(self, item_id: int) -> Optional[np.ndarray]:
+        position = self.positions.get(item_id)
+        return None if position is None else self._rows(position, position + 1)[0]
+    
+    def rows(self) -> np.ndarray:
+        return self._rows(0, self.size)
+    
+    def scores(self, query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.dtype == "float32":
+            return self.matrix[:self.size] @ query, self.ids[:self.size].copy()
+        scores = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, SCORE_CHUNK):
+            end = min(start + SCORE_CHUNK, self.size)
+            scores[start:end] = self.matrix[start:end].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales[:self.size]
+        return scores, self.ids[:self.size].copy()
+    
+    def _write(self, position: int, row: np.ndarray) -> None:
+        if self.dtype == "int8":
+            scale = float(np.abs(row).max()) / 127 or 1.0
+            self.matrix[position] = np.round(row / scale).astype(np.int8)
+            self.scales[position] = scale
+        else:
+            self.matrix[position] = row
+    
+    def _rows(self, start: int, end: int) -> np.ndarray:
+        rows = self.matrix[start:end].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[start:end, None]
+        return rows
+    
+    def _grow(self) -> None:
+        capacity = max(self.matrix.shape[0] * 2, 1)
+        matrix = np.zeros((capacity, self.matrix.shape[1]), dtype=self.matrix.dtype)
+        matrix[:self.size] = self.matrix[:self.size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self.size] = self.ids[:self.size]
+        if self.scales is not None:
+            scales = np.ones(capacity, dtype=np.float32)
+            scales[:self.size] = self.scales[:self.size]
+            self.scales = scales
+        self.matrix = matrix
+        self.ids = ids
+
+
+def _top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    candidates = candidates[np.argsort(-scores[candidates])]
+    return [(int(ids[i]), float(scores[i])) for i in candidates if scores[i] > -np.inf]
+
+
+class VectorIndex(ABC):
+    """Cosine-similarity index over L2-normalized vectors keyed by int id."""
+    
+    dim: Optional[int] = None
+    
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+    
+    @abstractmethod
+    def __contains__(self, item_id: int) -> bool:
+        ...
+    
+    @abstractmethod
+    def upsert(self, item_id: int, vector) -> None:
+        ...
+    
+    @abstractmethod
+    def remove(self, item_id: int) -> None:
+        ...
+    
+    @abstractmethod
+    def get(self, item_id: int) -> Optional[np.ndarray]:
+        ...
+    
+    @abstractmethod
+    def search(self, vector, k: int, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        ...
+    
+    @abstractmethod
+    def memory_bytes(self) -> int:
+        ...
+    
+    def _check_dim(self, row: np.ndarray) -> None:
+        if self.dim is None:
+            self.dim = row.shape[0]
+        elif row.shape[0] != self.dim:
+            raise ValueError(f"Embedding dimension {row.shape[0]} does not match index dimension {self.dim}")
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force search: one matrix-vector product over every row."""
+    
+    def __init__(self, initial_capacity: int = 1024, dtype: str = "float32"):
+        self._initial_capacity = initial_capacity
+        self.dtype = dtype
+        self._block: Optional[VectorBlock] = None
+    
+    def __len__(self) -> int:
+        return self._block.size if self._block else 0
+    
+    def __contains__(self, item_id: int) -> bool:
+        return self._block is not None and item_id in self._block.positions
+    
+    def upsert(self, item_id: int, vector) -> None:
+        row = normalize(vector)
+        self._check_dim(row)
+        if self._block is None:
+            self._block = VectorBlock(self.dim, self._initial_capacity, self.dtype)
+        self._block.upsert(item_id, row)
+    
+    def remove(self, item_id: int) -> None:
+        if self._block is not None:
+            self._block.remove(item_id)
+    
+    def get(self, item_id: int) -> Optional[np.ndarray]:
+        return self._block.get(item_id) if self._block else None
+    
+    def memory_bytes(self) -> int:
+        return self._block.nbytes if self._block else 0
+    
+    def search(self, vector, k: int, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        if not len(self):
+            return []
+        scores, ids = self._block.scores(normalize(vector))
+        if exclude_id in self._block.positions:
+            scores[self._block.positions[exclude_id]] = -np.inf
+        return _top_k(scores, ids, k)
+
+
+def kmeans(data: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means; returns L2-normalized centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        empty = ~sums.any(axis=1)
+        if empty.any():
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+        centroids = normalize(sums)
+    return centroids
+
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index: rows are bucketed by their nearest k-means centroid
+    and a query only scores the `nprobe` closest buckets.
+    
+    Until enough rows exist to train `nlist` centroids the index behaves like
+    a single exact bucket. It retrains when it has doubled since the last
+    training, so inserts stay amortized O(d).
+    """
+    
+    def __init__(
+        self,
+        nlist: int = 256,
+        nprobe: int = 8,
+        train_factor: int = 16,
+        seed: int = 0,
+        dtype: str = "float32"
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_factor = train_factor
+        self.seed = seed
+        self.dtype = dtype
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[VectorBlock] = []
+        self._assignment: Dict[int, int] = {}
+        self._trained_size = 0
+    
+    def __len__(self) -> int:
+        return len(self._assignment)
+    
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._assignment
+    
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+    
+    def upsert(self, item_id: int, vector) -> None:
+        row = normalize(vector)
+        self._check_dim(row)
+        if not self._lists:
+            self._lists = [VectorBlock(self.dim, dtype=self.dtype)]
+        
+        target = int(np.argmax(self.centroids @ row)) if self.is_trained else 0
+        current = self._assignment.get(item_id)
+        if current is not None and current != target:
+            self._lists[current].remove(item_id)
+        self._lists[target].upsert(item_id, row)
+        self._assignment[item_id] = target
+        
+        if len(self) >= max(self.nlist * self.train_factor, 2 * self._trained_size):
+            self.train()
+    
+    def remove(self, item_id: int) -> None:
+        current = self._assignment.pop(item_id, None)
+        if current is not None:
+            self._lists[current].remove(item_id)
+    
+    def get(self, item_id: int) -> Optional[np.ndarray]:
+        current = self._assignment.get(item_id)
+        return None if current is None else self._lists[current].get(item_id)
+    
+    def memory_bytes(self) -> int:
+        centroids = self.centroids.nbytes if self.is_trained else 0
+        return centroids + sum(block.nbytes for block in self._lists)
+    
+    def train(self) -> None:
+        ids, data = self._all_rows()
+        if len(data) < self.nlist:
+            return
+        self.centroids = kmeans(data, self.nlist, seed=self.seed)
+        assignment = np.argmax(data @ self.centroids.T, axis=1)
+        
+        self._lists = [VectorBlock(self.dim, capacity=16, dtype=self.dtype) for _ in range(self.nlist)]
+        self._assignment = {}
+        for item_id, row, target in zip(ids.tolist(), data, assignment.tolist()):
+            self._lists[target].upsert(item_id, row)
+            self._assignment[item_id] = target
+        self._trained_size = len(ids)
+    
+    def search(
+        self,
+        vector,
+        k: int,
+        exclude_id: Optional[int] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        if not len(self):
+            return []
+        query = normalize(vector)
+        
+        if self.is_trained:
+            # Lists emptied by removals are skipped, so the nearest non-empty
+            # ones are probed instead.
+            order = np.argsort(-(self.centroids @ query))
+            probes = [probe for probe in order.tolist() if self._lists[probe].size][:nprobe or self.nprobe]
+        else:
+            probes = [0]
+        
+        parts = [self._lists[probe].scores(query) for probe in probes if self._lists[probe].size]
+        if not parts:
+            return []
+        scores = np.concatenate([part[0] for part in parts])
+        ids = np.concatenate([part[1] for part in parts])
+        if exclude_id is not None:
+            scores[ids == exclude_id] = -np.inf
+        return _top_k(scores, ids, k)
+    
+    def _all_rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        blocks = [block for block in self._lists if block.size]
+        if not blocks:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.dim or 0), dtype=np.float32)
+        return (
+            np.concatenate([block.ids[:block.size] for block in blocks]),
+            np.concatenate([block.rows() for block in blocks])
+        )
+
+
+def create_index(kind: str, **options) -> VectorIndex:
+    if kind == "exact":
+        return ExactIndex(**options)
+    if kind == "ivf":
+        return IVFIndex(**options)
+    raise ValueError(f"Unknown vector index: {kind}")
@@ -0,0 +1,62 @@
+"""Recall@10 vs latency of the IVF index against exact search.
+
+Run from backend/: python -m benchmarks.bench_ann [goals] [dim]
+"""
+import sys
+import time
+import numpy as np
+from app.services.vector_index import ExactIndex, IVFIndex
+
+
+K = 10
+QUERIES = 100
+
+
+def clustered(n: int, dim: int, rng: np.random.Generator, clusters: int = 500) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, n)
+    return centers[labels] + 0.5 * rng.standard_normal((n, dim), dtype=np.float32)
+
+
+def timed(index, queries, **options):
+    start = time.perf_counter()
+    results = [index.search(query, K, **options) for query in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    rng = np.random.default_rng(0)
+    data = clustered(size, dim, rng)
+    queries = clustered(QUERIES, dim, rng)
+    
+    exact = ExactIndex()
+    for item_id, vector in enumerate(data):
+        exact.upsert(item_id, vector)
+    
+    nlist = max(int(4 * np.sqrt(size)), 1)
+    start = time.perf_counter()
+    ivf = IVFIndex(nlist=nlist, train_factor=1)
+    for item_id, vector in enumerate(data):
+        ivf.upsert(item_id, vector)
+    ivf.train()
+    build_s = time.perf_counter() - start
+    
+    truth, exact_ms = timed(exact, queries)
+    truth_sets = [{item_id for item_id, _ in hits} for hits in truth]
+    
+    print(f"goals={size} dim={dim} nlist={nlist} build={build_s:.1f}s")
+    print(f"{'index':>12}  {'ms/query':>9}  {'recall@10':>9}")
+    print(f"{'exact':>12}  {exact_ms:>9.3f}  {1.0:>9.3f}")
+    for nprobe in [1, 4, 16, 64]:
+        results, ms = timed(ivf, queries, nprobe=nprobe)
+        recall = np.mean([
+            len(expected & {item_id for item_id, _ in hits}) / K
+            for expected, hits in zip(truth_sets, results)
+        ])
+        print(f"{'ivf/' + str(nprobe):>12}  {ms:>9.3f}  {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Latency of POST /events while slow decompositions are in flight.
+
+Run from backend/: python -m benchmarks.bench_async_routes [decompositions] [llm_seconds]
+Decomposition requests are re-issued as soon as they finish, so the load
+stays constant. "blocking" mirrors the old sync routes: each decomposition
+holds a threadpool worker for the whole LLM call and /events needs one too.
+"async" is the current app with the LLM call replaced by a sleep: goals are
+decomposed by the background job queue and each client waits for its job on
+the server-sent events stream before creating the next goal.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import httpx
+import numpy as np
+from fastapi import Depends, FastAPI
+from sqlmodel import SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import create_async_db_engine, create_db_engine, get_async_read_session, get_async_session
+from app.models import Action, EnergyLevel, Goal
+from app.routes import goals, jobs, logs
+from app.services.decompose import ActionDecomposition, decompose_service
+from app.services.jobs import decomposition_queue
+
+
+EVENTS = 200
+
+
+def legacy_app(engine, llm_seconds: float) -> FastAPI:
+    app = FastAPI()
+    
+    def get_session():
+        with Session(engine) as session:
+            yield session
+    
+    @app.post("/goals/")
+    def create_goal(request: goals.CreateGoalRequest, session: Session = Depends(get_session)):
+        time.sleep(llm_seconds)
+        return {"status": "ok"}
+    
+    @app.post("/events/")
+    def log_event(request: logs.LogEventRequest, session: Session = Depends(get_session)):
+        return logs.save_event(session, request)
+    
+    return app
+
+
+def async_app(async_engine, llm_seconds: float, decompositions: int) -> FastAPI:
+    app = FastAPI()
+    app.include_router(goals.router)
+    app.include_router(jobs.router)
+    app.include_router(logs.router)
+    
+    async def get_bench_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    
+    async def slow_stream(description: str, use_cache: bool = True):
+        await asyncio.sleep(llm_seconds)
+        yield ActionDecomposition(description=description, duration_min=10, energy_level="low")
+    
+    app.dependency_overrides[get_async_session] = get_bench_session
+    app.dependency_overrides[get_async_read_session] = get_bench_session
+    decompose_service.stream = slow_stream
+    decomposition_queue.session_factory = lambda: AsyncSession(async_engine, expire_on_commit=False)
+    decomposition_queue.workers = decompositions
+    decomposition_queue.max_pending = decompositions
+    return app
+
+
+async def measure(app: FastAPI, decompositions: int, background_jobs: bool) -> np.ndarray:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        done = asyncio.Event()
+        
+        async def decompose_forever(i: int) -> None:
+            while not done.is_set():
+                response = await client.post("/goals/", json={"description": f"Goal {i}"})
+                if "location" in response.headers:
+                    async with client.stream("GET", response.headers["location"] + "/events") as events:
+                        async for _ in events.aiter_lines():
+                            pass
+        
+        if background_jobs:
+            await decomposition_queue.start()
+        pending = [asyncio.create_task(decompose_forever(i)) for i in range(decompositions)]
+        await asyncio.sleep(0.05)
+        latencies = []
+        for i in range(EVENTS):
+            start = time.perf_counter()
+            response = await client.post("/events/", json={"action_id": i % 10 + 1, "status": "failed"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        done.set()
+        await asyncio.gather(*pending)
+        if background_jobs:
+            await decomposition_queue.stop()
+    return np.array(latencies) * 1000
+
+
+def seed(engine) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Goal(id=1, description="Bench"))
+        for action_id in range(1, 11):
+            session.add(Action(id=action_id, goal_id=1, description="a", duration_min=5, energy_level=EnergyLevel.low))
+        session.commit()
+
+
+def main() -> None:
+    decompositions = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    llm_seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    print(f"decompositions={decompositions} llm={llm_seconds}s events={EVENTS}")
+    
+    for name in ("blocking", "async"):
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+        engine = create_db_engine(url)
+        seed(engine)
+        if name == "blocking":
+            app = legacy_app(engine, llm_seconds)
+        else:
+            app = async_app(create_async_db_engine(url), llm_seconds, decompositions)
+        latencies = asyncio.run(measure(app, decompositions, name == "async"))
+        print(
+            f"{name:>9}  /events p50={np.percentile(latencies, 50):>8.1f} ms  "
+            f"p99={np.percentile(latencies, 99):>8.1f} ms  max={latencies.max():>8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
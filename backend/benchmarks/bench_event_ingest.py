@@ -0,0 +1,111 @@
+"""Throughput of /events/batch: row-by-row ORM ingestion vs `log_events`.
+
+Run from backend/: python -m benchmarks.bench_event_ingest [events] [requests]
+Each request carries `events` events (10k by default) spread over 5k actions
+in 50 goals. The row-by-row variant is the previous batch handler: one
+`session.get` and one ORM insert per event, no breakpoint detection. Each
+variant runs on a fresh file under /tmp with the tuned SQLite profile.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from sqlmodel import SQLModel, Session
+from app.db import create_db_engine
+from app.models import Action, ActionStatus, CompletionEvent, CompletionStatus, EnergyLevel, Goal
+from app.services.actions import promote_ready_dependents
+from app.services.breakpoints import breakpoint_service
+from app.services.events import log_events
+from app.services.graph import refresh_graph_analytics
+from app.services.mes import mes_service, global_mes_queue
+from app.services.rollups import record_events
+
+
+GOALS = 50
+ACTIONS = 5000
+REASONS = ["low energy", "unclear clarity", "external blocker", None]
+
+
+def seed(engine) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for goal_id in range(1, GOALS + 1):
+            session.add(Goal(id=goal_id, description=f"Goal {goal_id}"))
+        for action_id in range(1, ACTIONS + 1):
+            session.add(Action(
+                id=action_id,
+                goal_id=action_id % GOALS + 1,
+                description="a",
+                duration_min=5,
+                energy_level=EnergyLevel.low
+            ))
+        session.commit()
+
+
+def generate(events: int, rng: random.Random) -> list:
+    statuses = [CompletionStatus.done, CompletionStatus.failed, CompletionStatus.blocked]
+    rows = []
+    for _ in range(events):
+        status = rng.choices(statuses, [0.6, 0.35, 0.05])[0]
+        reason = rng.choice(REASONS) if status == CompletionStatus.failed else None
+        rows.append((rng.randint(1, ACTIONS), status, reason))
+    return rows
+
+
+def row_by_row(session: Session, rows: list) -> list:
+    events = []
+    touched = {}
+    for action_id, status, reason in rows:
+        action = session.get(Action, action_id)
+        if not action:
+            continue
+        event = CompletionEvent(action_id=action_id, goal_id=action.goal_id, status=status, failure_reason=reason)
+        session.add(event)
+        events.append(event)
+        if status == CompletionStatus.done:
+            action.status = ActionStatus.done
+        elif status == CompletionStatus.blocked:
+            action.status = ActionStatus.blocked
+        session.add(action)
+        touched[action.id] = action
+    session.flush()
+    record_events(session, events)
+    promote_ready_dependents(session, [a.id for a in touched.values() if a.status == ActionStatus.done])
+    for goal_id in {a.goal_id for a in touched.values()}:
+        refresh_graph_analytics(session, session.get(Goal, goal_id))
+    session.commit()
+    return events
+
+
+def run(name: str, ingest, batches: list) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+    seed(engine)
+    for service in (mes_service, global_mes_queue, breakpoint_service):
+        service.clear()
+    
+    timings = []
+    for rows in batches:
+        with Session(engine, expire_on_commit=False) as session:
+            start = time.perf_counter()
+            ingest(session, rows)
+            timings.append(time.perf_counter() - start)
+    total = sum(len(rows) for rows in batches)
+    print(f"{name:>12}  {sum(timings) / len(timings) * 1000:>9.1f} ms/request  {total / sum(timings):>10,.0f} events/s")
+    engine.dispose()
+    os.remove(path)
+
+
+def main() -> None:
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(0)
+    batches = [generate(events, rng) for _ in range(requests)]
+    print(f"events/request={events} requests={requests}")
+    run("row-by-row", row_by_row, batches)
+    run("bulk", log_events, batches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Stats group-bys over raw SQL vs the NumPy column store.
+
+Run from backend/: python -m benchmarks.bench_event_store [events]
+Builds a throwaway SQLite file under /tmp (1M events by default; tried up to
+50M). The store is filled straight from arrays, so the build stays fast.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlmodel import SQLModel, Session, create_engine, select, func
+from app.models import CompletionEvent, CompletionStatus
+from app.services.event_store import STATUS_CODES, EventColumnStore, to_micros
+
+
+REASONS = ["low energy", "unclear clarity", "external blocker", "no time"]
+STATUSES = [CompletionStatus.done, CompletionStatus.failed, CompletionStatus.blocked]
+
+
+def generate(events: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    now = to_micros(datetime.utcnow())
+    return {
+        "action_id": rng.integers(1, 50_000, events, dtype=np.int32),
+        "goal_id": rng.integers(1, 5_000, events, dtype=np.int32),
+        "status": rng.choice(np.array([STATUS_CODES[s] for s in STATUSES], dtype=np.uint8), events, p=[0.7, 0.25, 0.05]),
+        "timestamp": np.sort(now - rng.integers(0, 30 * 86400 * 10**6, events, dtype=np.int64)),
+        "reason": rng.integers(0, len(REASONS) + 1, events, dtype=np.int32)
+    }
+
+
+def build(engine, data: dict) -> None:
+    SQLModel.metadata.create_all(engine)
+    status_names = {STATUS_CODES[s]: s.name for s in STATUSES}
+    reasons = REASONS + [None]
+    chunk = 200_000
+    with engine.begin() as conn:
+        raw = conn.connection.driver_connection
+        for start in range(0, len(data["action_id"]), chunk):
+            end = start + chunk
+            raw.executemany(
+                "INSERT INTO completionevent (action_id, goal_id, status, timestamp, failure_reason) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (a, g, status_names[s], str(datetime(1970, 1, 1) + timedelta(microseconds=t)), reasons[r])
+                    for a, g, s, t, r in zip(
+                        data["action_id"][start:end].tolist(),
+                        data["goal_id"][start:end].tolist(),
+                        data["status"][start:end].tolist(),
+                        data["timestamp"][start:end].tolist(),
+                        data["reason"][start:end].tolist()
+                    )
+                )
+            )
+
+
+def sql_stats(session: Session, since: datetime) -> tuple:
+    done = session.exec(
+        select(func.count(CompletionEvent.id))
+        .where(CompletionEvent.status == CompletionStatus.done)
+        .where(CompletionEvent.timestamp >= since)
+    ).one()
+    reasons = session.exec(
+        select(CompletionEvent.failure_reason, func.count(CompletionEvent.id))
+        .where(CompletionEvent.status == CompletionStatus.failed)
+        .where(CompletionEvent.timestamp >= since)
+        .where(CompletionEvent.failure_reason.isnot(None))
+        .group_by(CompletionEvent.failure_reason)
+    ).all()
+    actions = session.exec(
+        select(CompletionEvent.action_id, func.count(CompletionEvent.id))
+        .where(CompletionEvent.status == CompletionStatus.failed)
+        .where(CompletionEvent.timestamp >= since)
+        .group_by(CompletionEvent.action_id)
+        .having(func.count(CompletionEvent.id) >= 3)
+    ).all()
+    return done, dict(reasons), len(actions)
+
+
+def store_stats(store: EventColumnStore, since: datetime) -> tuple:
+    done = store.status_counts(since)[CompletionStatus.done]
+    reasons = store.reason_counts(CompletionStatus.failed, since)
+    actions = store.action_counts(CompletionStatus.failed, since, 3)
+    return done, reasons, len(actions)
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    data = generate(events)
+    since = datetime.utcnow() - timedelta(days=7)
+    
+    store = EventColumnStore()
+    store.extend_columns(data["action_id"], data["goal_id"], data["status"], data["timestamp"], data["reason"], REASONS)
+    print(f"events={events} store={store.nbytes / 2**20:.1f} MiB")
+    
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    start = time.perf_counter()
+    build(engine, data)
+    print(f"sqlite build={time.perf_counter() - start:.1f}s")
+    
+    with Session(engine) as session:
+        assert sql_stats(session, since) == store_stats(store, since)
+        print(f"{'sql stats':>18}  {timed(lambda: sql_stats(session, since), 3):>10.2f} ms")
+        print(f"{'store stats':>18}  {timed(lambda: store_stats(store, since), 3):>10.2f} ms")
+        print(f"{'store failures':>18}  {timed(lambda: store.failures(range(1, 50_000, 50)), 3):>10.2f} ms")
+        if events <= 5_000_000:
+            print(f"{'store load':>18}  {timed(lambda: EventColumnStore().load(session), 1):>10.2f} ms")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
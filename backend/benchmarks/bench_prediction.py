@@ -0,0 +1,74 @@
+"""Per-request cost of /stats/prediction on a large synthetic event table.
+
+Run from backend/: python -m benchmarks.bench_prediction [events]
+Builds a throwaway SQLite file under /tmp (10M events by default).
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from sqlmodel import SQLModel, Session, create_engine, select, func
+from app.core.cache import get_cache
+from app.models import Breakpoint, BreakpointPattern, CompletionEvent
+from app.services.stats import StatsService, compute_prediction_snapshot
+
+
+PATTERNS = [pattern.value for pattern in BreakpointPattern]
+
+
+def build(engine, events: int) -> None:
+    SQLModel.metadata.create_all(engine)
+    now = datetime.utcnow().isoformat(sep=" ")
+    chunk = 100_000
+    with engine.begin() as conn:
+        raw = conn.connection.driver_connection
+        for start in range(0, events, chunk):
+            raw.executemany(
+                "INSERT INTO completionevent (action_id, goal_id, status, timestamp) VALUES (?, ?, 'done', ?)",
+                ((i % 5000 + 1, i % 500 + 1, now) for i in range(start, min(start + chunk, events)))
+            )
+        raw.executemany(
+            "INSERT INTO breakpoint (action_id, failure_count, pattern, reasons, detected_at) VALUES (?, 2, ?, '[]', ?)",
+            ((i + 1, PATTERNS[i % len(PATTERNS)], now) for i in range(1000))
+        )
+
+
+def legacy_prediction(session: Session) -> list:
+    breakpoints = session.exec(
+        select(Breakpoint.pattern, func.count(Breakpoint.id)).group_by(Breakpoint.pattern)
+    ).all()
+    result = []
+    for pattern, count in breakpoints:
+        total_events = session.exec(select(func.count(CompletionEvent.id))).one()
+        result.append((pattern, count / max(total_events, 1)))
+    return result
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    start = time.perf_counter()
+    build(engine, events)
+    print(f"events={events} build={time.perf_counter() - start:.1f}s")
+    
+    service = StatsService()
+    with Session(engine) as session:
+        print(f"{'legacy N+1':>16}  {timed(lambda: legacy_prediction(session), 3):>10.2f} ms")
+        print(f"{'single pass':>16}  {timed(lambda: compute_prediction_snapshot(session), 3):>10.2f} ms")
+        get_cache().clear()
+        service.get_prediction(session)
+        print(f"{'snapshot':>16}  {timed(lambda: service.get_prediction(session), 1000):>10.4f} ms")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
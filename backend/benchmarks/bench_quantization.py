@@ -0,0 +1,52 @@
+"""Memory per 100k goals, latency and recall@5 for each embedding dtype.
+
+Run from backend/: python -m benchmarks.bench_quantization [goals] [dim]
+"""
+import sys
+import time
+import numpy as np
+from app.services.vector_index import ExactIndex
+
+
+K = 5
+QUERIES = 100
+RERANK_FACTOR = 4
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 1536
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((200, dim), dtype=np.float32)
+    data = centers[rng.integers(0, 200, size)] + 0.5 * rng.standard_normal((size, dim), dtype=np.float32)
+    queries = data[rng.choice(size, QUERIES, replace=False)] + 0.1 * rng.standard_normal((QUERIES, dim), dtype=np.float32)
+    
+    indexes = {dtype: ExactIndex(initial_capacity=size, dtype=dtype) for dtype in ["float32", "float16", "int8"]}
+    for index in indexes.values():
+        for item_id, vector in enumerate(data):
+            index.upsert(item_id, vector)
+    
+    truth = [{item_id for item_id, _ in indexes["float32"].search(query, K)} for query in queries]
+    exact = indexes["float32"]
+    
+    print(f"goals={size} dim={dim}")
+    print(f"{'dtype':>8}  {'MB/100k':>8}  {'ms/query':>9}  {'recall@5':>8}  {'reranked':>8}")
+    for dtype, index in indexes.items():
+        start = time.perf_counter()
+        results = [index.search(query, K * RERANK_FACTOR) for query in queries]
+        ms = (time.perf_counter() - start) / QUERIES * 1000
+        
+        recall = np.mean([len(t & {i for i, _ in hits[:K]}) / K for t, hits in zip(truth, results)])
+        reranked = []
+        for query, hits in zip(queries, results):
+            ids = [item_id for item_id, _ in hits]
+            rescored = sorted(ids, key=lambda item_id: -float(exact.get(item_id) @ query))
+            reranked.append(set(rescored[:K]))
+        rerank_recall = np.mean([len(t & r) / K for t, r in zip(truth, reranked)])
+        
+        mb_per_100k = index.memory_bytes() / size * 100_000 / 2**20
+        print(f"{dtype:>8}  {mb_per_100k:>8.1f}  {ms:>9.3f}  {recall:>8.3f}  {rerank_recall:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
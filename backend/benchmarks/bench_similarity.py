@@ -0,0 +1,36 @@
+"""Top-k similarity latency for the in-memory embedding store.
+
+Run from backend/: python -m benchmarks.bench_similarity
+"""
+import time
+import numpy as np
+from app.services.embeddings import EmbeddingStore
+
+
+DIM = 1536
+SIZES = [1_000, 10_000, 100_000]
+QUERIES = 50
+
+
+def bench(size: int, rng: np.random.Generator) -> float:
+    store = EmbeddingStore()
+    vectors = rng.standard_normal((size, DIM), dtype=np.float32)
+    for goal_id, vector in enumerate(vectors):
+        store.upsert(goal_id, vector)
+    
+    queries = rng.standard_normal((QUERIES, DIM), dtype=np.float32)
+    start = time.perf_counter()
+    for query in queries:
+        store.top_k(query, k=5)
+    return (time.perf_counter() - start) / QUERIES * 1000
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    print(f"{'goals':>8}  {'top-5 ms':>10}")
+    for size in SIZES:
+        print(f"{size:>8}  {bench(size, rng):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
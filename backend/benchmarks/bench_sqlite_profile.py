@@ -0,0 +1,103 @@
+"""Write throughput of event logging under concurrent stats readers.
+
+Run from backend/: python -m benchmarks.bench_sqlite_profile [seconds] [readers]
+Compares SQLite defaults (rollback journal, synchronous=FULL, one engine)
+with the tuned profile from Settings (WAL, synchronous=NORMAL, separate
+read pool). Each run uses a fresh file under /tmp.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy import exc
+from sqlmodel import SQLModel, Session
+from app.config import Settings
+from app.db import create_db_engine
+from app.models import Action, CompletionEvent, CompletionStatus, EnergyLevel, Goal
+from app.services.rollups import record_events
+from app.services.stats import parasitic, summary
+
+
+PROFILES = {
+    "default": (Settings(sqlite_journal_mode="delete", sqlite_synchronous="full", sqlite_mmap_size=0, sqlite_cache_size=-2000), False),
+    "tuned": (Settings(), True),
+}
+
+
+def seed(engine) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Goal(id=1, description="Bench"))
+        for action_id in range(1, 101):
+            session.add(Action(id=action_id, goal_id=1, description="a", duration_min=5, energy_level=EnergyLevel.low))
+        session.commit()
+
+
+def writer(engine, stop: threading.Event, counts: dict) -> None:
+    i = 0
+    while not stop.is_set():
+        i += 1
+        try:
+            with Session(engine) as session:
+                event = CompletionEvent(
+                    action_id=i % 100 + 1,
+                    goal_id=1,
+                    status=CompletionStatus.failed if i % 4 == 0 else CompletionStatus.done,
+                    failure_reason="no time" if i % 4 == 0 else None
+                )
+                session.add(event)
+                session.flush()
+                record_events(session, [event])
+                session.commit()
+            counts["writes"] += 1
+        except exc.OperationalError:
+            counts["errors"] += 1
+
+
+def reader(engine, stop: threading.Event, counts: dict) -> None:
+    while not stop.is_set():
+        try:
+            with Session(engine) as session:
+                summary(session, timedelta(days=7))
+                parasitic(session, timedelta(days=7))
+            counts["reads"] += 1
+        except exc.OperationalError:
+            counts["errors"] += 1
+
+
+def run(name: str, seconds: float, readers: int) -> None:
+    profile, split = PROFILES[name]
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_db_engine(url, profile=profile)
+    read_engine = create_db_engine(url, read_only=True, profile=profile) if split else engine
+    seed(engine)
+    
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    stop = threading.Event()
+    threads = [threading.Thread(target=writer, args=(engine, stop, counts))]
+    threads += [threading.Thread(target=reader, args=(read_engine, stop, counts)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    
+    print(
+        f"{name:>8}  writes/s={counts['writes'] / seconds:>8.1f}  "
+        f"reads/s={counts['reads'] / seconds:>8.1f}  errors={counts['errors']}"
+    )
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f"seconds={seconds} readers={readers}")
+    for name in PROFILES:
+        run(name, seconds, readers)
+
+
+if __name__ == "__main__":
+    main()
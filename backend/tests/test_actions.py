@@ -0,0 +1,76 @@
+import pytest
+import json
+from sqlmodel import SQLModel, Session, create_engine, select
+from app.migrations import run_migrations
+from app.models import Action, ActionDependency, ActionStatus, EnergyLevel, Goal
+from app.services.actions import create_actions, ready_actions, promote_ready_dependents
+
+
+STEPS = [
+    {"description": "Install Python", "duration_min": 15, "energy_level": "low", "dependencies": []},
+    {"description": "Read tutorial", "duration_min": 45, "energy_level": "medium", "dependencies": [0]},
+    {"description": "Write script", "duration_min": 60, "energy_level": "high", "dependencies": [0, 1, 7, 2]}
+]
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _goal(session):
+    goal = Goal(description="Learn Python")
+    session.add(goal)
+    session.commit()
+    session.refresh(goal)
+    return goal
+
+
+def test_create_actions_maps_step_indices_to_edges(session):
+    goal = _goal(session)
+    
+    actions = create_actions(session, goal, STEPS)
+    session.commit()
+    
+    edges = session.exec(select(ActionDependency.action_id, ActionDependency.depends_on_id)).all()
+    assert sorted(edges) == [
+        (actions[1].id, actions[0].id),
+        (actions[2].id, actions[0].id),
+        (actions[2].id, actions[1].id)
+    ]
+    assert json.loads(actions[2].dependencies) == [actions[0].id, actions[1].id]
+    assert [a.status for a in actions] == [ActionStatus.available, ActionStatus.pending, ActionStatus.pending]
+
+
+def test_ready_actions_and_promotion_follow_dependency_status(session):
+    goal = _goal(session)
+    actions = create_actions(session, goal, STEPS)
+    session.commit()
+    
+    assert [a.id for a in ready_actions(session, goal.id)] == [actions[0].id]
+    
+    actions[0].status = ActionStatus.done
+    session.add(actions[0])
+    session.flush()
+    assert promote_ready_dependents(session, [actions[0].id]) == 1
+    session.commit()
+    
+    assert [a.id for a in ready_actions(session, goal.id)] == [actions[1].id]
+    assert session.get(Action, actions[1].id).status == ActionStatus.available
+    assert session.get(Action, actions[2].id).status == ActionStatus.pending
+
+
+def test_migration_backfills_edges_from_json(session):
+    goal = _goal(session)
+    session.add(Action(id=1, goal_id=goal.id, description="A", duration_min=10, energy_level=EnergyLevel.low))
+    session.add(Action(id=2, goal_id=goal.id, description="B", duration_min=10, energy_level=EnergyLevel.low, dependencies="[1]"))
+    session.commit()
+    
+    assert 1 in run_migrations(session.get_bind())
+    assert run_migrations(session.get_bind()) == []
+    
+    edges = session.exec(select(ActionDependency)).all()
+    assert [(e.action_id, e.depends_on_id, e.goal_id) for e in edges] == [(2, 1, goal.id)]
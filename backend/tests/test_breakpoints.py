@@ -1,7 +1,12 @@
 import pytest
-from app.services.breakpoints import detect_breakpoints
-from app.models import CompletionEvent, CompletionStatus, BreakpointPattern
-from datetime import datetime
+import json
+from sqlmodel import SQLModel, Session, create_engine, select
+from app.services.breakpoints import detect_breakpoints, BreakpointService
+from app.services.event_store import EventColumnStore
+from app.services.stats import compute_prediction_snapshot, render_prediction, stats_service
+from app.core.cache import get_cache
+from app.models import CompletionEvent, CompletionStatus, BreakpointPattern, Breakpoint
+from datetime import datetime, timedelta
 
 
 def test_detect_breakpoints_single_failure():
@@ -107,3 +112,132 @@ def test_detect_breakpoints_mixed_actions():
     assert len(result) == 1
     assert result[0]["action_id"] == 2
     assert result[0]["pattern"] == BreakpointPattern.clarity
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _log(session, service, status, reason=None, timestamp=None):
+    event = CompletionEvent(
+        action_id=1,
+        goal_id=1,
+        status=status,
+        failure_reason=reason,
+        timestamp=timestamp or datetime.utcnow()
+    )
+    session.add(event)
+    session.flush()
+    result = service.record_many(session, [event])
+    session.commit()
+    return result[0] if result else None
+
+
+def test_breakpoint_service_upserts_single_row(session):
+    service = BreakpointService(threshold=2)
+    
+    assert _log(session, service, CompletionStatus.failed, "energy too low") is None
+    _log(session, service, CompletionStatus.done)
+    _log(session, service, CompletionStatus.failed, "time constraint")
+    _log(session, service, CompletionStatus.failed, "energy issue")
+    
+    rows = session.exec(select(Breakpoint)).all()
+    assert len(rows) == 1
+    assert rows[0].failure_count == 3
+    assert rows[0].pattern == BreakpointPattern.energy
+    assert json.loads(rows[0].reasons)[0] == "energy too low"
+
+
+def test_breakpoint_service_seeds_state_from_history(session):
+    _log(session, BreakpointService(threshold=5), CompletionStatus.failed, "clarity issue")
+    
+    fresh = BreakpointService(threshold=2)
+    breakpoint = _log(session, fresh, CompletionStatus.failed, "clarity unclear")
+    
+    assert breakpoint is not None
+    assert breakpoint.failure_count == 2
+    assert breakpoint.pattern == BreakpointPattern.clarity
+
+
+def test_breakpoint_service_decays_old_failures(session):
+    service = BreakpointService(threshold=2, half_life_hours=24)
+    now = datetime.utcnow()
+    
+    _log(session, service, CompletionStatus.failed, "time", now - timedelta(days=7))
+    assert _log(session, service, CompletionStatus.failed, "time", now) is None
+    assert _log(session, service, CompletionStatus.failed, "time", now) is not None
+
+
+def test_history_from_the_event_store_matches_sql(session, monkeypatch):
+    now = datetime.utcnow()
+    events = [
+        CompletionEvent(
+            action_id=action_id,
+            goal_id=1,
+            status=CompletionStatus.failed if minutes % 3 else CompletionStatus.done,
+            failure_reason=["low energy", None, "external blocker"][minutes % 3],
+            timestamp=now - timedelta(minutes=minutes)
+        )
+        for minutes in range(60)
+        for action_id in (1, 2, 3)
+    ]
+    session.add_all(events)
+    session.commit()
+    store = EventColumnStore()
+    store.extend(events)
+    service = BreakpointService()
+    
+    expected = [tuple(row) for row in service._history(session, [1, 3], None)]
+    monkeypatch.setattr("app.services.breakpoints.active_store", lambda: store)
+    
+    assert service._history(session, [1, 3], None) == sorted(expected, key=lambda row: (row[0], row[1]))
+
+
+def test_services_without_shared_state_keep_one_row_per_action(session):
+    first, second = BreakpointService(threshold=1), BreakpointService(threshold=1)
+    
+    _log(session, first, CompletionStatus.failed, "energy too low")
+    breakpoint = _log(session, second, CompletionStatus.failed, "unclear clarity")
+    
+    rows = session.exec(select(Breakpoint)).all()
+    assert [row.id for row in rows] == [breakpoint.id]
+    assert (rows[0].failure_count, rows[0].pattern) == (2, BreakpointPattern.energy)
+
+
+def test_stats_snapshot_is_patched_after_commit(session):
+    get_cache().clear()
+    service = BreakpointService(threshold=1)
+    stats_service.get_prediction(session)
+    
+    event = CompletionEvent(action_id=1, goal_id=1, status=CompletionStatus.failed, failure_reason="external")
+    session.add(event)
+    session.flush()
+    service.record_many(session, [event])
+    session.rollback()
+    service.after_commit(session)
+    assert stats_service.get_prediction(session) == render_prediction(compute_prediction_snapshot(session))
+    
+    _log(session, service, CompletionStatus.failed, "external")
+    service.after_commit(session)
+    assert stats_service.get_prediction(session) == render_prediction(compute_prediction_snapshot(session))
+    get_cache().clear()
+
+
+def test_uncommitted_failures_do_not_stay_in_the_counters(session):
+    service = BreakpointService(threshold=3)
+    _log(session, service, CompletionStatus.failed, "energy too low")
+    
+    for end in (session.rollback, session.close):
+        event = CompletionEvent(action_id=1, goal_id=1, status=CompletionStatus.failed, failure_reason="energy")
+        session.add(event)
+        session.flush()
+        service.record_many(session, [event])
+        end()
+    
+    assert _log(session, service, CompletionStatus.failed, "energy too low") is None
+    breakpoint = _log(session, service, CompletionStatus.failed, "energy too low")
+    assert breakpoint.failure_count == 3
@@ -0,0 +1,310 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.core.cache import CacheBackend, LRUCache, SimpleCache, cached, get_cache, goal_tag, make_key
+from app.core.shared_cache import SQLiteCache
+
+
+@pytest.fixture(autouse=True)
+def clean_global_cache():
+    get_cache().clear()
+    yield
+    get_cache().clear()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_on_the_monotonic_clock():
+    clock = FakeClock()
+    cache = LRUCache(default_ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=30)
+    
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.cleanup_expired() == 0
+    clock.now = 30
+    assert cache.cleanup_expired() == 1
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 2
+
+
+def test_evicts_least_recently_used_beyond_max_entries():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 3, 0)
+
+
+def test_evicts_by_size_estimate():
+    cache = LRUCache(max_bytes=10, sizeof=len)
+    cache.set("a", "12345")
+    cache.set("b", "12345")
+    cache.set("a", "123")
+    cache.set("c", "1234")
+    
+    assert "b" not in cache
+    assert cache.stats()["bytes"] == 7
+
+
+def test_concurrent_writers_respect_bound():
+    cache = LRUCache(max_entries=100)
+    
+    def write(offset):
+        for i in range(2000):
+            cache.set(f"{offset}:{i}", i)
+            cache.get(f"{offset}:{i - 1}")
+    
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    stats = cache.stats()
+    assert stats["entries"] == 100
+    assert stats["evictions"] == 8 * 2000 - 100
+
+
+def test_sweeper_drops_expired_entries():
+    cache = LRUCache(default_ttl=0.01)
+    cache.set("a", 1)
+    cache.start_sweeper(0.02)
+    try:
+        for _ in range(100):
+            if len(cache) == 0:
+                break
+            threading.Event().wait(0.01)
+        assert len(cache) == 0
+    finally:
+        cache.stop_sweeper()
+
+
+def test_simple_cache_is_a_drop_in():
+    cache = SimpleCache()
+    cache.set("a", {"x": 1}, ttl_seconds=300)
+    assert cache.get("a") == {"x": 1}
+    cache.delete("a")
+    assert cache.get("a") is None
+    cache.set("b", 1)
+    cache.clear()
+    assert cache.get("b") is None
+    cache.cleanup_expired()
+
+
+def test_incomplete_backend_fails_when_created():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return None
+    
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_cached_coalesces_concurrent_misses():
+    calls = []
+    started = threading.Event()
+    
+    @cached(ttl_seconds=60)
+    def slow(x):
+        calls.append(x)
+        started.set()
+        time.sleep(0.05)
+        return x * 2
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow(21))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert calls == [21]
+    assert results == [42] * 8
+
+
+def test_cached_coroutines_are_coalesced_and_cache_none():
+    calls = []
+    
+    @cached(ttl_seconds=60)
+    async def lookup(goal_id, verbose=False):
+        calls.append(goal_id)
+        await asyncio.sleep(0.01)
+        return None
+    
+    async def run():
+        await asyncio.gather(*(lookup(1) for _ in range(5)))
+        await lookup(1)
+        await lookup(1, verbose=True)
+    
+    asyncio.run(run())
+    assert calls == [1, 1]
+
+
+def test_cached_serves_stale_value_while_revalidating(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    version = [1]
+    refreshed = threading.Event()
+    
+    @cached(ttl_seconds=10, stale_ttl=60)
+    def value():
+        result = version[0]
+        refreshed.set()
+        return result
+    
+    assert value() == 1
+    version[0] = 2
+    now[0] += 11
+    refreshed.clear()
+    assert value() == 1
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if value() == 2:
+            break
+        time.sleep(0.01)
+    assert value() == 2
+
+
+def test_cached_errors_reach_every_waiter_and_are_not_cached():
+    attempts = []
+    
+    @cached(ttl_seconds=60)
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+    
+    async def run():
+        results = await asyncio.gather(flaky(), flaky(), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        return await flaky()
+    
+    assert asyncio.run(run()) == "ok"
+    assert len(attempts) == 2
+
+
+def test_cancelling_the_first_caller_leaves_the_others_waiting():
+    calls = []
+    
+    @cached(ttl_seconds=60)
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+    
+    async def run():
+        first = asyncio.create_task(slow())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(slow())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "ok"
+        assert first.cancelled()
+        return await slow()
+    
+    assert asyncio.run(run()) == "ok"
+    assert len(calls) == 1
+
+
+def test_make_key_is_cheap_for_scalars_and_stable():
+    assert make_key("f", (1, "a"), {"b": 2, "a": None}) == make_key("f", (1, "a"), {"a": None, "b": 2})
+    assert make_key("f", (1,), {}) != make_key("f", ("1",), {})
+    assert make_key("f", ([1, 2],), {}) == make_key("f", ([1, 2],), {})
+
+
+def test_tags_purge_entries_and_update_patches_atomically():
+    cache = LRUCache()
+    cache.set("mes:1:5", "a", tags=["goal:1"])
+    cache.set("mes:1:10", "b", tags=["goal:1"])
+    cache.set("mes:2:5", "c", tags=["goal:2"])
+    
+    assert cache.invalidate_tags("goal:1") == 2
+    assert cache.get("mes:1:5") is None
+    assert cache.get("mes:2:5") == "c"
+    
+    assert cache.update("mes:2:5", lambda value: value + "d")
+    assert cache.get("mes:2:5") == "cd"
+    assert not cache.update("missing", lambda value: value)
+    
+    cache.set("mes:2:5", "e")
+    assert cache.invalidate_tags("goal:2") == 0
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = SQLiteCache(path), SQLiteCache(path)
+    
+    first.set("snapshot", {"total_events": 1}, tags=["stats"])
+    first.set("mes:1:5", [1, 2], tags=["goal:1"])
+    assert second.get("snapshot") == {"total_events": 1}
+    
+    def bump(snapshot):
+        return {**snapshot, "total_events": snapshot["total_events"] + 1}
+    
+    threads = [threading.Thread(target=cache.update, args=("snapshot", bump)) for cache in (first, second) * 10]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert first.get("snapshot") == {"total_events": 21}
+    
+    assert second.invalidate_tags("goal:1") == 1
+    assert first.get("mes:1:5") is None
+    
+    first.set("short", 1, ttl_seconds=-1)
+    assert second.get("short") is None
+    assert second.cleanup_expired() == 1
+    assert first.stats()["entries"] == 1
+    first.close()
+    second.close()
+
+
+def test_sqlite_cache_evicts_entries_closest_to_expiry(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=2, evict_every=3)
+    cache.set("long", 1, ttl_seconds=300)
+    cache.set("short", 2, ttl_seconds=10, tags=["t"])
+    cache.set("medium", 3, ttl_seconds=60)
+    
+    assert cache.get("short") is None
+    assert cache.get("long") == 1 and cache.get("medium") == 3
+    assert cache.invalidate_tags("t") == 0
+    assert cache.stats()["evictions"] == 1
+    
+    cache.set("soon", 4, ttl_seconds=5)
+    assert cache.stats()["entries"] == 3
+    cache.cleanup_expired()
+    assert cache.get("soon") is None
+    assert cache.stats()["entries"] == 2
+    cache.close()
+
+
+def test_cached_tags_results_by_arguments():
+    calls = []
+    
+    @cached(ttl_seconds=60, tags=lambda goal_id: [goal_tag(goal_id)])
+    def summary(goal_id):
+        calls.append(goal_id)
+        return goal_id * 10
+    
+    assert summary(1) == 10 and summary(2) == 20 and summary(1) == 10
+    get_cache().invalidate_tags(goal_tag(1))
+    assert summary(1) == 10 and summary(2) == 20
+    assert calls == [1, 2, 1]
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import exc
+from sqlmodel import SQLModel, Session
+from app.config import Settings
+from app.db import create_db_engine, is_memory_url
+from app.models import Goal
+
+
+def test_profile_pragmas_applied(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'chance.db'}", profile=Settings(sqlite_busy_timeout_ms=1234))
+    
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 1234
+    assert engine.pool.size() == Settings().db_pool_size
+
+
+def test_read_engine_rejects_writes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'chance.db'}"
+    engine = create_db_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Goal(description="Written"))
+        session.commit()
+    read_engine = create_db_engine(url, read_only=True)
+    
+    with Session(read_engine) as session:
+        assert session.get(Goal, 1).description == "Written"
+        session.add(Goal(description="Misrouted"))
+        with pytest.raises(exc.OperationalError):
+            session.commit()
+
+
+def test_memory_urls():
+    assert is_memory_url("sqlite://")
+    assert is_memory_url("sqlite:///:memory:")
+    assert not is_memory_url("sqlite:///./chance.db")
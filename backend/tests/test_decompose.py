@@ -1,59 +1,135 @@
 import pytest
-from app.services.decompose import decompose_goal
-from unittest.mock import patch, MagicMock
+import asyncio
+from app.core.disk_cache import DiskCache
+from app.services.decompose import DecomposeService, IncompleteDecomposition
+from unittest.mock import patch, AsyncMock, MagicMock
 
 
-def test_decompose_goal_without_api_key():
-    result = decompose_goal("Learn Python")
+@pytest.fixture(autouse=True)
+def completion_cache(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path / "llm_cache.db"), table="completions")
+    monkeypatch.setattr("app.services.decompose.completion_cache", cache)
+    return cache
+
+
+def collect(goal_description, **kwargs):
+    async def run():
+        return [step async for step in DecomposeService().stream(goal_description, **kwargs)]
+    return asyncio.run(run())
+
+
+async def chunks(content, finish_reason="stop"):
+    for i in range(0, len(content), 16):
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = content[i:i + 16]
+        chunk.choices[0].finish_reason = finish_reason if i + 16 >= len(content) else None
+        yield chunk
+
+
+def test_decompose_without_api_key():
+    result = collect("Learn Python")
     
     assert len(result) >= 1
     assert "Learn Python" in result[0].description
     assert result[0].duration_min > 0
 
 
-@patch('app.services.decompose.OpenAI')
-def test_decompose_goal_with_llm(mock_openai):
-    mock_client = MagicMock()
-    mock_openai.return_value = mock_client
-    
-    mock_response = MagicMock()
-    mock_response.choices[0].message.content = '''[
-        {
-            "description": "Set up Python environment",
-            "duration_min": 30,
-            "energy_level": "low",
-            "dependencies": []
-        },
-        {
-            "description": "Complete basic tutorial",
-            "duration_min": 60,
-            "energy_level": "medium",
-            "dependencies": [0]
-        }
-    ]'''
-    mock_client.chat.completions.create.return_value = mock_response
+def test_decompose_structure():
+    result = collect("Build a web app")
+    
+    for action in result:
+        assert hasattr(action, 'description')
+        assert hasattr(action, 'duration_min')
+        assert hasattr(action, 'energy_level')
+        assert hasattr(action, 'dependencies')
+        assert action.energy_level in ['low', 'medium', 'high']
+
+
+def test_step_parser_handles_split_chunks():
+    from app.services.decompose import StepParser
+    
+    text = '```json\n[{"description": "Say \\"hi\\" {x}", "duration_min": 5, "energy_level": "low", "dependencies": []}, {"description": "Next", "duration_min": 10, "energy_level": "medium", "dependencies": [0]}]\n```'
+    parser = StepParser()
+    objects = []
+    for i in range(0, len(text), 7):
+        objects.extend(parser.feed(text[i:i + 7]))
+    
+    assert [o["description"] for o in objects] == ['Say "hi" {x}', "Next"]
+    assert objects[1]["dependencies"] == [0]
+
+
+@patch('app.services.decompose.AsyncOpenAI')
+def test_decompose_service_streams_steps(mock_openai):
+    content = '[{"description": "Read docs", "duration_min": 20, "energy_level": "low"}, {"description": "Practice", "duration_min": 40, "energy_level": "high"}]'
+    mock_openai.return_value.chat.completions.create = AsyncMock(return_value=chunks(content))
+    
+    import app.services.decompose as decompose_module
+    original_key = decompose_module.settings.openai_api_key
+    decompose_module.settings.openai_api_key = "test-key"
+    
+    try:
+        assert [step.description for step in collect("Learn Python")] == ["Read docs", "Practice"]
+        assert mock_openai.return_value.chat.completions.create.call_args.kwargs["stream"] is True
+    finally:
+        decompose_module.settings.openai_api_key = original_key
+
+
+@patch('app.services.decompose.AsyncOpenAI')
+def test_decompose_service_caches_completions(mock_openai, completion_cache):
+    content = '[{"description": "Read docs", "duration_min": 20, "energy_level": "low"}]'
+    create = AsyncMock(side_effect=lambda **kwargs: chunks(content))
+    mock_openai.return_value.chat.completions.create = create
     
     import app.services.decompose as decompose_module
     original_key = decompose_module.settings.openai_api_key
     decompose_module.settings.openai_api_key = "test-key"
     
     try:
-        result = decompose_goal("Learn Python")
+        first = collect("Learn Python")
+        second = collect("Learn Python")
+        assert create.call_count == 1
+        assert second == first
         
-        assert len(result) == 2
-        assert result[0].description == "Set up Python environment"
-        assert result[0].duration_min == 30
-        assert result[1].description == "Complete basic tutorial"
+        collect("Learn Rust")
+        collect("Learn Python", use_cache=False)
+        assert create.call_count == 3
+        assert completion_cache.stats()["hits"] == 1
+        assert completion_cache.stats()["entries"] == 2
     finally:
         decompose_module.settings.openai_api_key = original_key
 
 
-def test_decompose_goal_structure():
-    result = decompose_goal("Build a web app")
+@patch('app.services.decompose.AsyncOpenAI')
+def test_truncated_stream_raises_and_is_not_cached(mock_openai, completion_cache):
+    content = '[{"description": "Read docs", "duration_min": 20, "energy_level": "low"}, {"description": "Prac'
+    mock_openai.return_value.chat.completions.create = AsyncMock(return_value=chunks(content, finish_reason="length"))
     
-    for action in result:
-        assert hasattr(action, 'description')
-        assert hasattr(action, 'duration_min')
-        assert hasattr(action, 'energy_level')
-        assert hasattr(action, 'dependencies')
-        assert action.energy_level in ['low', 'medium', 'high']
+    import app.services.decompose as decompose_module
+    original_key = decompose_module.settings.openai_api_key
+    decompose_module.settings.openai_api_key = "test-key"
+    
+    seen = []
+    
+    async def run():
+        async for step in DecomposeService().stream("Learn Python"):
+            seen.append(step.description)
+    
+    try:
+        with pytest.raises(IncompleteDecomposition):
+            asyncio.run(run())
+        assert seen == ["Read docs"]
+        assert completion_cache.stats()["entries"] == 0
+    finally:
+        decompose_module.settings.openai_api_key = original_key
+
+
+def test_completion_key_covers_model_messages_and_temperature():
+    from app.services.decompose import build_messages, completion_key
+    
+    messages = build_messages("Learn Python")
+    key = completion_key("gpt-4o-mini", messages, 0.7)
+    
+    assert key == completion_key("gpt-4o-mini", build_messages("Learn Python"), 0.7)
+    assert key != completion_key("gpt-4o", messages, 0.7)
+    assert key != completion_key("gpt-4o-mini", messages, 0.2)
+    assert key != completion_key("gpt-4o-mini", build_messages("Learn Rust"), 0.7)
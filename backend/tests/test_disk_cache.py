@@ -0,0 +1,44 @@
+import time
+from app.core.disk_cache import DiskCache
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path / "cache.db"), ttl_seconds=60)
+    cache.set("a", b"1")
+    
+    assert cache.get("a") == b"1"
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(time, "time", lambda: next(clock))
+    cache = DiskCache(str(tmp_path / "cache.db"), max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.get("a")
+    cache.set("c", b"1234")
+    
+    assert cache.get_many(["a", "b", "c"]) == {"a": b"1234", "c": b"1234"}
+    stats = cache.stats()
+    assert stats["bytes"] == 8
+    assert stats["evictions"] == 1
+
+
+def test_upgrades_cache_files_without_metadata_columns(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+    conn.execute("INSERT INTO cache VALUES ('a', x'0102')")
+    conn.commit()
+    conn.close()
+    
+    cache = DiskCache(path)
+    
+    assert cache.get("a") == b"\x01\x02"
+    assert cache.stats()["bytes"] == 2
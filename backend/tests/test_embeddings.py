@@ -0,0 +1,81 @@
+import pytest
+import numpy as np
+from unittest.mock import patch, MagicMock
+from app.services.embeddings import EmbeddingStore
+from app.services.vector_index import ExactIndex
+
+
+def _store_with(vectors):
+    store = EmbeddingStore()
+    for goal_id, vector in enumerate(vectors, start=1):
+        store.upsert(goal_id, vector)
+    return store
+
+
+def test_top_k_matches_brute_force():
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((50, 16)).astype(np.float32)
+    store = _store_with(vectors)
+    
+    query = rng.standard_normal(16).astype(np.float32)
+    result = store.top_k(query, k=5)
+    
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5] + 1
+    assert [goal_id for goal_id, _ in result] == list(expected)
+
+
+def test_top_k_excludes_target_and_applies_threshold():
+    store = _store_with([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]])
+    
+    result = store.top_k([1.0, 0.0], k=5, threshold=0.7, exclude_id=1)
+    
+    assert [goal_id for goal_id, _ in result] == [2]
+    assert result[0][1] == pytest.approx(0.9 / np.hypot(0.9, 0.1), rel=1e-5)
+
+
+def test_upsert_overwrites_and_remove_compacts():
+    store = _store_with([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+    
+    store.upsert(1, [0.0, 1.0])
+    store.remove(2)
+    
+    assert len(store) == 2
+    assert 2 not in store
+    assert store.top_k([0.0, 1.0], k=1)[0][0] == 1
+    assert store.get(3) == pytest.approx(np.array([1.0, 1.0]) / np.sqrt(2))
+
+
+def test_get_embeddings_batches_and_caches(tmp_path, monkeypatch):
+    import app.services.embeddings as embeddings_module
+    from app.core.disk_cache import DiskCache
+    
+    mock_client = MagicMock()
+    mock_client.embeddings.create.side_effect = lambda model, input: MagicMock(
+        data=[MagicMock(index=i, embedding=[float(len(text)), 1.0]) for i, text in enumerate(input)]
+    )
+    monkeypatch.setattr(embeddings_module.settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(embeddings_module, "embedding_cache", DiskCache(str(tmp_path / "embeddings.db")))
+    monkeypatch.setattr(embeddings_module, "_get_client", lambda: mock_client)
+    
+    first = embeddings_module.get_embeddings(["Learn Python", "learn  python ", "Learn Python", "Run"])
+    second = embeddings_module.get_embeddings(["Learn Python", "Run"])
+    
+    assert mock_client.embeddings.create.call_count == 1
+    assert mock_client.embeddings.create.call_args.kwargs["input"] == ["Learn Python", "learn python", "Run"]
+    assert first[0] == first[2] == second[0] == [12.0, 1.0]
+    assert second[1] == [3.0, 1.0]
+
+
+def test_top_k_reranks_quantized_candidates_with_exact_vectors():
+    store = EmbeddingStore(index_factory=lambda: ExactIndex(dtype="int8"))
+    exact = {1: np.array([1.0, 0.0]), 2: np.array([0.0, 1.0])}
+    for goal_id, vector in exact.items():
+        store.upsert(goal_id, vector)
+    # Pretend the quantized index is stale for goal 2; re-ranking must use the exact vectors.
+    store.upsert(2, [1.0, 0.0])
+    
+    result = store.top_k([0.0, 1.0], k=1, exact_vectors=lambda ids: {i: exact[i] for i in ids}, rerank_factor=2)
+    
+    assert result[0][0] == 2
+    assert result[0][1] == pytest.approx(1.0)
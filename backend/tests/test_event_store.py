@@ -0,0 +1,87 @@
+import pytest
+import random
+from datetime import datetime, timedelta
+from sqlmodel import SQLModel, Session, create_engine
+from app.models import CompletionEvent, CompletionStatus
+from app.services.event_store import EventColumnStore
+from app.services.rollups import record_events
+from app.services.stats import parasitic, summary
+
+
+REASONS = [None, "", "low energy", "unclear clarity", "external blocker", "no time"]
+
+
+def _events(count, seed=0):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [
+        CompletionEvent(
+            action_id=rng.randint(1, 20),
+            goal_id=rng.randint(1, 4),
+            status=rng.choice(list(CompletionStatus)),
+            failure_reason=rng.choice(REASONS),
+            timestamp=now - timedelta(minutes=count - i)
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_store_grows_and_encodes_reasons():
+    store = EventColumnStore(initial_capacity=4)
+    events = _events(50)
+    store.extend(events)
+    
+    assert len(store) == 50
+    assert sorted(store.reasons) == sorted(r for r in set(REASONS) if r)
+    failed = [e for e in events if e.status == CompletionStatus.failed]
+    action_ids, _, _ = store.failures()
+    assert len(action_ids) == len(failed)
+    assert store.status_counts()[CompletionStatus.done] == sum(e.status == CompletionStatus.done for e in events)
+
+
+def test_load_matches_sql_stats(session):
+    events = _events(300)
+    session.add_all(events)
+    session.flush()
+    record_events(session, events)
+    session.commit()
+    
+    store = EventColumnStore()
+    store.load(session, chunk_size=64)
+    
+    assert store.loaded and len(store) == 300
+    window = timedelta(days=1)
+    assert summary(session, window, store=store) == summary(session, window)
+    assert parasitic(session, window, store=store) == parasitic(session, window)
+
+
+def test_window_filters_by_timestamp():
+    store = EventColumnStore()
+    now = datetime.utcnow()
+    store.extend([
+        CompletionEvent(action_id=1, goal_id=1, status=CompletionStatus.done, timestamp=now - timedelta(days=10)),
+        CompletionEvent(action_id=1, goal_id=1, status=CompletionStatus.done, timestamp=now)
+    ])
+    
+    assert store.status_counts(now - timedelta(days=7))[CompletionStatus.done] == 1
+    assert store.status_counts()[CompletionStatus.done] == 2
+
+
+def test_failures_of_selected_actions():
+    events = _events(400, seed=3)
+    store = EventColumnStore()
+    store.extend(events)
+    
+    action_ids, timestamps, _ = store.failures([2, 5, 7])
+    
+    failed = [e for e in events if e.status == CompletionStatus.failed and e.action_id in (2, 5, 7)]
+    assert action_ids.tolist() == [e.action_id for e in failed]
+    assert timestamps.tolist() == sorted(timestamps.tolist())
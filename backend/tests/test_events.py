@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from sqlalchemy import event as sa_event, func
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.cache import get_cache
+from app.db import create_async_db_engine
+from app.models import (
+    Action, ActionDependency, ActionStatus, Breakpoint, BreakpointPattern, CompletionEvent, CompletionStatus,
+    EnergyLevel, EventRollup, Goal
+)
+from app.services.breakpoints import breakpoint_service
+from app.services.events import log_events
+from app.services.mes import mes_service, global_mes_queue
+from app.routes.logs import LogEventRequest, ingest_ndjson, save_event
+from fastapi import HTTPException
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}")
+    SQLModel.metadata.create_all(engine)
+    for service in (mes_service, global_mes_queue, breakpoint_service):
+        service.clear()
+    get_cache().clear()
+    
+    with Session(engine) as session:
+        for goal_id in (1, 2):
+            session.add(Goal(id=goal_id, description=f"Goal {goal_id}"))
+        for action_id in range(1, 41):
+            session.add(Action(
+                id=action_id,
+                goal_id=1 if action_id <= 20 else 2,
+                description=f"Action {action_id}",
+                duration_min=10,
+                energy_level=EnergyLevel.low,
+                status=ActionStatus.pending if action_id == 2 else ActionStatus.available
+            ))
+        session.add(ActionDependency(action_id=2, depends_on_id=1, goal_id=1))
+        session.add(CompletionEvent(action_id=3, goal_id=1, status=CompletionStatus.failed, failure_reason="low energy"))
+        session.commit()
+    yield engine
+    get_cache().clear()
+
+
+def count_statements(engine, fn) -> int:
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    sa_event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        sa_event.remove(engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+def test_log_events_applies_a_batch_with_bulk_statements(engine):
+    with Session(engine, expire_on_commit=False) as session:
+        events = log_events(session, [
+            (1, CompletionStatus.done, None),
+            (99, CompletionStatus.done, None),
+            (3, CompletionStatus.failed, "low energy"),
+            (3, CompletionStatus.failed, "no time"),
+            (4, CompletionStatus.blocked, None)
+        ])
+        
+        assert [(e.action_id, e.goal_id) for e in events] == [(1, 1), (3, 1), (3, 1), (4, 1)]
+        assert all(e.id is not None for e in events)
+        assert session.get(Action, 1).status == ActionStatus.done
+        assert session.get(Action, 2).status == ActionStatus.available
+        assert session.get(Action, 4).status == ActionStatus.blocked
+        assert session.get(Goal, 1).remaining_min == 190
+        
+        breakpoint = session.exec(select(Breakpoint).where(Breakpoint.action_id == 3)).one()
+        assert breakpoint.failure_count == 3
+        assert breakpoint.pattern == BreakpointPattern.energy
+        assert session.exec(select(func.sum(EventRollup.count))).one() == 4
+
+
+def test_log_events_statement_count_does_not_grow_with_the_batch(engine):
+    def batch(action_ids):
+        with Session(engine, expire_on_commit=False) as session:
+            log_events(session, [(a, s, "low energy") for a in action_ids for s in (CompletionStatus.failed, CompletionStatus.done)])
+    
+    batch([5, 21])
+    small = count_statements(engine, lambda: batch([19, 22]))
+    large = count_statements(engine, lambda: batch([a for a in range(6, 41) if a not in (19, 21, 22)]))
+    assert large == small
+
+
+def test_save_event_goes_through_log_events(engine):
+    with Session(engine, expire_on_commit=False) as session:
+        with pytest.raises(HTTPException) as missing:
+            save_event(session, LogEventRequest(action_id=999, status=CompletionStatus.done))
+        assert missing.value.status_code == 404
+        
+        failed = save_event(session, LogEventRequest(action_id=3, status=CompletionStatus.failed, failure_reason="low energy"))
+        done = save_event(session, LogEventRequest(action_id=1, status=CompletionStatus.done))
+        
+        assert (failed.action_id, failed.goal_id, failed.failure_reason) == (3, 1, "low energy")
+        assert session.get(CompletionEvent, done.id).status == CompletionStatus.done
+        assert session.get(Action, 2).status == ActionStatus.available
+        assert session.exec(select(Breakpoint.action_id)).all() == [3]
+
+
+def test_single_events_refresh_analytics_only_when_the_status_moves(engine, monkeypatch):
+    refreshed = []
+    monkeypatch.setattr("app.services.events.refresh_graph_analytics", lambda session, goal: refreshed.append(goal.id))
+    
+    with Session(engine, expire_on_commit=False) as session:
+        save_event(session, LogEventRequest(action_id=3, status=CompletionStatus.failed, failure_reason="low energy"))
+        assert refreshed == []
+        save_event(session, LogEventRequest(action_id=1, status=CompletionStatus.done))
+        assert refreshed == [1]
+        save_event(session, LogEventRequest(action_id=1, status=CompletionStatus.done))
+        assert refreshed == [1]
+
+
+def test_ingest_ndjson_commits_chunks_and_reports_bad_lines(engine):
+    body = b"\n".join([
+        b'{"action_id": 5, "status": "done"}',
+        b'',
+        b'{"action_id": 6, "status": "failed", "failure_reason": "low energy"}',
+        b'{"action_id": 7, "status": "later"}',
+        b'{"action_id": 99, "status": "done"}',
+        b'{"action_id": 8, "status": "done", "failure_reason": "' + b"x" * 200 + b'"}',
+        b'not json',
+        b'{"action_id": 9, "status": "blocked"}'
+    ])
+    
+    async def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+    
+    async def ingest():
+        async_engine = create_async_db_engine(str(engine.url))
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            report = await ingest_ndjson(session, chunks(), chunk_size=1, max_errors=3, max_line_bytes=128)
+        await async_engine.dispose()
+        return report
+    
+    report = asyncio.run(ingest())
+    
+    assert (report.lines, report.accepted, report.rejected) == (8, 3, 4)
+    assert [error.line for error in report.errors] == [4, 5, 6]
+    assert report.errors[0].error.startswith("status:")
+    assert report.errors[1].error == "Action not found"
+    assert report.errors_truncated
+    with Session(engine) as session:
+        assert session.get(Action, 5).status == ActionStatus.done
+        assert session.get(Action, 9).status == ActionStatus.blocked
+        assert session.exec(select(func.count(CompletionEvent.id))).one() == 4
@@ -0,0 +1,92 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlmodel import SQLModel, Session, create_engine
+from app.models import BreakpointPattern, CompletionEvent, CompletionStatus
+from app.services.forecast import ForecastEngine
+from app.services.rollups import record_events
+
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _log(session, day, action_id, status, reason=None, count=1):
+    events = [
+        CompletionEvent(
+            action_id=action_id,
+            goal_id=1,
+            status=status,
+            failure_reason=reason,
+            timestamp=START + timedelta(days=day, hours=3)
+        )
+        for _ in range(count)
+    ]
+    session.add_all(events)
+    record_events(session, events)
+    session.commit()
+
+
+def _smooth(series, alpha):
+    level = 0.0
+    for value in series:
+        level = alpha * value + (1 - alpha) * level
+    return level
+
+
+def test_closed_form_matches_iterative_smoothing(session):
+    daily = [3, 0, 1, 4, 0, 2]
+    for day, count in enumerate(daily):
+        if count:
+            _log(session, day, 1, CompletionStatus.failed, "low energy", count)
+    engine = ForecastEngine(bucket_hours=24, alpha=0.4)
+    
+    result = engine.forecast(session, now=START + timedelta(days=len(daily), hours=1))
+    
+    assert result["pattern_forecasts"][0]["pattern"] == BreakpointPattern.energy
+    assert result["pattern_forecasts"][0]["expected_failures"] == round(_smooth(daily, 0.4), 3)
+
+
+def test_incremental_update_matches_full_recompute(session):
+    for day in range(6):
+        _log(session, day, 1, CompletionStatus.failed, "no time", day % 3)
+        _log(session, day, 2, CompletionStatus.done, count=2)
+        _log(session, day, 2, CompletionStatus.failed, "external blocker", day % 2)
+    
+    incremental = ForecastEngine(alpha=0.3)
+    for day in range(1, 7):
+        incremental.update(session, now=START + timedelta(days=day))
+    full = ForecastEngine(alpha=0.3)
+    now = START + timedelta(days=6)
+    
+    assert incremental.update(session, now=now) == 0
+    assert incremental.forecast(session, now=now) == full.forecast(session, now=now)
+
+
+def test_open_bucket_is_not_folded(session):
+    _log(session, 0, 1, CompletionStatus.failed, "unclear clarity")
+    engine = ForecastEngine()
+    
+    result = engine.forecast(session, now=START + timedelta(hours=12))
+    
+    assert result["pattern_forecasts"] == []
+    assert result["action_forecasts"] == []
+
+
+def test_action_risk_ranking(session):
+    _log(session, 0, 1, CompletionStatus.failed, count=3)
+    _log(session, 0, 1, CompletionStatus.done, count=1)
+    _log(session, 0, 2, CompletionStatus.failed, count=1)
+    _log(session, 0, 2, CompletionStatus.done, count=3)
+    _log(session, 0, 3, CompletionStatus.done, count=5)
+    
+    result = ForecastEngine(top_actions=5).forecast(session, now=START + timedelta(days=1))
+    
+    assert [a["action_id"] for a in result["action_forecasts"]] == [1, 2]
+    assert result["action_forecasts"][0]["failure_risk"] == 0.75
@@ -0,0 +1,50 @@
+from sqlmodel import SQLModel, Session, create_engine, select
+from app.models import Action, ActionDependency, Goal
+from app.services.actions import create_actions
+from app.services.graph import analyze, find_back_edges, refresh_graph_analytics
+
+
+def test_find_back_edges_breaks_every_cycle():
+    edges = {0: [2], 1: [0], 2: [1], 3: [3, 0]}
+    
+    back_edges = find_back_edges(range(4), edges)
+    
+    assert set(back_edges) == {(1, 0), (3, 3)}
+
+
+def test_analyze_computes_critical_path_and_depth():
+    durations = {1: 10, 2: 30, 3: 20, 4: 5}
+    edges = {2: [1], 3: [1], 4: [2, 3]}
+    
+    analysis = analyze(durations, edges, done={1})
+    
+    assert analysis.depth == {1: 0, 2: 1, 3: 1, 4: 2}
+    assert analysis.critical_path_min == 45
+    assert analysis.remaining_min == 55
+    assert analysis.remaining_critical_path_min == 35
+    assert analysis.max_depth == 2
+
+
+def test_cyclic_decomposition_is_stored_as_dag_with_analytics():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    steps = [
+        {"description": "A", "duration_min": 10, "energy_level": "low", "dependencies": [2]},
+        {"description": "B", "duration_min": 20, "energy_level": "low", "dependencies": [0]},
+        {"description": "C", "duration_min": 30, "energy_level": "low", "dependencies": [1]}
+    ]
+    
+    with Session(engine) as session:
+        goal = Goal(description="Cyclic")
+        session.add(goal)
+        session.commit()
+        
+        actions = create_actions(session, goal, steps)
+        session.flush()
+        refresh_graph_analytics(session, goal)
+        session.commit()
+        
+        assert goal.cycles_broken == 1
+        assert len(session.exec(select(ActionDependency)).all()) == 2
+        assert goal.critical_path_min == 60
+        assert [session.get(Action, a.id).depth for a in actions] == [2, 0, 1]
@@ -0,0 +1,315 @@
+import pytest
+import asyncio
+import json
+import sqlite3
+from datetime import datetime
+from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import create_async_db_engine, create_db_engine
+from app.models import Action, DecompositionJob, DecompositionSource, Goal, GoalStatus, JobStatus
+from app.services.actions import create_actions
+from app.services.decompose import ActionDecomposition, decompose_service
+from app.services.embeddings import embedding_store
+from app.services.jobs import DecompositionQueue, QueueFull, QueueStopped
+from app.services.mes import global_mes_queue, mes_service
+from app.services.stats import decomposition_reuse
+
+
+STEPS = [
+    {"description": "Outline", "duration_min": 20, "energy_level": "low", "dependencies": []},
+    {"description": "Draft", "duration_min": 45, "energy_level": "high", "dependencies": [0]}
+]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.jobs.index_goal_async", lambda session, goal: asyncio.sleep(0))
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    engine = create_db_engine(url)
+    SQLModel.metadata.create_all(engine)
+    for service in (mes_service, global_mes_queue, embedding_store):
+        service.clear()
+    yield engine, url
+    for service in (mes_service, global_mes_queue, embedding_store):
+        service.clear()
+
+
+def make_queue(url, **kwargs):
+    async_engine = create_async_db_engine(url)
+    return DecompositionQueue(session_factory=lambda: AsyncSession(async_engine, expire_on_commit=False), **kwargs)
+
+
+async def submit(queue, description="Write a report"):
+    async with queue.session_factory() as session:
+        goal = Goal(description=description, status=GoalStatus.decomposing)
+        session.add(goal)
+        return await queue.submit(session, goal)
+
+
+def test_job_decomposes_goal_in_background(db, monkeypatch):
+    engine, url = db
+    
+    async def stream(description, use_cache=True):
+        for step in STEPS:
+            yield ActionDecomposition(**step)
+    
+    monkeypatch.setattr(decompose_service, "stream", stream)
+    
+    async def run():
+        queue = make_queue(url, workers=2)
+        await queue.start()
+        job = await submit(queue)
+        updates = queue.watch(job.id)
+        await queue.join()
+        await queue.stop()
+        return job, [updates.get_nowait() for _ in range(updates.qsize())]
+    
+    job, seen = asyncio.run(run())
+    
+    assert [kind for kind, _ in seen] == ["job", "step", "step", "job"]
+    assert [payload["status"] for kind, payload in seen if kind == "job"] == ["running", "done"]
+    assert [(payload["index"], payload["description"]) for kind, payload in seen if kind == "step"] == [(0, "Outline"), (1, "Draft")]
+    with Session(engine) as session:
+        stored = session.get(DecompositionJob, job.id)
+        goal = session.get(Goal, job.goal_id)
+        actions = session.exec(select(Action).where(Action.goal_id == goal.id)).all()
+    assert stored.status == JobStatus.done
+    assert stored.attempts == 1
+    assert stored.action_count == 2
+    assert goal.status == GoalStatus.active
+    assert [a.description for a in actions] == ["Outline", "Draft"]
+
+
+def test_submit_applies_backpressure(db, monkeypatch):
+    _, url = db
+    release = None
+    
+    async def stream(description, use_cache=True):
+        await release.wait()
+        yield ActionDecomposition(**STEPS[0])
+    
+    monkeypatch.setattr(decompose_service, "stream", stream)
+    
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        queue = make_queue(url, workers=1, max_pending=2)
+        with pytest.raises(QueueStopped):
+            await submit(queue)
+        await queue.start()
+        await submit(queue)
+        await submit(queue)
+        with pytest.raises(QueueFull):
+            await submit(queue)
+        release.set()
+        await queue.join()
+        assert queue.pending == 0
+        await submit(queue)
+        await queue.join()
+        await queue.stop()
+    
+    asyncio.run(run())
+
+
+def test_interrupted_jobs_resume_on_start(db, monkeypatch):
+    engine, url = db
+    
+    async def stream(description, use_cache=True):
+        yield ActionDecomposition(**STEPS[0])
+    
+    monkeypatch.setattr(decompose_service, "stream", stream)
+    with Session(engine) as session:
+        session.add(Goal(id=1, description="Goal", status=GoalStatus.decomposing))
+        session.add(DecompositionJob(goal_id=1, status=JobStatus.running, attempts=1))
+        session.add(DecompositionJob(goal_id=1, status=JobStatus.done, attempts=1))
+        session.commit()
+    
+    async def run():
+        queue = make_queue(url)
+        resumed = await queue.start()
+        await queue.join()
+        await queue.stop()
+        return resumed
+    
+    assert asyncio.run(run()) == 1
+    with Session(engine) as session:
+        job = session.get(DecompositionJob, 1)
+        assert job.status == JobStatus.done
+        assert job.attempts == 2
+        assert session.get(Goal, 1).status == GoalStatus.active
+
+
+def test_job_runs_once_across_queues_sharing_the_database(db, monkeypatch):
+    engine, url = db
+    calls = []
+    
+    async def stream(description, use_cache=True):
+        calls.append(description)
+        await asyncio.sleep(0.05)
+        yield ActionDecomposition(**STEPS[0])
+    
+    monkeypatch.setattr(decompose_service, "stream", stream)
+    with Session(engine) as session:
+        session.add(Goal(id=1, description="Goal", status=GoalStatus.decomposing))
+        session.add(DecompositionJob(goal_id=1))
+        session.add(DecompositionJob(goal_id=1, status=JobStatus.running, attempts=1, started_at=datetime.utcnow()))
+        session.commit()
+    
+    async def run():
+        queues = [make_queue(url) for _ in range(2)]
+        await asyncio.gather(*(queue._run(1) for queue in queues))
+        resumed = await queues[0].start()
+        await queues[0].join()
+        await queues[0].stop()
+        return resumed
+    
+    assert asyncio.run(run()) == 0
+    assert calls == ["Goal"]
+    with Session(engine) as session:
+        assert (session.get(DecompositionJob, 1).status, session.get(DecompositionJob, 1).attempts) == (JobStatus.done, 1)
+        assert session.get(DecompositionJob, 2).status == JobStatus.running
+
+
+def test_failing_job_retries_then_fails(db, monkeypatch):
+    engine, url = db
+    calls = []
+    
+    async def stream(description, use_cache=True):
+        calls.append(description)
+        yield ActionDecomposition(**STEPS[0])
+        raise RuntimeError("model unavailable")
+    
+    monkeypatch.setattr(decompose_service, "stream", stream)
+    
+    async def run():
+        queue = make_queue(url, max_attempts=3)
+        await queue.start()
+        job = await submit(queue)
+        await queue.join()
+        await queue.stop()
+        return job
+    
+    job = asyncio.run(run())
+    
+    assert len(calls) == 3
+    with Session(engine) as session:
+        stored = session.get(DecompositionJob, job.id)
+        assert stored.status == JobStatus.failed
+        assert stored.attempts == 3
+        assert stored.error == "RuntimeError: model unavailable"
+        assert session.get(Goal, job.goal_id).status == GoalStatus.active
+        assert [step["description"] for step in json.loads(stored.steps)] == ["Outline"]
+        assert session.exec(select(Action).where(Action.goal_id == job.goal_id)).all() == []
+
+
+def test_failed_redecomposition_keeps_the_previous_plan(db, monkeypatch):
+    engine, url = db
+    
+    async def stream(description, use_cache=True):
+        yield ActionDecomposition(**STEPS[0], priority=9)
+        raise RuntimeError("stream cut")
+    
+    monkeypatch.setattr(decompose_service, "stream", stream)
+    with Session(engine) as session:
+        goal = Goal(id=1, description="Write a report")
+        session.add(goal)
+        create_actions(session, goal, STEPS)
+        session.add(DecompositionJob(goal_id=1))
+        session.commit()
+    
+    async def run():
+        queue = make_queue(url, max_attempts=1)
+        await queue.start()
+        await queue.join()
+        await queue.stop()
+    
+    asyncio.run(run())
+    with Session(engine) as session:
+        assert session.get(DecompositionJob, 1).status == JobStatus.failed
+        actions = session.exec(select(Action).where(Action.goal_id == 1).order_by(Action.id)).all()
+        assert [(a.description, a.priority) for a in actions] == [("Outline", 5), ("Draft", 5)]
+
+
+def test_similar_goal_reuses_stored_actions(db, monkeypatch):
+    engine, url = db
+    calls = []
+    
+    async def stream(description, use_cache=True):
+        calls.append(description)
+        yield ActionDecomposition(**STEPS[0])
+    
+    async def find_similar(session, goal, limit=5, threshold=None):
+        return [{"goal_id": 1, "description": "Write a report", "similarity": 0.95 if "report" in goal.description else 0.4}]
+    
+    monkeypatch.setattr(decompose_service, "stream", stream)
+    monkeypatch.setattr("app.services.jobs.find_similar_goals_async", find_similar)
+    with Session(engine) as session:
+        source = Goal(id=1, description="Write a report")
+        session.add(source)
+        create_actions(session, source, [{**STEPS[0], "description": "Outline: Write a report"}, STEPS[1]])
+        session.commit()
+    
+    async def run():
+        queue = make_queue(url, reuse_threshold=0.9)
+        await queue.start()
+        reused = await submit(queue, "Write the report")
+        fresh = await submit(queue, "Plan a trip")
+        await queue.join()
+        await queue.stop()
+        return reused, fresh
+    
+    reused, fresh = asyncio.run(run())
+    
+    assert calls == ["Plan a trip"]
+    with Session(engine) as session:
+        job = session.get(DecompositionJob, reused.id)
+        assert (job.source, job.similarity, job.reused_goal_id) == (DecompositionSource.reused, 0.95, 1)
+        actions = session.exec(select(Action).where(Action.goal_id == job.goal_id).order_by(Action.id)).all()
+        assert [a.description for a in actions] == ["Outline: Write the report", "Draft"]
+        assert json.loads(actions[1].dependencies) == [actions[0].id]
+        
+        job = session.get(DecompositionJob, fresh.id)
+        assert (job.source, job.similarity, job.reused_goal_id) == (DecompositionSource.llm, 0.4, None)
+        
+        reuse = decomposition_reuse(session)
+    assert (reuse["decompositions"], reuse["reused"], reuse["hit_rate"]) == (2, 1, 0.5)
+    assert reuse["mean_reuse_similarity"] == 0.95
+
+
+def test_other_writers_proceed_while_the_llm_streams(db, monkeypatch):
+    engine, url = db
+    streaming = released = None
+    
+    async def stream(description, use_cache=True):
+        streaming.set()
+        await released.wait()
+        yield ActionDecomposition(**STEPS[0])
+    
+    async def find_similar(session, goal, limit=5, threshold=None):
+        await session.exec(select(Goal.id))
+        return [{"goal_id": 1, "description": "Other", "similarity": 0.5}]
+    
+    monkeypatch.setattr(decompose_service, "stream", stream)
+    monkeypatch.setattr("app.services.jobs.find_similar_goals_async", find_similar)
+    
+    def write():
+        with sqlite3.connect(str(engine.url.database), timeout=0.2) as conn:
+            conn.execute("UPDATE goal SET description = 'Write a long report'")
+    
+    async def run():
+        nonlocal streaming, released
+        streaming, released = asyncio.Event(), asyncio.Event()
+        queue = make_queue(url, reuse_threshold=0.92)
+        await queue.start()
+        job = await submit(queue)
+        await streaming.wait()
+        await asyncio.to_thread(write)
+        released.set()
+        await queue.join()
+        await queue.stop()
+        return job
+    
+    job = asyncio.run(run())
+    with Session(engine) as session:
+        stored = session.get(DecompositionJob, job.id)
+        assert (stored.status, stored.source, stored.similarity) == (JobStatus.done, DecompositionSource.llm, 0.5)
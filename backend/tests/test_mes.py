@@ -1,6 +1,10 @@
 import pytest
-from app.services.mes import find_mes
-from app.models import Action, ActionStatus, EnergyLevel
+import time
+from app.core.cache import goal_tag, set_cache
+from app.core.shared_cache import SQLiteCache
+from app.services.mes import find_mes, GoalGraph, GlobalMESQueue, MESService
+from sqlmodel import SQLModel, Session, create_engine
+from app.models import Action, ActionDependency, ActionStatus, EnergyLevel, Goal, GoalStatus
 
 
 def test_find_mes_with_no_dependencies():
@@ -91,3 +95,154 @@ def test_find_mes_blocked_actions():
     result = find_mes(actions)
     
     assert len(result) == 0
+
+
+def _action(action_id, priority=5, duration_min=30, status=ActionStatus.pending, dependencies="[]"):
+    return Action(
+        id=action_id,
+        goal_id=1,
+        description=f"Action {action_id}",
+        duration_min=duration_min,
+        energy_level=EnergyLevel.medium,
+        priority=priority,
+        status=status,
+        dependencies=dependencies
+    )
+
+
+def test_goal_graph_updates_ready_heap_incrementally():
+    graph = GoalGraph([
+        _action(1, priority=5),
+        _action(2, priority=8, dependencies="[1]"),
+        _action(3, priority=6, dependencies="[1, 2]")
+    ])
+    
+    assert [node.id for node in graph.top(5)] == [1]
+    
+    assert graph.update_status(1, ActionStatus.done) == [2]
+    assert [node.id for node in graph.top(5)] == [2]
+    
+    graph.update_status(2, ActionStatus.done)
+    assert [node.id for node in graph.top(5)] == [3]
+    
+    graph.update_status(2, ActionStatus.pending)
+    assert [node.id for node in graph.top(5)] == [2]
+    
+    graph.update_status(2, ActionStatus.blocked)
+    assert graph.top(5) == []
+
+
+def test_mes_service_evicts_least_recently_used_goal():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    service = MESService(max_goals=1)
+    
+    with Session(engine) as session:
+        session.add(Goal(id=1, description="Goal 1"))
+        session.add(Goal(id=2, description="Goal 2"))
+        session.add(_action(1))
+        session.add(Action(id=2, goal_id=2, description="Action 2", duration_min=10, energy_level=EnergyLevel.low))
+        session.commit()
+        
+        assert [mes.action_id for mes in service.find_mes(session, 1)] == [1]
+        assert service.on_action_status(1, 1, ActionStatus.done) == []
+        assert service.find_mes(session, 1) == []
+        
+        service.find_mes(session, 2)
+        assert service.on_action_status(1, 1, ActionStatus.pending) is None
+
+
+def test_global_mes_queue_ranks_across_goals_and_stays_in_sync():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    queue = GlobalMESQueue()
+    
+    with Session(engine) as session:
+        session.add(Goal(id=1, description="Goal 1"))
+        session.add(Goal(id=2, description="Goal 2"))
+        session.add(Goal(id=3, description="Goal 3", status=GoalStatus.cancelled))
+        session.add(Action(id=1, goal_id=1, description="A1", duration_min=30, energy_level=EnergyLevel.high, priority=5))
+        session.add(Action(id=2, goal_id=1, description="A2", duration_min=10, energy_level=EnergyLevel.low, priority=9))
+        session.add(Action(id=3, goal_id=2, description="A3", duration_min=20, energy_level=EnergyLevel.medium, priority=7))
+        session.add(Action(id=4, goal_id=3, description="A4", duration_min=5, energy_level=EnergyLevel.low, priority=10))
+        session.add(ActionDependency(action_id=2, depends_on_id=1, goal_id=1))
+        session.commit()
+        
+        queue.load(session)
+        assert [(m.action_id, m.goal_id) for m in queue.top(5)] == [(3, 2), (1, 1)]
+        assert [m.action_id for m in queue.top(5, energy_level=EnergyLevel.medium)] == [3]
+        assert [m.action_id for m in queue.top(5, time_budget=25)] == [3]
+        
+        action = session.get(Action, 1)
+        action.status = ActionStatus.done
+        session.add(action)
+        session.commit()
+        queue.sync_actions(session, [1])
+        assert [m.action_id for m in queue.top(5)] == [2, 3]
+        
+        goal = session.get(Goal, 2)
+        goal.status = GoalStatus.completed
+        session.add(goal)
+        session.commit()
+        queue.sync_goal(session, 2)
+        assert [m.action_id for m in queue.top(5)] == [2]
+
+
+def test_global_mes_queue_reloads_writes_of_other_workers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    queue = GlobalMESQueue(max_age=5)
+    
+    with Session(engine) as session:
+        session.add(Goal(id=1, description="Goal 1"))
+        session.add(_action(1, priority=5))
+        session.add(_action(2, priority=9))
+        session.commit()
+        queue.ensure_loaded(session)
+        assert [m.action_id for m in queue.top(5)] == [2, 1]
+        
+        # Another worker completes action 2 without touching this queue.
+        action = session.get(Action, 2)
+        action.status = ActionStatus.done
+        session.add(action)
+        session.commit()
+        now[0] += 4
+        queue.ensure_loaded(session)
+        assert [m.action_id for m in queue.top(5)] == [2, 1]
+        
+        now[0] += 1
+        queue.ensure_loaded(session)
+        assert [m.action_id for m in queue.top(5)] == [1]
+
+
+def test_cached_mes_is_shared_across_workers_and_purged_by_goal_tag(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'goals.db'}")
+    SQLModel.metadata.create_all(engine)
+    shared = SQLiteCache(str(tmp_path / "cache.db"))
+    previous = set_cache(shared)
+    first, second = MESService(), MESService()
+    
+    try:
+        with Session(engine) as session:
+            session.add(Goal(id=1, description="Goal 1"))
+            session.add(_action(1, priority=5))
+            session.add(_action(2, priority=8, dependencies="[1]"))
+            session.add(ActionDependency(action_id=2, depends_on_id=1, goal_id=1))
+            session.commit()
+            
+            assert [mes.action_id for mes in first.cached_mes(session, 1)] == [1]
+            
+            action = session.get(Action, 1)
+            action.status = ActionStatus.done
+            session.add(action)
+            session.commit()
+            second.on_action_status(1, 1, ActionStatus.done)
+            assert [mes.action_id for mes in first.cached_mes(session, 1)] == [1]
+            
+            shared.invalidate_tags(goal_tag(1))
+            assert [mes.action_id for mes in first.cached_mes(session, 1)] == [2]
+    finally:
+        set_cache(previous)
+        shared.close()
@@ -0,0 +1,143 @@
+import pytest
+import asyncio
+import re
+from fastapi import Response
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import settings
+from app.core.cache import get_cache
+from app.db import create_async_db_engine, create_db_engine
+from app.migrations import QUERY_INDEXES, add_query_indexes
+from app.models import Action, ActionDependency, ActionStatus, CompletionStatus, EnergyLevel, Goal, GoalStatus
+from app.routes import goals, jobs, logs, mes, stats
+from app.services.breakpoints import breakpoint_service
+from app.services.embeddings import embedding_store
+from app.services.forecast import forecast_engine
+from app.services.jobs import decomposition_queue
+from app.services.mes import global_mes_queue, mes_service
+
+
+# Listings and one-off loads into memory read the whole table by design.
+FULL_READS = [
+    r"FROM completionevent ORDER BY completionevent.timestamp DESC$",
+    r"^SELECT goal\.\w+.* FROM goal$",
+    r"FROM goalembedding JOIN goal ON",
+    r"FROM goal WHERE goal.status != \? AND \(goal.id NOT IN",
+]
+
+
+async def exercise_routes(async_engine):
+    await decomposition_queue.start()
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        await goals.create_goal(goals.CreateGoalRequest(description="New goal"), Response(), session)
+        await decomposition_queue.join()
+        await goals.list_goals(session)
+        await goals.get_goal(1, session)
+        await goals.get_mes(1, session=session)
+        await goals.update_goal(3, goals.UpdateGoalRequest(status=GoalStatus.active), session)
+        await goals.find_similar(1, session)
+        await mes.get_global_mes(session=session)
+        for reason in ("no time", "low energy"):
+            await logs.log_event(logs.LogEventRequest(action_id=3, status=CompletionStatus.failed, failure_reason=reason), session)
+        await logs.log_event(logs.LogEventRequest(action_id=1, status=CompletionStatus.done), session)
+        await logs.log_batch_events(logs.BatchLogRequest(events=[
+            logs.LogEventRequest(action_id=2, status=CompletionStatus.done),
+            logs.LogEventRequest(action_id=3, status=CompletionStatus.failed)
+        ]), session)
+        await logs.get_events(goal_id=1, session=session)
+        await logs.get_events(action_id=3, session=session)
+        await logs.get_events(session=session)
+        await stats.get_summary("7d", session)
+        await stats.get_parasitic_procedures("7d", session)
+        await stats.get_prediction(session)
+        await stats.get_decomposition_reuse(session)
+        await goals.redecompose_goal(3, Response(), session=session)
+        await decomposition_queue.join()
+        await goals.get_latest_job(3, session)
+        await jobs.get_job(2, session)
+        await goals.delete_goal(3, session)
+    await decomposition_queue.stop()
+    await async_engine.dispose()
+
+
+@pytest.fixture
+def recorded(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "")
+    url = f"sqlite:///{tmp_path / 'plans.db'}"
+    engine = create_db_engine(url)
+    SQLModel.metadata.create_all(engine)
+    for service in (mes_service, global_mes_queue, breakpoint_service, forecast_engine, embedding_store):
+        service.clear()
+    get_cache().clear()
+    
+    with Session(engine) as session:
+        session.add(Goal(id=1, description="Goal"))
+        session.add(Goal(id=2, description="Stuck", status=GoalStatus.blocked))
+        for action_id in (1, 2, 3):
+            session.add(Action(
+                id=action_id,
+                goal_id=1,
+                description=f"Action {action_id}",
+                duration_min=10,
+                energy_level=EnergyLevel.low,
+                status=ActionStatus.available if action_id == 1 else ActionStatus.pending
+            ))
+        session.add(ActionDependency(action_id=2, depends_on_id=1, goal_id=1))
+        session.add(ActionDependency(action_id=3, depends_on_id=2, goal_id=1))
+        session.commit()
+    
+    async_engine = create_async_db_engine(url)
+    monkeypatch.setattr(decomposition_queue, "session_factory", lambda: AsyncSession(async_engine, expire_on_commit=False))
+    statements = []
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, params, context, many: statements.append(
+            (statement, params[0] if many else params)
+        )
+    )
+    asyncio.run(exercise_routes(async_engine))
+    yield engine, statements
+    for service in (mes_service, global_mes_queue, breakpoint_service, forecast_engine, embedding_store):
+        service.clear()
+
+
+def full_scans(conn, statement, params):
+    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params).all()
+    return [
+        detail for _, _, _, detail in plan
+        if re.match(r"SCAN \w+$", detail) or re.match(r"SCAN \w+ USING (?!.*INDEX)", detail)
+    ]
+
+
+def test_route_queries_use_indexes(recorded):
+    engine, statements = recorded
+    queries = {
+        (statement, tuple(params)) for statement, params in statements
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+    }
+    assert len(queries) > 10
+    
+    offenders = []
+    with engine.connect() as conn:
+        for statement, params in sorted(queries):
+            flat = " ".join(statement.split())
+            if any(re.search(pattern, flat) for pattern in FULL_READS):
+                continue
+            scans = full_scans(conn, statement, params)
+            if scans:
+                offenders.append((flat, scans))
+    
+    assert offenders == []
+
+
+def test_migration_adds_indexes_to_existing_tables():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for name, _, _ in QUERY_INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX {name}")
+        add_query_indexes(conn)
+        indexes = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    
+    assert {name for name, _, _ in QUERY_INDEXES} <= indexes
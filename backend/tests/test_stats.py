@@ -0,0 +1,125 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel, Session, create_engine, select
+from app.core.cache import get_cache
+from app.migrations import run_migrations
+from app.models import Breakpoint, BreakpointPattern, CompletionEvent, CompletionStatus
+from app.services.rollups import move_breakpoints, record_events
+from app.services.stats import (
+    StatsService, compute_prediction_snapshot, parasitic, parse_window, render_prediction, summary
+)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    get_cache().clear()
+    with Session(engine) as session:
+        yield session
+    get_cache().clear()
+
+
+def _seed(session, events, patterns):
+    for i in range(events):
+        session.add(CompletionEvent(action_id=1, goal_id=1, status=CompletionStatus.done))
+    for action_id, pattern in enumerate(patterns, start=1):
+        session.add(Breakpoint(action_id=action_id, pattern=pattern))
+    session.commit()
+
+
+def test_prediction_snapshot_single_query(session):
+    _seed(session, 8, [BreakpointPattern.time, BreakpointPattern.time, BreakpointPattern.energy])
+    
+    result = render_prediction(compute_prediction_snapshot(session))
+    
+    assert result["breakpoint_predictions"] == [
+        {"pattern": BreakpointPattern.time, "count": 2, "risk_percentage": 25.0},
+        {"pattern": BreakpointPattern.energy, "count": 1, "risk_percentage": 12.5}
+    ]
+
+
+def test_prediction_snapshot_is_patched_on_writes(session):
+    _seed(session, 4, [BreakpointPattern.time])
+    service = StatsService()
+    service.get_prediction(session)
+    
+    _seed(session, 4, [])
+    service.on_events_logged(4)
+    session.add(Breakpoint(action_id=2, pattern=BreakpointPattern.clarity))
+    session.commit()
+    service.on_breakpoints([(None, BreakpointPattern.clarity), (BreakpointPattern.time, BreakpointPattern.clarity)])
+    session.get(Breakpoint, 1).pattern = BreakpointPattern.clarity
+    session.commit()
+    
+    assert service.get_prediction(session) == render_prediction(compute_prediction_snapshot(session))
+
+
+def test_parse_window():
+    assert parse_window("7d") == timedelta(days=7)
+    assert parse_window("36h") == timedelta(hours=36)
+    with pytest.raises(ValueError):
+        parse_window("7 days")
+
+
+def test_summary_and_parasitic_read_from_rollups(session):
+    now = datetime.utcnow()
+    events = [
+        CompletionEvent(action_id=1, goal_id=1, status=CompletionStatus.done, timestamp=now),
+        CompletionEvent(action_id=2, goal_id=1, status=CompletionStatus.done, timestamp=now - timedelta(days=10)),
+    ] + [
+        CompletionEvent(action_id=3, goal_id=1, status=CompletionStatus.failed, failure_reason="time", timestamp=now)
+        for _ in range(3)
+    ]
+    record_events(session, events[:2])
+    record_events(session, events[2:])
+    move_breakpoints(session, [(None, (BreakpointPattern.time, now - timedelta(days=10)))])
+    move_breakpoints(session, [((BreakpointPattern.time, now - timedelta(days=10)), (BreakpointPattern.energy, now))])
+    session.commit()
+    
+    assert summary(session, timedelta(days=7)) == {
+        "mes_done": 1,
+        "stuck_goals": 0,
+        "failure_reasons": {"time": 3}
+    }
+    assert summary(session, timedelta(days=30))["mes_done"] == 2
+    assert parasitic(session, timedelta(days=7)) == {
+        "breakpoint_patterns": {BreakpointPattern.energy: 1},
+        "negative_utility_actions": [{"action_id": 3, "failure_count": 3}]
+    }
+    assert parasitic(session, timedelta(days=30))["breakpoint_patterns"] == {BreakpointPattern.energy: 1}
+
+
+def test_rollup_backfill_matches_live_updates(session):
+    now = datetime.utcnow()
+    for i in range(4):
+        session.add(CompletionEvent(action_id=1, goal_id=1, status=CompletionStatus.failed, failure_reason="energy", timestamp=now))
+    session.commit()
+    
+    run_migrations(session.get_bind())
+    
+    assert summary(session, timedelta(hours=1))["failure_reasons"] == {"energy": 4}
+
+
+def test_migration_keeps_the_latest_breakpoint_per_action(session):
+    conn = session.connection()
+    conn.exec_driver_sql("DROP INDEX ix_breakpoint_action_id")
+    conn.exec_driver_sql("CREATE INDEX ix_breakpoint_action_id ON breakpoint (action_id)")
+    now = datetime.utcnow()
+    session.add(Breakpoint(action_id=1, pattern=BreakpointPattern.time, detected_at=now - timedelta(days=3)))
+    session.add(Breakpoint(action_id=1, pattern=BreakpointPattern.energy, detected_at=now))
+    session.add(Breakpoint(action_id=2, pattern=BreakpointPattern.time, detected_at=now))
+    session.commit()
+    
+    run_migrations(session.get_bind())
+    
+    assert [(b.action_id, b.pattern) for b in session.exec(select(Breakpoint).order_by(Breakpoint.action_id)).all()] == [
+        (1, BreakpointPattern.energy), (2, BreakpointPattern.time)
+    ]
+    assert parasitic(session, timedelta(days=7))["breakpoint_patterns"] == {
+        BreakpointPattern.energy: 1, BreakpointPattern.time: 1
+    }
+    with pytest.raises(IntegrityError):
+        session.add(Breakpoint(action_id=2, pattern=BreakpointPattern.clarity))
+        session.commit()
@@ -0,0 +1,114 @@
+import pytest
+import numpy as np
+from app.config import settings
+from app.services.vector_index import ExactIndex, IVFIndex, VectorIndex
+
+
+def _clustered(n, dim=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    labels = rng.integers(0, clusters, n)
+    return (centers[labels] + 0.3 * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+def _recall(index, exact, queries, k=10):
+    hits = 0
+    for query in queries:
+        expected = {item_id for item_id, _ in exact.search(query, k)}
+        hits += len(expected & {item_id for item_id, _ in index.search(query, k)})
+    return hits / (k * len(queries))
+
+
+def test_ivf_trains_and_matches_exact_when_probing_all_lists():
+    data = _clustered(2000)
+    exact = ExactIndex()
+    ivf = IVFIndex(nlist=16, nprobe=16, train_factor=8)
+    for item_id, vector in enumerate(data):
+        exact.upsert(item_id, vector)
+        ivf.upsert(item_id, vector)
+    
+    assert ivf.is_trained
+    assert _recall(ivf, exact, data[:20]) == 1.0
+
+
+def test_ivf_recall_with_partial_probe():
+    data = _clustered(4000, seed=1)
+    exact = ExactIndex()
+    ivf = IVFIndex(nlist=32, nprobe=4, train_factor=8)
+    for item_id, vector in enumerate(data):
+        exact.upsert(item_id, vector)
+        ivf.upsert(item_id, vector)
+    
+    queries = _clustered(50, seed=2)
+    assert _recall(ivf, exact, queries) >= 0.9
+
+
+def test_ivf_incremental_insert_and_delete_after_training():
+    data = _clustered(600, seed=3)
+    ivf = IVFIndex(nlist=8, nprobe=8, train_factor=4)
+    for item_id, vector in enumerate(data[:500]):
+        ivf.upsert(item_id, vector)
+    assert ivf.is_trained
+    
+    ivf.upsert(1000, data[550])
+    assert ivf.search(data[550], 1)[0][0] == 1000
+    
+    ivf.remove(1000)
+    assert 1000 not in ivf
+    assert all(item_id != 1000 for item_id, _ in ivf.search(data[550], 10))
+    assert len(ivf) == 500
+    assert ivf.search(data[0], 1, exclude_id=0)[0][0] != 0
+
+
+def test_ivf_probes_past_emptied_lists():
+    data = _clustered(600, seed=4)
+    ivf = IVFIndex(nlist=8, nprobe=1, train_factor=4)
+    for item_id, vector in enumerate(data[:500]):
+        ivf.upsert(item_id, vector)
+    assert ivf.is_trained
+    
+    # Empty the list the query probes first.
+    nearest = {item_id for item_id, _ in ivf.search(data[0], 500)}
+    for item_id in nearest:
+        ivf.remove(item_id)
+    
+    hits = ivf.search(data[0], 3)
+    assert len(hits) == 3
+    assert not nearest & {item_id for item_id, _ in hits}
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_recall_at_5_meets_threshold(dtype):
+    data = _clustered(3000, dim=256, clusters=50, seed=4)
+    exact = ExactIndex()
+    quantized = ExactIndex(dtype=dtype)
+    for item_id, vector in enumerate(data):
+        exact.upsert(item_id, vector)
+        quantized.upsert(item_id, vector)
+    
+    queries = _clustered(50, dim=256, clusters=50, seed=5)
+    assert _recall(quantized, exact, queries, k=5) >= settings.similarity_min_recall_at_5
+
+
+def test_quantized_memory_and_roundtrip():
+    data = _clustered(1024, dim=64, seed=6)
+    indexes = {dtype: ExactIndex(dtype=dtype) for dtype in ["float32", "float16", "int8"]}
+    for index in indexes.values():
+        for item_id, vector in enumerate(data):
+            index.upsert(item_id, vector)
+    
+    assert indexes["float16"].memory_bytes() < 0.6 * indexes["float32"].memory_bytes()
+    assert indexes["int8"].memory_bytes() < 0.4 * indexes["float32"].memory_bytes()
+    
+    expected = indexes["float32"].get(7)
+    assert indexes["int8"].get(7) == pytest.approx(expected, abs=0.01)
+    indexes["int8"].remove(0)
+    assert indexes["int8"].get(1023) == pytest.approx(indexes["float32"].get(1023), abs=0.01)
+
+
+def test_incomplete_index_fails_when_created():
+    class Incomplete(VectorIndex):
+        pass
+    
+    with pytest.raises(TypeError):
+        Incomplete()